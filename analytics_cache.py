@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process lock on Windows; run one process per cache directory
+    fcntl = None
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import config
+
+# Bump when the format of the cached files changes
+CACHE_VERSION = 1
+
+
+class AnalyticsCache:
+    """On-disk Parquet copy of the transformed interactions frame.
+
+    The cache directory holds Parquet parts and a meta.json recording the
+    highest interaction id they contain (the watermark). load() extracts and
+    transforms only the rows above the watermark and appends them as a new
+    part. Deleted rows, a different interactions schema or a new transform
+    version throw the cache away and rebuild it from scratch. Rows changed
+    in place by an UPDATE are not picked up: clear() the cache (or delete
+    its directory) after editing stored interactions.
+
+    The dashboard, the reports and refresh_forecasts.py may share a cache
+    directory, so load() and clear() hold an exclusive lock on its lock
+    file while they read and rewrite meta.json and the parts.
+    """
+
+    def __init__(self, path=None, max_parts=None):
+        self.path = path or config.ANALYTICS_CACHE_PATH
+        self.max_parts = max_parts or config.ANALYTICS_CACHE_MAX_PARTS
+        self._lock = threading.Lock()
+        self.full_rebuilds = 0
+        self.incremental_loads = 0
+        self.rows_appended = 0
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cache against other threads and processes"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            # Closing the file releases the lock
+            with open(os.path.join(self.path, 'lock'), 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    def _meta_path(self):
+        return os.path.join(self.path, 'meta.json')
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta):
+        # Written last and replaced atomically, so a crash mid-append leaves
+        # the previous parts and watermark in place
+        tmp = self._meta_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path())
+
+    def _write_part(self, df, number):
+        name = f'part-{number:06d}.parquet'
+        tmp = os.path.join(self.path, name + '.tmp')
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(self.path, name))
+        return name
+
+    @staticmethod
+    def _concat(frames):
+        """Concatenate frames, keeping categorical columns categorical"""
+        if len(frames) == 1:
+            return frames[0]
+        df = pd.concat(frames, ignore_index=True)
+        # concat falls back to object when the parts' categories differ
+        for column, dtype in frames[0].dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype) and not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = union_categoricals([frame[column] for frame in frames],
+                                                sort_categories=True)
+        return df
+
+    def _read_parts(self, meta):
+        return self._concat([pd.read_parquet(os.path.join(self.path, name))
+                             for name in meta['parts']])
+
+    def _remove_unlisted_parts(self, meta):
+        for name in os.listdir(self.path):
+            if name.startswith('part-') and name not in meta['parts']:
+                os.remove(os.path.join(self.path, name))
+
+    @staticmethod
+    def _table_state(conn, watermark):
+        """Schema of interactions, and the row count and max id up to watermark"""
+        schema = [[row[1], row[2]] for row in conn.execute('PRAGMA table_info(interactions)')]
+        count, max_id = conn.execute(
+            'SELECT COUNT(*), MAX(id) FROM interactions WHERE id <= ?', (watermark,)
+        ).fetchone()
+        return schema, count, max_id
+
+    def load(self, database, extract, transform, transform_version):
+        """Return the transformed interactions, extracting only new rows.
+
+        extract(after_id) returns the raw rows with id above after_id in id
+        order, and transform(df) turns them into the analytics frame.
+        """
+        with self._locked():
+            conn = database.connection()
+            meta = self._read_meta()
+
+            if meta is not None:
+                schema, count, max_id = self._table_state(conn, meta['watermark'])
+                valid = (meta.get('version') == CACHE_VERSION
+                         and meta.get('transform_version') == transform_version
+                         and meta.get('database') == os.path.abspath(database.db_name)
+                         and meta.get('schema') == schema
+                         # Fewer rows up to the watermark means some were deleted
+                         and count == meta['rows']
+                         and (max_id or 0) == meta['watermark'])
+                if not valid:
+                    print("Interactions changed since the analytics cache was written, rebuilding it")
+                    meta = None
+
+            if meta is None:
+                df = transform(extract(0))
+                schema, _, _ = self._table_state(conn, 0)
+                meta = {
+                    'version': CACHE_VERSION,
+                    'transform_version': transform_version,
+                    'database': os.path.abspath(database.db_name),
+                    'schema': schema,
+                    'watermark': int(df['id'].max()) if len(df) else 0,
+                    'rows': len(df),
+                    'parts': [self._write_part(df, 0)]
+                }
+                self._write_meta(meta)
+                self._remove_unlisted_parts(meta)
+                self.full_rebuilds += 1
+                return df
+
+            cached = self._read_parts(meta)
+            new_rows = extract(meta['watermark'])
+            self.incremental_loads += 1
+            if new_rows.empty:
+                return cached
+
+            new_rows = transform(new_rows)
+            df = self._concat([cached, new_rows])
+            meta['watermark'] = int(new_rows['id'].max())
+            meta['rows'] += len(new_rows)
+            number = int(meta['parts'][-1][5:11]) + 1
+            if len(meta['parts']) >= self.max_parts:
+                # Compact into a single part instead of adding another
+                meta['parts'] = [self._write_part(df, number)]
+            else:
+                meta['parts'].append(self._write_part(new_rows, number))
+            self._write_meta(meta)
+            self._remove_unlisted_parts(meta)
+            self.rows_appended += len(new_rows)
+            return df
+
+    def clear(self):
+        """Remove the cache so the next load rebuilds it"""
+        with self._locked():
+            self._remove_unlisted_parts({'parts': []})
+            if os.path.exists(self._meta_path()):
+                os.remove(self._meta_path())
+
+    def stats(self):
+        """Watermark, size and load counters of the cache"""
+        meta = self._read_meta() or {}
+        return {
+            'path': self.path,
+            'watermark': meta.get('watermark'),
+            'rows': meta.get('rows'),
+            'parts': len(meta.get('parts', [])),
+            'full_rebuilds': self.full_rebuilds,
+            'incremental_loads': self.incremental_loads,
+            'rows_appended': self.rows_appended
+        }
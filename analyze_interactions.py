@@ -1,109 +1,240 @@
-import sqlite3
 import pandas as pd
 import json
-from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
-from collections import Counter
-import re
 import numpy as np
+import weakref
+
+from analytics_cache import AnalyticsCache
+import config
+from database import db
+from interaction_fields import parse_travel_dates
+from preference_matrix import OTHER_PREFERENCE, PreferenceMatrix
+import rollups
+
+# Columns of interactions the analyses use; the conversation and itinerary
+# JSON are left out of the cached frame
+ANALYTIC_COLUMNS = ['id', 'session_id', 'travel_dates', 'duration', 'group_info',
+                    'preferences', 'budget', 'created_at', 'budget_value',
+                    'duration_days', 'group_size', 'travel_date']
+
+# Low-cardinality answers, kept as categoricals: each distinct string is
+# stored once and rows hold small integer codes
+CATEGORICAL_COLUMNS = ['duration', 'group_info', 'preferences', 'budget', 'travel_date']
+
+# Bump when transform_data changes, so cached frames are rebuilt
+TRANSFORM_VERSION = 2
+
+# Travel date formats with a year, tried on the whole column before the
+# remaining values are parsed one distinct value at a time
+TRAVEL_DATE_FORMATS = ['%Y-%m-%d', '%d %B %Y', '%B %d, %Y', '%B %d %Y', '%d %b %Y', '%b %d, %Y']
+
+def normalize_travel_dates(travel_dates, created_at=None):
+    """Datetimes of a column of travel date answers, NaT where unparseable.
+
+    Dates without a year are resolved against each row's created_at, as
+    parse_travel_date does when an interaction is stored.
+    """
+    text = travel_dates.astype('string').str.strip()
+    result = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    remaining = text.notna()
+    for date_format in TRAVEL_DATE_FORMATS:
+        if not remaining.any():
+            break
+        parsed = pd.to_datetime(text[remaining], format=date_format, errors='coerce').dropna()
+        result[parsed.index] = parsed
+        remaining[parsed.index] = False
+    
+    if remaining.any():
+        references = ([None if pd.isna(value) else str(value) for value in created_at[remaining]]
+                      if created_at is not None else [None] * int(remaining.sum()))
+        parsed = parse_travel_dates(text[remaining].tolist(), references)
+        result[remaining] = pd.to_datetime(pd.Series(parsed, index=text.index[remaining]))
+    return result
 
 class InteractionAnalyzer:
-    def __init__(self):
-        self.db_name = "dubai_tourism.db"
-        
-    def extract_data(self):
-        """Extract data from SQLite database"""
-        conn = sqlite3.connect(self.db_name)
-        df = pd.read_sql_query("""
-            SELECT * FROM interactions
-        """, conn)
-        conn.close()
+    def __init__(self, database=None, cache=None):
+        self.db = database or db
+        self.cache = cache or AnalyticsCache()
+        self._preference_matrix = None
+        
+    def extract_data(self, after_id=0, columns=None):
+        """Extract data from SQLite database, optionally only the given
+        columns of rows with id above after_id"""
+        df = pd.read_sql_query(f"""
+            SELECT {", ".join(columns) if columns else "*"} FROM interactions
+            WHERE id > ?
+            ORDER BY id
+        """, self.db.connection(), params=(after_id,))
         return df
     
     def transform_data(self, df):
         """Transform and clean the data"""
         # Convert timestamps
-        df['created_at'] = pd.to_datetime(df['created_at'])
+        if 'created_at' in df:
+            df['created_at'] = pd.to_datetime(df['created_at'])
         
         # Parse JSON strings
-        df['conversation_history'] = df['conversation_history'].apply(json.loads)
-        df['generated_itinerary'] = df['generated_itinerary'].apply(json.loads)
-        
-        # Extract budget as float
-        df['budget_value'] = df['budget'].str.extract(r'(\d+)').astype(float)
-        
-        # Extract duration as integer (improved parsing)
-        def extract_duration(duration_str):
-            if pd.isna(duration_str):
-                return None
-            # Extract numbers from strings like "5 days" or "7 Days"
-            match = re.search(r'(\d+)', str(duration_str))
-            if match:
-                return int(match.group(1))
-            return None
-        
-        df['duration_days'] = df['duration'].apply(extract_duration)
-        
-        # Extract group size from group_info
-        def extract_group_size(group_info):
-            if pd.isna(group_info):
-                return 1
-            # Extract numbers from strings like "family with 2 kids" or "group of 4 friends"
-            numbers = re.findall(r'\d+', str(group_info))
-            if numbers:
-                # If "family with X kids", add 2 parents
-                if 'family' in str(group_info).lower():
-                    return int(numbers[0]) + 2
-                # Otherwise return the number found
-                return int(numbers[0])
-            # Default values for common cases
-            if 'solo' in str(group_info).lower():
-                return 1
-            if 'couple' in str(group_info).lower():
-                return 2
-            return 1  # Default to 1 if no size can be determined
-        
-        df['group_size'] = df['group_info'].apply(extract_group_size)
+        for column in ('conversation_history', 'generated_itinerary'):
+            if column in df:
+                df[column] = df[column].apply(json.loads)
+        
+        for column in CATEGORICAL_COLUMNS:
+            if column in df:
+                df[column] = df[column].astype('category')
+        
+        # budget_value, duration_days, group_size and travel_date are typed
+        # columns filled in when each interaction is stored; each distinct
+        # travel date is converted once and mapped back by its code
+        if 'travel_date' in df:
+            travel_dates = df['travel_date'].cat
+            df['travel_dates'] = pd.Series(
+                pd.to_datetime(travel_dates.categories).take(travel_dates.codes, fill_value=pd.NaT),
+                index=df.index
+            )
         
         return df
+
+    def query(self, columns, travel_dates=None, created_at=None, order_by='id', limit=None,
+              after_id=None, until_id=None):
+        """Transformed interactions with only the given columns.
+
+        travel_dates and created_at are inclusive (start, end) windows whose
+        ends may be None; they filter in SQL on the indexed travel_date and
+        created_at columns. after_id keeps only rows stored after that id
+        and until_id only rows up to that id, read as a range of the primary
+        key. With limit, only the last limit
+        rows in order_by order are read. Rows come back in order_by order.
+        """
+        if order_by not in ANALYTIC_COLUMNS:
+            raise ValueError(f"Can't order interactions by {order_by!r}")
+        # travel_dates is derived from the typed travel_date column
+        selected = ['id'] + [column for column in dict.fromkeys(
+            'travel_date' if column == 'travel_dates' else column for column in columns
+        ) if column != 'id']
+        unknown = set(selected) - set(ANALYTIC_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown interaction columns {sorted(unknown)}")
+
+        # Whole columns are cheaper to take from the analytics cache than
+        # to read and transform again
+        if travel_dates is None and created_at is None and limit is None and after_id is None:
+            df = self.load_data()
+            if until_id is not None:
+                df = df[df['id'] <= until_id]
+            if order_by != 'id':
+                df = df.sort_values([order_by, 'id'], kind='stable', ignore_index=True)
+            return df[[column for column in columns if column in df]]
+
+        conditions, params = [], []
+        if after_id is not None:
+            conditions.append('id > ?')
+            params.append(int(after_id))
+        if until_id is not None:
+            conditions.append('id <= ?')
+            params.append(int(until_id))
+        for column, window in (('travel_date', travel_dates), ('created_at', created_at)):
+            start, end = window or (None, None)
+            if start is not None:
+                conditions.append(f'{column} >= ?')
+                params.append(self._sql_bound(column, start))
+            if end is not None:
+                conditions.append(f'{column} <= ?')
+                params.append(self._sql_bound(column, end, end=True))
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+
+        if limit is None:
+            sql = f'SELECT {", ".join(selected)} FROM interactions {where} ORDER BY {order_by}, id'
+        else:
+            sql = f'''
+                SELECT * FROM (
+                    SELECT {", ".join(selected)} FROM interactions {where}
+                    ORDER BY {order_by} DESC, id DESC LIMIT ?
+                ) ORDER BY {order_by}, id
+            '''
+            params.append(int(limit))
+        df = pd.read_sql_query(sql, self.db.connection(), params=params)
+        df = self.transform_data(df)
+        return df[[column for column in columns if column in df]]
+
+    @staticmethod
+    def _sql_bound(column, value, end=False):
+        """A window bound in the format the column is stored in"""
+        value = pd.Timestamp(value)
+        if column == 'travel_date':
+            return value.strftime('%Y-%m-%d')
+        # A date as the end of a created_at window covers the whole day
+        if end and value == value.normalize():
+            return value.strftime('%Y-%m-%d') + ' 23:59:59.999999'
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+
+    def load_data(self):
+        """Extracted and transformed analytic columns of every interaction,
+        read from the analytics cache plus any rows stored since"""
+        return self.cache.load(
+            self.db,
+            lambda after_id: self.extract_data(after_id, ANALYTIC_COLUMNS),
+            self.transform_data,
+            TRANSFORM_VERSION
+        )
     
+    def data_version(self):
+        """Counter that triggers on the interactions table bump on every
+        insert, update or delete, wherever it comes from; one row to read"""
+        conn = self.db.connection()
+        return conn.execute('SELECT version FROM interactions_version').fetchone()[0]
+
+    def preference_matrix(self, df):
+        """The PreferenceMatrix of df's preferences, built once per frame"""
+        if self._preference_matrix is not None and self._preference_matrix[0]() is df:
+            return self._preference_matrix[1]
+        matrix = PreferenceMatrix(df['preferences'])
+        self._preference_matrix = (weakref.ref(df), matrix)
+        return matrix
+
     def analyze_preferences(self, df):
         """Analyze user preferences in detail"""
-        # Extract all preferences
-        all_preferences = []
-        for prefs in df['preferences'].dropna():
-            all_preferences.extend([p.strip() for p in prefs.split(',')])
+        matrix = self.preference_matrix(df)
         
-        # Count preferences
-        preference_counts = Counter(all_preferences)
+        # Count preferences, in order of first mention like a Counter
+        counts = matrix.counts().tolist()
+        preference_counts = dict(zip(matrix.names, counts))
         
         # Calculate percentages
-        total_preferences = sum(preference_counts.values())
+        total_preferences = sum(counts)
         preference_percentages = {k: (v/total_preferences)*100 for k, v in preference_counts.items()}
         
-        # Analyze preferences by group type
-        preferences_by_group = {}
-        for _, row in df.iterrows():
-            if pd.notna(row['group_info']) and pd.notna(row['preferences']):
-                group = row['group_info']
-                prefs = [p.strip() for p in row['preferences'].split(',')]
-                if group not in preferences_by_group:
-                    preferences_by_group[group] = []
-                preferences_by_group[group].extend(prefs)
-        
-        # Convert to percentage for each group
+        # Analyze preferences by group type, as a percentage of each group's mentions
+        group_counts = self._preference_counts_by(df['group_info'], matrix)
+        group_counts['pct'] = group_counts['count'] / group_counts['total'] * 100
         preferences_by_group_pct = {}
-        for group, prefs in preferences_by_group.items():
-            total = len(prefs)
-            counts = Counter(prefs)
-            preferences_by_group_pct[group] = {k: (v/total)*100 for k, v in counts.items()}
+        for group, preference, pct in zip(group_counts['key'], group_counts['preference'],
+                                          group_counts['pct'].tolist()):
+            preferences_by_group_pct.setdefault(group, {})[preference] = pct
         
         return {
-            'preference_counts': dict(preference_counts),
+            'preference_counts': preference_counts,
             'preference_percentages': preference_percentages,
             'preferences_by_group': preferences_by_group_pct
         }
+
+    @staticmethod
+    def _preference_counts_by(keys, matrix):
+        """Mentions of each preference per value of keys (skipping missing
+        keys), one row per (key, preference) in order of first mention"""
+        key_codes, key_names, table = matrix.counts_by(keys)
+        counts = matrix.first_mentions_by(key_codes)
+        key, preference = counts['key'].to_numpy(), counts['preference'].to_numpy()
+        counts['count'] = np.asarray(table[key, preference]).ravel()
+        counts['total'] = np.asarray(table.sum(axis=1)).ravel()[key]
+        counts['key'] = key_names[key]
+        counts['preference'] = matrix.names[preference]
+        return counts
+    
+    def analyze_preference_associations(self, df, min_together=5):
+        """Preferences picked together by the same interactions, highest
+        lift first (see PreferenceMatrix.associations)"""
+        return self.preference_matrix(df).associations(min_together)
     
     def visualize_preferences(self, preference_data):
         """Create visualizations for preference analysis"""
@@ -157,21 +288,19 @@ class InteractionAnalyzer:
         """Analyze correlations between preferences and other factors"""
         correlations = {}
         
-        # Analyze preference vs budget
-        budget_by_preference = {}
-        for _, row in df.iterrows():
-            if pd.notna(row['preferences']) and pd.notna(row['budget_value']):
-                prefs = [p.strip() for p in row['preferences'].split(',')]
-                for pref in prefs:
-                    if pref not in budget_by_preference:
-                        budget_by_preference[pref] = []
-                    budget_by_preference[pref].append(row['budget_value'])
-        
-        # Calculate average budget for each preference
-        correlations['avg_budget_by_preference'] = {
-            pref: sum(budgets)/len(budgets) 
-            for pref, budgets in budget_by_preference.items()
-        }
+        # Analyze preference vs budget, over interactions with a budget
+        matrix = self.preference_matrix(df)
+        budgets = df['budget_value'].to_numpy(dtype=float)
+        has_budget = ~np.isnan(budgets)
+        
+        # Calculate average budget for each preference; the sparse product
+        # adds the budgets in row order, exactly like sum() over a list
+        budget_sums = matrix.weighted_sums(np.where(has_budget, budgets, 0.0))
+        budget_counts = matrix.weighted_sums(has_budget)
+        mentioned = pd.unique(matrix.codes[has_budget[matrix.rows]])
+        correlations['avg_budget_by_preference'] = dict(zip(
+            matrix.names[mentioned], (budget_sums[mentioned] / budget_counts[mentioned]).tolist()
+        ))
         
         # Visualize budget vs preference correlation
         plt.figure(figsize=(12, 6))
@@ -199,14 +328,14 @@ class InteractionAnalyzer:
         group_budget = df.groupby('group_info')['budget_value'].mean()
         group_patterns['avg_budget'] = group_budget.to_dict()
         
-        # Most common preferences by group type
-        group_preferences = {}
-        for group in df['group_info'].unique():
-            group_df = df[df['group_info'] == group]
-            all_prefs = []
-            for prefs in group_df['preferences'].dropna():
-                all_prefs.extend([p.strip() for p in prefs.split(',')])
-            group_preferences[group] = Counter(all_prefs).most_common(3)
+        # Most common preferences by group type; a stable sort keeps ties
+        # in order of first mention, like Counter.most_common
+        group_counts = self._preference_counts_by(df['group_info'], self.preference_matrix(df))
+        top = (group_counts.sort_values('count', ascending=False, kind='stable')
+               .groupby('key', sort=False).head(3))
+        group_preferences = {group: [] for group in df['group_info'].unique()}
+        for group, preference, count in zip(top['key'], top['preference'], top['count'].tolist()):
+            group_preferences[group].append((preference, count))
         
         group_patterns['top_preferences'] = group_preferences
         
@@ -215,61 +344,48 @@ class InteractionAnalyzer:
     def analyze_seasonal_trends(self, df):
         """Analyze seasonal trends based on travel dates"""
         try:
-            # First, clean and standardize the date format
-            def standardize_date(date_str):
-                try:
-                    # If it's already in YYYY-MM-DD format
-                    return pd.to_datetime(date_str, format='%Y-%m-%d')
-                except:
-                    try:
-                        # If it's in text format like "2nd november"
-                        # Remove ordinal indicators and convert to datetime
-                        date_str = str(date_str).lower()
-                        date_str = date_str.replace('st ', ' ').replace('nd ', ' ').replace('rd ', ' ').replace('th ', ' ')
-                        # Add year if not present
-                        if '2024' not in date_str:
-                            date_str += ' 2024'
-                        return pd.to_datetime(date_str, format='%B %d %Y')
-                    except:
-                        print(f"Could not parse date: {date_str}")
-                        return pd.NaT
-
-            # Convert dates using the custom function
-            df['travel_dates'] = df['travel_dates'].apply(standardize_date)
-            
-            # Remove rows with invalid dates
-            df = df[df['travel_dates'].notna()]
+            # travel_dates holds the dates parsed when each interaction was
+            # stored; other frames are normalized here, without modifying df
+            if pd.api.types.is_datetime64_any_dtype(df['travel_dates']):
+                travel_dates = df['travel_dates']
+            else:
+                column = 'travel_date' if 'travel_date' in df else 'travel_dates'
+                travel_dates = normalize_travel_dates(df[column], df.get('created_at'))
             
-            # Extract month information
-            df['month'] = df['travel_dates'].dt.month
-            df['month_name'] = df['travel_dates'].dt.strftime('%B')
+            # Keep rows with valid dates, labelled with their month
+            valid = travel_dates.notna().to_numpy()
+            month_names = travel_dates[valid].dt.month_name().to_numpy()
+            trips = pd.DataFrame({
+                'month_name': month_names,
+                'budget_value': df['budget_value'].to_numpy()[valid],
+                'group_size': df['group_size'].to_numpy()[valid]
+            })
             seasonal_trends = {}
             
-            # Monthly booking counts by travel date
-            monthly_bookings = df.groupby('month_name')['travel_dates'].count()
-            seasonal_trends['monthly_bookings'] = monthly_bookings.to_dict()
-            
-            # Monthly average budget by travel date
-            # Remove the '$' sign and convert to float
-            df['budget_clean'] = df['budget'].str.replace('$', '').str.replace(',', '').astype(float)
-            monthly_budget = df.groupby('month_name')['budget_clean'].mean()
-            seasonal_trends['monthly_avg_budget'] = monthly_budget.to_dict()
+            # Monthly bookings, average budget and group size by travel date
+            monthly = trips.groupby('month_name').agg(
+                bookings=('month_name', 'size'),
+                avg_budget=('budget_value', 'mean'),
+                group_size=('group_size', 'mean')
+            )
+            seasonal_trends['monthly_bookings'] = monthly['bookings'].to_dict()
+            seasonal_trends['monthly_avg_budget'] = monthly['avg_budget'].to_dict()
+            seasonal_trends['monthly_group_size'] = monthly['group_size'].to_dict()
             
-            # Monthly average group size by travel date
-            monthly_group_size = df.groupby('month_name')['group_size'].mean()
-            seasonal_trends['monthly_group_size'] = monthly_group_size.to_dict()
-            
-            # Monthly preferences analysis by travel date
-            monthly_preferences = {}
-            preference_counts_by_month = {}
-            
-            for month in df['month_name'].unique():
-                month_df = df[df['month_name'] == month]
-                all_prefs = []
-                for prefs in month_df['preferences'].dropna():
-                    all_prefs.extend([p.strip() for p in prefs.split(',')])
-                monthly_preferences[month] = Counter(all_prefs).most_common(5)
-                preference_counts_by_month[month] = dict(Counter(all_prefs))
+            # Monthly preferences by travel date, from one exploded table;
+            # months are listed in order of first appearance
+            month_counts = self._preference_counts_by(travel_dates.dt.month_name(),
+                                                      self.preference_matrix(df))
+            top = (month_counts.sort_values('count', ascending=False, kind='stable')
+                   .groupby('key', sort=False).head(5))
+            months = pd.unique(month_names)
+            monthly_preferences = {month: [] for month in months}
+            preference_counts_by_month = {month: {} for month in months}
+            for month, preference, count in zip(top['key'], top['preference'], top['count'].tolist()):
+                monthly_preferences[month].append((preference, count))
+            for month, preference, count in zip(month_counts['key'], month_counts['preference'],
+                                                month_counts['count'].tolist()):
+                preference_counts_by_month[month][preference] = count
             
             seasonal_trends['monthly_preferences'] = monthly_preferences
             seasonal_trends['preference_counts_by_month'] = preference_counts_by_month
@@ -282,6 +398,135 @@ class InteractionAnalyzer:
             traceback.print_exc()
             return None
 
+    # The methods below read the rollup tables kept by DubaiTourismDB instead
+    # of the raw interactions, and return the same structures as the
+    # analyses above. Missing keys are stored as '' and are left out.
+
+    def _read_rollup(self, query):
+        return pd.read_sql_query(query, self.db.connection())
+
+    @staticmethod
+    def _ratio(sums, counts):
+        return (sums / counts.where(counts > 0)).dropna()
+
+    def rollup_key_metrics(self):
+        """Total interactions and average budget, duration and group size"""
+        totals = self._read_rollup("""
+            SELECT SUM(interactions) AS interactions,
+                   SUM(budget_sum) AS budget_sum, SUM(budget_count) AS budget_count,
+                   SUM(duration_sum) AS duration_sum, SUM(duration_count) AS duration_count,
+                   SUM(group_size_sum) AS group_size_sum
+            FROM rollup_daily
+        """).fillna(0).iloc[0]
+        return {
+            'total_interactions': int(totals['interactions']),
+            'avg_budget': (totals['budget_sum'] / totals['budget_count']
+                           if totals['budget_count'] else np.nan),
+            'avg_duration': (totals['duration_sum'] / totals['duration_count']
+                             if totals['duration_count'] else np.nan),
+            'avg_group_size': (totals['group_size_sum'] / totals['interactions']
+                               if totals['interactions'] else np.nan)
+        }
+
+    def _rollup_preference_names(self):
+        """Mentions and name of each canonical preference in the rollups,
+        most mentioned first. Preferences are named as PreferenceMatrix
+        names them: by first spelling, with all but the
+        PREFERENCE_VOCABULARY_SIZE most mentioned named OTHER_PREFERENCE."""
+        names = self._read_rollup(f"""
+            SELECT preference, name, SUM(interactions) AS count
+            FROM rollup_preference JOIN {rollups.PREFERENCE_NAMES} USING (preference)
+            GROUP BY preference
+            ORDER BY count DESC, position
+        """)
+        names.loc[names.index >= config.PREFERENCE_VOCABULARY_SIZE, 'name'] = OTHER_PREFERENCE
+        return names
+
+    def _name_preferences(self, rows, by=()):
+        """Sum rollup_preference rows, keyed by canonical preference, by
+        preference name instead"""
+        names = self._rollup_preference_names().set_index('preference')['name']
+        rows['preference'] = rows['preference'].map(names)
+        return rows.groupby([*by, 'preference'], sort=False).sum().reset_index()
+
+    def rollup_preference_counts(self):
+        """Number of mentions of each preference, most common first"""
+        names = self._rollup_preference_names()
+        counts = names.groupby('name', sort=False)['count'].sum().rename_axis('preference')
+        return counts.sort_values(ascending=False, kind='stable').astype(int)
+
+    def rollup_preference_correlations(self):
+        """Average budget by preference, as in analyze_preference_correlations"""
+        budgets = self._name_preferences(self._read_rollup("""
+            SELECT preference, SUM(budget_sum) AS budget_sum, SUM(budget_count) AS budget_count
+            FROM rollup_preference
+            GROUP BY preference
+        """)).set_index('preference')
+        return {
+            'avg_budget_by_preference':
+                self._ratio(budgets['budget_sum'], budgets['budget_count']).to_dict()
+        }
+
+    def rollup_group_patterns(self):
+        """Group averages as in analyze_group_patterns, plus the number of
+        interactions of each group size"""
+        groups = self._read_rollup("""
+            SELECT * FROM rollup_group WHERE group_info != ''
+        """).set_index('group_info')
+        preferences = self._name_preferences(self._read_rollup("""
+            SELECT group_info, preference, SUM(interactions) AS count
+            FROM rollup_preference
+            WHERE group_info != ''
+            GROUP BY group_info, preference
+        """), by=['group_info']).sort_values(['group_info', 'count', 'preference'],
+                                            ascending=[True, False, True])
+
+        # Every group_info parses to a single group size
+        sizes = (groups['group_size_sum'] / groups['interactions']).round().astype(int)
+        return {
+            'avg_duration': self._ratio(groups['duration_sum'], groups['duration_count']).to_dict(),
+            'avg_budget': self._ratio(groups['budget_sum'], groups['budget_count']).to_dict(),
+            'top_preferences': {
+                group: list(zip(rows['preference'], rows['count'].astype(int)))[:3]
+                for group, rows in preferences.groupby('group_info')
+            },
+            'group_size_counts': groups['interactions'].groupby(sizes).sum().astype(int).to_dict()
+        }
+
+    def rollup_seasonal_trends(self):
+        """Trends by travel month, as in analyze_seasonal_trends"""
+        months = self._read_rollup("""
+            SELECT * FROM rollup_travel_month WHERE travel_month != ''
+        """)
+        preferences = self._name_preferences(self._read_rollup("""
+            SELECT travel_month, preference, SUM(interactions) AS count
+            FROM rollup_preference
+            WHERE travel_month != ''
+            GROUP BY travel_month, preference
+        """), by=['travel_month'])
+        months['month_name'] = pd.to_datetime(months['travel_month'], format='%Y-%m').dt.strftime('%B')
+        preferences['month_name'] = pd.to_datetime(preferences['travel_month'], format='%Y-%m').dt.strftime('%B')
+
+        # Rolled up by year and month; the trends are by month name
+        by_month = months.groupby('month_name')[list(rollups.MEASURES)].sum()
+        counts = (preferences.groupby(['month_name', 'preference'])['count'].sum()
+                  .astype(int).reset_index()
+                  .sort_values(['month_name', 'count', 'preference'],
+                               ascending=[True, False, True]))
+        return {
+            'monthly_bookings': by_month['interactions'].astype(int).to_dict(),
+            'monthly_avg_budget': self._ratio(by_month['budget_sum'], by_month['budget_count']).to_dict(),
+            'monthly_group_size': (by_month['group_size_sum'] / by_month['interactions']).to_dict(),
+            'monthly_preferences': {
+                month: list(zip(rows['preference'], rows['count']))[:5]
+                for month, rows in counts.groupby('month_name')
+            },
+            'preference_counts_by_month': {
+                month: dict(zip(rows['preference'], rows['count']))
+                for month, rows in counts.groupby('month_name')
+            }
+        }
+
     def visualize_group_patterns(self, group_patterns):
         """Create visualizations for group patterns"""
         # 1. Average Duration by Group Type
@@ -454,8 +699,7 @@ class InteractionAnalyzer:
         print("Starting preference analysis...")
         
         # Extract and transform data
-        df = self.extract_data()
-        df = self.transform_data(df)
+        df = self.load_data()
         
         # Analyze preferences
         preference_data = self.analyze_preferences(df)
@@ -501,8 +745,7 @@ class InteractionAnalyzer:
         print("Starting extended analysis...")
         
         # Extract and transform data
-        df = self.extract_data()
-        df = self.transform_data(df)
+        df = self.load_data()
         
         # Generate key metrics visualizations
         self.visualize_key_metrics(df)
@@ -590,12 +833,10 @@ class InteractionAnalyzer:
         plt.close()
 
         # 2. Top Preferences Bar Chart with Percentages
-        preferences_list = []
-        for prefs in df['preferences'].dropna():
-            preferences_list.extend([p.strip() for p in prefs.split(',')])
-        
-        top_preferences = pd.Series(preferences_list).value_counts().head(5)
-        total_prefs = len(preferences_list)
+        matrix = self.preference_matrix(df)
+        preference_counts = pd.Series(matrix.counts(), index=matrix.names)
+        top_preferences = preference_counts.sort_values(ascending=False, kind='stable').head(5)
+        total_prefs = preference_counts.sum()
         
         plt.figure(figsize=(12, 6))
         bars = plt.bar(top_preferences.index, top_preferences.values)
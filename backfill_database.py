@@ -0,0 +1,17 @@
+from database import db
+
+
+def backfill():
+    """Fill derived columns, tables and rollups for interactions stored before they existed"""
+    count = db.backfill_typed_columns()
+    print(f"Filled typed columns for {count} interactions")
+    if not count:
+        # Filling the columns rebuilds the rollups; they may still be new
+        db.rebuild_rollups()
+        print("Rebuilt the rollup tables")
+    count = db.backfill_itinerary_activities()
+    print(f"Checked {count} interactions for missing itinerary activities")
+
+
+if __name__ == "__main__":
+    backfill()
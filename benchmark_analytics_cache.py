@@ -0,0 +1,106 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from analytics_cache import AnalyticsCache
+from analyze_interactions import ANALYTIC_COLUMNS, InteractionAnalyzer
+from database import DubaiTourismDB
+from generate_sample_data import SampleDataGenerator
+from interaction_fields import typed_fields
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+NEW_ROWS = 1000
+TEMPLATES = 500
+
+
+def sample_templates(count=TEMPLATES, seed=0):
+    """Varied interaction answers, with their typed columns parsed once"""
+    rng = random.Random(seed)
+    generator = SampleDataGenerator()
+    templates = []
+    for _ in range(count):
+        record = {
+            'travel_dates': (datetime(2024, 1, 1) + timedelta(days=rng.randrange(730))).strftime('%Y-%m-%d'),
+            'duration': f"{rng.randint(2, 14)} days",
+            'group_info': rng.choice(generator.group_types),
+            'preferences': ", ".join(rng.sample(generator.preferences, rng.randint(1, 3))),
+            'budget': f"${rng.randrange(1000, 20000, 500):,}"
+        }
+        fields = typed_fields(record, '2024-01-01')
+        templates.append((record, fields))
+    return templates
+
+
+def bulk_load(db, count, templates, start=0, batch_size=50000):
+    """Insert count synthetic interactions straight into the table.
+
+    Goes around store_interactions (and so the rollups and activities),
+    which would take minutes at a million rows.
+    """
+    conn = db.connection()
+    created = datetime(2024, 1, 1)
+    for offset in range(start, start + count, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, start + count)):
+            record, fields = templates[i % len(templates)]
+            rows.append((
+                f"session-{i}", record['travel_dates'], record['duration'],
+                record['group_info'], record['preferences'], record['budget'],
+                '[]', '{}', (created + timedelta(seconds=30 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+                *fields.values()
+            ))
+        with conn:
+            conn.executemany('''
+                INSERT INTO interactions (
+                    session_id, travel_dates, duration, group_info, preferences,
+                    budget, conversation_history, generated_itinerary, created_at,
+                    budget_value, duration_days, group_size, travel_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label}: {time.perf_counter() - start:.2f} s")
+    return result
+
+
+def main_benchmark():
+    templates = sample_templates()
+    with tempfile.TemporaryDirectory() as directory:
+        db = DubaiTourismDB(db_name=os.path.join(directory, "analytics.db"))
+        bulk_load(db, ROWS, templates)
+        cache = AnalyticsCache(path=os.path.join(directory, "analytics_cache"))
+        analyzer = InteractionAnalyzer(database=db, cache=cache)
+        print(f"{ROWS:,} interactions")
+
+        timed("Full extract and transform (SELECT *)",
+              lambda: analyzer.transform_data(analyzer.extract_data()))
+        timed("First load_data, building the cache", analyzer.load_data)
+        df = timed("load_data, no new rows", analyzer.load_data)
+
+        bulk_load(db, NEW_ROWS, templates, start=ROWS)
+        df = timed(f"load_data after {NEW_ROWS} new rows", analyzer.load_data)
+        df = timed("load_data again", analyzer.load_data)
+
+        expected = analyzer.transform_data(analyzer.extract_data(columns=ANALYTIC_COLUMNS))
+        pd.testing.assert_frame_equal(df, expected)
+        print("Cached frame matches a full extract and transform")
+
+        with db.connection() as conn:
+            conn.execute('DELETE FROM interactions WHERE id = 1')
+        df = timed("load_data after a delete (full rebuild)", analyzer.load_data)
+        if len(df) != ROWS + NEW_ROWS - 1:
+            raise SystemExit(f"Expected {ROWS + NEW_ROWS - 1} rows after the delete, found {len(df)}")
+        print(cache.stats())
+        db.close()
+
+
+if __name__ == "__main__":
+    main_benchmark()
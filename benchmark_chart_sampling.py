@@ -0,0 +1,102 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import config
+from chart_sampling import downsample, histogram
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+
+def synthetic_history(rows, seed=0):
+    """Group sizes of interactions over two years of travel dates, with a
+    yearly cycle and a few outlying parties: many points per day"""
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 730, rows)
+    size = 3 + 1.5 * np.sin(2 * np.pi * days / 365.25) + rng.normal(0, 1, rows)
+    size[rng.integers(0, rows, 20)] += 25
+    return pd.DataFrame({
+        'ds': pd.Timestamp('2024-01-01') + pd.to_timedelta(days, unit='D'),
+        'y': np.maximum(size, 1).round()
+    })
+
+
+def synthetic_signal(rows, seed=0):
+    """A smooth measurement taken every minute, with noise and short
+    spikes: one point per x"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows)
+    y = 50 + 20 * np.sin(2 * np.pi * t / (rows / 3)) + rng.normal(0, 1, rows)
+    y[rng.integers(0, rows, 20)] += 40
+    return pd.DataFrame({'ds': pd.Timestamp('2024-01-01') + pd.to_timedelta(t, unit='min'), 'y': y})
+
+
+def stride(df, points):
+    """Every n-th row, the naive way to cut a trace down"""
+    rows = df.sort_values('ds', kind='stable')
+    return rows.iloc[::max(len(rows) // points, 1)]
+
+
+def envelope_kept(full, sampled):
+    """Share of each day's range of values the sampled trace still
+    spans, averaged over the days"""
+    full_range = full.groupby('ds')['y'].agg(lambda y: y.max() - y.min())
+    sampled_range = sampled.groupby('ds')['y'].agg(lambda y: y.max() - y.min())
+    return (sampled_range.reindex(full_range.index, fill_value=0) / full_range).mean()
+
+
+def shape_error(full, sampled):
+    """Mean gap between the full trace and the sampled trace linearly
+    interpolated back at every x, relative to the trace's range"""
+    x = full['ds'].astype('datetime64[ns]').astype(np.int64).to_numpy()
+    kept = sampled['ds'].astype('datetime64[ns]').astype(np.int64).to_numpy()
+    gap = np.abs(np.interp(x, kept, sampled['y']) - full['y'].to_numpy()).mean()
+    return gap / (full['y'].max() - full['y'].min())
+
+
+def payload(df):
+    """Chart JSON of one line trace, as sent to the browser, and the
+    seconds to build it"""
+    start = time.perf_counter()
+    spec = go.Figure(go.Scatter(x=df['ds'], y=df['y'], mode='lines')).to_json()
+    return len(spec), time.perf_counter() - start
+
+
+def compare(label, full, score):
+    print(f"\n{label}: {len(full):,} points, budget {config.CHART_MAX_POINTS} points per trace")
+    size, seconds = payload(full)
+    print(f"{'raw':>7}: {len(full):>9,} points, {size / 1e6:6.2f} MB chart JSON built in {seconds:.2f} s")
+    for method, sample in (('stride', lambda: stride(full, config.CHART_MAX_POINTS)),
+                           ('lttb', lambda: downsample(full, 'ds', 'y', method='lttb')),
+                           ('minmax', lambda: downsample(full, 'ds', 'y', method='minmax'))):
+        start = time.perf_counter()
+        sampled = sample()
+        sample_seconds = time.perf_counter() - start
+        size, seconds = payload(sampled)
+        print(f"{method:>7}: {len(sampled):>9,} points, {size / 1e6:6.2f} MB chart JSON built in "
+              f"{sample_seconds + seconds:.2f} s with sampling, keeps the peak "
+              f"{sampled['y'].max() == full['y'].max()}, {score(full, sampled)}")
+        if method != 'stride' and len(sampled) > config.CHART_MAX_POINTS:
+            raise SystemExit(f"{method} kept {len(sampled)} points, over the budget")
+
+
+def main_benchmark():
+    compare("Group sizes by travel date (Seasonal history)", synthetic_history(ROWS),
+            lambda full, sampled: f"keeps {envelope_kept(full, sampled):.0%} of each day's range")
+    compare("Minute-by-minute signal", synthetic_signal(ROWS),
+            lambda full, sampled: f"shape error {shape_error(full, sampled):.1%} of the range")
+
+    full = synthetic_history(ROWS)
+    start = time.perf_counter()
+    bars = histogram(full['y'])
+    print(f"\nHistogram of {len(full):,} group sizes: {len(bars)} bars binned in "
+          f"{time.perf_counter() - start:.3f} s")
+    if bars['count'].sum() != len(full):
+        raise SystemExit("Histogram bars don't add up to the interactions")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,107 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from database import DubaiTourismDB
+from fake_llm import build_sample_itinerary
+from itinerary_parser import parse_itinerary
+
+WRITES = 2000
+
+
+def sample_interaction(number):
+    parsed = parse_itinerary(build_sample_itinerary(5, 3))
+    return {
+        'session_id': f"session-{number}",
+        'travel_dates': "2024-12-20",
+        'duration': "5",
+        'group_info': "family with 2 kids",
+        'preferences': "desert safaris",
+        'budget': "$5000",
+        'conversation_history': ["2024-12-20", "5", "family with 2 kids",
+                                 "desert safaris", "$5000"],
+        'generated_itinerary': {
+            'days': parsed.itinerary(),
+            'recommendations': parsed.recommendation_texts()
+        }
+    }
+
+
+def legacy_store_interaction(db_name, data):
+    """How DubaiTourismDB stored interactions before connection reuse:
+    a new connection per call on a rollback-journal database"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO interactions (
+            session_id, travel_dates, duration, group_info, preferences,
+            budget, conversation_history, generated_itinerary
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        data.get('session_id', 'default'),
+        data.get('travel_dates'),
+        str(data.get('duration')),
+        data.get('group_info'),
+        data.get('preferences'),
+        str(data.get('budget')),
+        json.dumps(data.get('conversation_history', [])),
+        json.dumps(data.get('generated_itinerary', {}))
+    ))
+    conn.commit()
+    conn.close()
+
+
+def create_legacy_db(db_name):
+    conn = sqlite3.connect(db_name)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.execute('''
+        CREATE TABLE interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            travel_dates TEXT,
+            duration TEXT,
+            group_info TEXT,
+            preferences TEXT,
+            budget TEXT,
+            conversation_history TEXT,
+            generated_itinerary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def writes_per_second(store, records):
+    start = time.perf_counter()
+    for record in records:
+        store(record)
+    return len(records) / (time.perf_counter() - start)
+
+
+def main_benchmark():
+    records = [sample_interaction(i) for i in range(WRITES)]
+    print(f"{WRITES} interactions written one commit at a time")
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_db = os.path.join(directory, "legacy.db")
+        create_legacy_db(legacy_db)
+        legacy_rate = writes_per_second(
+            lambda record: legacy_store_interaction(legacy_db, record), records)
+        print(f"Connect per call, rollback journal: {legacy_rate:,.0f} writes/s")
+
+        db = DubaiTourismDB(db_name=os.path.join(directory, "tuned.db"))
+        tuned_rate = writes_per_second(db.store_interaction, records)
+        print(f"Reused connection, WAL: {tuned_rate:,.0f} writes/s")
+        print(f"Speedup: {tuned_rate / legacy_rate:.1f}x")
+
+        stored = len(db.get_interactions())
+        db.close()
+        if stored != WRITES:
+            raise SystemExit(f"Expected {WRITES} rows, found {stored}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,89 @@
+import time
+
+import pandas as pd
+
+from analyze_interactions import InteractionAnalyzer
+from benchmark_analytics_cache import sample_templates
+from interaction_fields import (clear_parse_caches, parse_cache_stats, parse_duration_days,
+                                parse_group_size, parse_number, parse_travel_date, typed_columns)
+
+SIZES = [100_000, 1_000_000]
+
+
+def sample_frame(rows, templates):
+    """Raw interaction rows, as extract_data returns them"""
+    records = [templates[i % len(templates)] for i in range(rows)]
+    return pd.DataFrame({
+        'id': range(1, rows + 1),
+        'duration': [record['duration'] for record, _ in records],
+        'group_info': [record['group_info'] for record, _ in records],
+        'preferences': [record['preferences'] for record, _ in records],
+        'budget': [record['budget'] for record, _ in records],
+        'travel_dates': [record['travel_dates'] for record, _ in records],
+        'created_at': pd.date_range('2024-01-01', periods=rows, freq='30s').strftime('%Y-%m-%d %H:%M:%S'),
+        'budget_value': [fields['budget_value'] for _, fields in records],
+        'duration_days': [fields['duration_days'] for _, fields in records],
+        'group_size': [fields['group_size'] for _, fields in records],
+        'travel_date': [fields['travel_date'] for _, fields in records]
+    })
+
+
+def parse_every_row(df):
+    """How the typed columns were parsed before: every row, one at a time"""
+    return [(parse_number(budget), parse_duration_days(duration),
+             parse_group_size(group_info), parse_travel_date(travel_dates, created_at))
+            for budget, duration, group_info, travel_dates, created_at
+            in zip(df['budget'], df['duration'], df['group_info'],
+                   df['travel_dates'], df['created_at'])]
+
+
+def parse_distinct_values(df):
+    columns = typed_columns(df['budget'].tolist(), df['duration'].tolist(),
+                            df['group_info'].tolist(), df['travel_dates'].tolist(),
+                            df['created_at'].tolist())
+    return list(zip(*columns.values()))
+
+
+def legacy_transform(df):
+    """transform_data before the text columns became categoricals"""
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['travel_dates'] = pd.to_datetime(df['travel_date'])
+    return df
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main_benchmark():
+    templates = sample_templates()
+    analyzer = InteractionAnalyzer()
+    for rows in SIZES:
+        df = sample_frame(rows, templates)
+        print(f"\n{rows:,} rows, {df['group_info'].nunique()} group types, "
+              f"{df['duration'].nunique()} durations, {df['budget'].nunique()} budgets")
+
+        expected, every_row = timed(parse_every_row, df)
+        clear_parse_caches()
+        parsed, distinct = timed(parse_distinct_values, df)
+        if parsed != expected:
+            raise SystemExit("Parsing distinct values disagrees with parsing every row")
+        print(f"Typed columns, parsing every row: {every_row:.2f} s")
+        print(f"Typed columns, parsing distinct values: {distinct:.2f} s ({every_row / distinct:.1f}x)")
+        print("Memo tables: " + ", ".join(
+            f"{column} {stats['currsize']} entries" for column, stats in parse_cache_stats().items()))
+
+        legacy, legacy_seconds = timed(legacy_transform, df.copy())
+        encoded, encoded_seconds = timed(analyzer.transform_data, df.copy())
+        if not legacy['travel_dates'].equals(encoded['travel_dates']):
+            raise SystemExit("Categorical transform disagrees on travel_dates")
+        print(f"transform_data with object columns: {legacy_seconds:.2f} s, "
+              f"{legacy.memory_usage(deep=True).sum() / 1e6:,.0f} MB")
+        print(f"transform_data with categoricals: {encoded_seconds:.2f} s, "
+              f"{encoded.memory_usage(deep=True).sum() / 1e6:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main_benchmark()
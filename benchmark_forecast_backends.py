@@ -0,0 +1,83 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_forecast_warm_start import synthetic_series
+from forecast_backends import FORECAST_COLUMNS, NumpyBackend
+from forecast_demand import ATTRACTION_MODEL_PARAMS, DemandForecaster
+
+HOLDOUT_DAYS = 14
+SYNTHETIC_SERIES = 8
+
+
+def holdout_errors(series, forecast):
+    """Mean absolute error and interval coverage over the held-out days"""
+    actual = series.assign(ds=pd.to_datetime(series['ds'])).tail(HOLDOUT_DAYS)
+    predicted = actual.merge(forecast, on='ds')
+    inside = (predicted['y'] >= predicted['yhat_lower']) & (predicted['y'] <= predicted['yhat_upper'])
+    return (predicted['y'] - predicted['yhat']).abs().mean(), inside.mean()
+
+
+def prophet_forecasts(forecaster, training):
+    forecasts = {}
+    for name, series in training.items():
+        try:
+            model = forecaster.fit_model(series, ATTRACTION_MODEL_PARAMS)
+            forecasts[name] = forecaster.generate_forecast(model, HOLDOUT_DAYS)
+        except Exception as e:
+            forecasts[name] = e
+    return forecasts
+
+
+def compare(forecaster, label, series):
+    """Fit both backends on all but the last HOLDOUT_DAYS of each series,
+    and score them on those days"""
+    training = {name: rows.iloc[:-HOLDOUT_DAYS] for name, rows in series.items()}
+    print(f"\n{label}: {len(series)} series, holding out the last {HOLDOUT_DAYS} days")
+
+    numpy_backend = NumpyBackend()
+    results = {}
+    for backend, run in (('prophet', lambda: prophet_forecasts(forecaster, training)),
+                         ('numpy', lambda: numpy_backend.forecast(training, HOLDOUT_DAYS,
+                                                                  ATTRACTION_MODEL_PARAMS))):
+        start = time.perf_counter()
+        results[backend] = run()
+        seconds = time.perf_counter() - start
+        scored = [holdout_errors(series[name], forecast)
+                  for name, forecast in results[backend].items() if not isinstance(forecast, Exception)]
+        print(f"{backend:>8}: {seconds:.3f} s, {len(scored)} forecast, "
+              f"MAE {np.mean([mae for mae, _ in scored]):.2f}, "
+              f"interval coverage {np.mean([coverage for _, coverage in scored]):.0%}")
+
+    for name, forecast in results['numpy'].items():
+        if isinstance(forecast, Exception):
+            continue
+        if list(forecast.columns) != FORECAST_COLUMNS:
+            raise SystemExit(f"Unexpected forecast columns {list(forecast.columns)}")
+        alone = numpy_backend.forecast({name: training[name]}, HOLDOUT_DAYS, ATTRACTION_MODEL_PARAMS)[name]
+        if not np.allclose(alone['yhat'], forecast['yhat'], atol=1e-6):
+            raise SystemExit(f"Batched and single forecasts of {name} disagree")
+        prophet = results['prophet'].get(name)
+        if not isinstance(prophet, Exception) and not prophet['ds'].equals(forecast['ds'].astype(prophet['ds'].dtype)):
+            raise SystemExit(f"Forecast days of {name} differ from Prophet's")
+    print("NumPy forecasts cover the same days as Prophet's, batched and alone")
+
+
+def main_benchmark():
+    logging.getLogger('cmdstanpy').disabled = True
+    logging.getLogger('prophet').setLevel(logging.ERROR)
+    forecaster = DemandForecaster()
+
+    df = forecaster.extract_attraction_data()
+    lengths = df.groupby('attraction').size()
+    compare(forecaster, "Bundled attractions",
+            {attraction: df[df['attraction'] == attraction][['ds', 'y']].reset_index(drop=True)
+             for attraction in lengths[lengths > 2 * HOLDOUT_DAYS].index})
+    compare(forecaster, "Synthetic attractions",
+            {f"synthetic {seed}": synthetic_series(seed) for seed in range(SYNTHETIC_SERIES)})
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,93 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast_demand import ATTRACTION_MODEL_PARAMS, DemandForecaster, warm_start_init
+
+SYNTHETIC_SERIES = 8
+SYNTHETIC_DAYS = 730
+HORIZON = 30
+
+
+def synthetic_series(seed, days=SYNTHETIC_DAYS):
+    """Daily visits with a trend, weekly and yearly seasonality and noise"""
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range('2023-01-01', periods=days, freq='D')
+    t = np.arange(days)
+    y = (20 + rng.uniform(-0.01, 0.02) * t
+         + 4 * np.sin(2 * np.pi * t / 365.25 + rng.uniform(0, 2 * np.pi))
+         + 2 * (ds.dayofweek >= 4)
+         + rng.normal(0, 1.5, days))
+    return pd.DataFrame({'ds': ds, 'y': np.maximum(y, 1).round()})
+
+
+def timed_fit(forecaster, series, init=None):
+    start = time.perf_counter()
+    model = forecaster.fit_model(series, ATTRACTION_MODEL_PARAMS, init)
+    return model, time.perf_counter() - start
+
+
+def horizon_yhat(forecaster, model, periods=HORIZON):
+    return forecaster.generate_forecast(model, periods)['yhat'].tail(HORIZON).to_numpy()
+
+
+def drift(yhat, reference):
+    """Largest and mean gap between two forecasts of the same days,
+    relative to the reference forecast's mean"""
+    gap = np.abs(yhat - reference) / np.abs(reference).mean()
+    return gap.max(), gap.mean()
+
+
+def describe(drifts):
+    return (f"max {max(d[0] for d in drifts):.2%}, "
+            f"mean {np.mean([d[1] for d in drifts]):.2%} of the forecast level")
+
+
+def compare(forecaster, label, series_list):
+    """Refit each series after one new day, warm and cold"""
+    cold_seconds, warm_seconds, drifts, day_over_day = [], [], [], []
+    for series in series_list:
+        previous, _ = timed_fit(forecaster, series.iloc[:-1])
+        init = warm_start_init(previous, series)
+        if init is None:
+            raise SystemExit("Appending a day should allow a warm start")
+        if warm_start_init(previous, series.iloc[1:]) is not None:
+            raise SystemExit("A moved window start should force a cold fit")
+
+        cold, seconds = timed_fit(forecaster, series)
+        cold_seconds.append(seconds)
+        warm, seconds = timed_fit(forecaster, series, init)
+        warm_seconds.append(seconds)
+        cold_yhat = horizon_yhat(forecaster, cold)
+        drifts.append(drift(horizon_yhat(forecaster, warm), cold_yhat))
+        # How much a cold refit moves the forecast after one day, for scale
+        day_over_day.append(drift(horizon_yhat(forecaster, previous, HORIZON + 1), cold_yhat))
+
+    cold_total, warm_total = sum(cold_seconds), sum(warm_seconds)
+    print(f"\n{label}: {len(series_list)} series of {len(series_list[0])} days")
+    print(f"Cold refits: {cold_total:.2f} s ({cold_total / len(series_list) * 1000:.0f} ms each)")
+    print(f"Warm refits: {warm_total:.2f} s ({warm_total / len(series_list) * 1000:.0f} ms each, "
+          f"{cold_total / warm_total:.1f}x)")
+    print(f"Forecast drift over {HORIZON} days, warm vs cold refit: {describe(drifts)}")
+    print(f"Forecast change over {HORIZON} days, previous day's fit vs cold refit: {describe(day_over_day)}")
+
+
+def main_benchmark():
+    logging.getLogger('cmdstanpy').disabled = True
+    logging.getLogger('prophet').setLevel(logging.ERROR)
+    forecaster = DemandForecaster()
+
+    df = forecaster.extract_attraction_data()
+    lengths = df.groupby('attraction').size()
+    attractions = lengths[lengths == lengths.max()].index
+    compare(forecaster, "Bundled attractions",
+            [df[df['attraction'] == attraction][['ds', 'y']].reset_index(drop=True)
+             for attraction in attractions])
+    compare(forecaster, "Synthetic attractions",
+            [synthetic_series(seed) for seed in range(SYNTHETIC_SERIES)])
+
+
+if __name__ == "__main__":
+    main_benchmark()
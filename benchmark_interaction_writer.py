@@ -0,0 +1,76 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmark_database_writes import sample_interaction
+from database import DubaiTourismDB
+from interaction_writer import InteractionWriter
+
+REQUESTS = 5000
+CONCURRENCY = 200
+
+
+async def handle_request(store, record, semaphore, latencies):
+    async with semaphore:
+        # Stands in for the rest of the request's work
+        await asyncio.sleep(0.001)
+        start = time.perf_counter()
+        store(record)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(store, records):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(handle_request(store, record, semaphore, latencies)
+                           for record in records))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(label, elapsed, latencies):
+    print(f"\n{label}:")
+    print(f"Requests per second: {REQUESTS / elapsed:,.0f}")
+    print(f"Time spent storing per request: p50 {percentile(latencies, 0.5) * 1000:.3f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms")
+
+
+async def write_behind(db, records):
+    writer = InteractionWriter(database=db)
+    await writer.start()
+    elapsed, latencies = await run(writer.submit, records)
+    await writer.stop()
+    return elapsed, latencies, writer.stats()
+
+
+def main_benchmark():
+    records = [sample_interaction(i) for i in range(REQUESTS)]
+    print(f"{REQUESTS} requests, {CONCURRENCY} in flight")
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = DubaiTourismDB(db_name=os.path.join(directory, "inline.db"))
+        elapsed, latencies = asyncio.run(run(db.store_interaction, records))
+        report("Commit inside the request", elapsed, latencies)
+        db.close()
+
+        db = DubaiTourismDB(db_name=os.path.join(directory, "queued.db"))
+        elapsed, latencies, stats = asyncio.run(write_behind(db, records))
+        report("Write-behind queue", elapsed, latencies)
+        print(f"Commits: {stats['batches']} ({stats['avg_batch_size']:.1f} rows each), "
+              f"flush latency avg {stats['avg_flush_ms']:.2f} ms, "
+              f"max {stats['max_flush_ms']:.2f} ms")
+
+        stored = len(db.get_interactions())
+        db.close()
+        if stored != REQUESTS:
+            raise SystemExit(f"Expected {REQUESTS} rows after shutdown, found {stored}")
+        print(f"All {stored} interactions stored after shutdown")
+
+
+if __name__ == "__main__":
+    main_benchmark()
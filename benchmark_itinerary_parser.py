@@ -0,0 +1,219 @@
+import random
+import timeit
+
+from fake_llm import build_sample_itinerary
+from itinerary_parser import (DayRecord, HotelRecord, ItineraryParser, ParsedItinerary,
+                              parse_itinerary)
+
+LARGE_DAYS = 30
+LARGE_ACTIVITIES_PER_DAY = 8
+REPEAT = 20
+STREAM_CHUNK_SIZE = 16
+FUZZ_SEED = 2024
+FUZZ_CASES = 500
+
+
+def legacy_parse(content):
+    """The split-based parsing create_itinerary used before ItineraryParser"""
+    days = []
+    current_day = None
+    current_activities = []
+    hotel_suggestion = None
+
+    if "Hotel Suggestion:" in content:
+        hotel_part, rest = content.split("Day 1:", 1)
+        hotel_lines = [
+            line.strip() for line in hotel_part.split('\n')
+            if line.strip()
+        ]
+        hotel_data = {}
+        for line in hotel_lines:
+            if line.startswith('- '):
+                key, value = line[2:].split(':', 1)
+                hotel_data[key.strip()] = value.strip()
+        hotel_suggestion = hotel_data
+        content = "Day 1:" + rest
+
+    if "Recommendations:" in content:
+        main_content, rec_content = content.split("Recommendations:")
+    else:
+        main_content, rec_content = content, ""
+
+    lines = main_content.split('\n')
+    current_activity = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if current_activity:
+                current_activities.append('\n'.join(current_activity))
+                current_activity = []
+            continue
+
+        if line.startswith("Day"):
+            if current_day and current_activities:
+                days.append({"day": current_day, "activities": current_activities})
+            try:
+                current_day = int(line.split()[1].replace(":", ""))
+                current_activities = []
+                current_activity = []
+            except:
+                continue
+        elif line.startswith("-"):
+            if current_activity:
+                current_activities.append('\n'.join(current_activity))
+                current_activity = []
+            current_activity = [line]
+        elif current_activity:
+            current_activity.append(line)
+
+    if current_activity:
+        current_activities.append('\n'.join(current_activity))
+    if current_day and current_activities:
+        days.append({"day": current_day, "activities": current_activities})
+
+    recommendations = []
+    if rec_content:
+        recommendations = [
+            line.strip("- ").strip()
+            for line in rec_content.split('\n')
+            if line.strip() and line.strip().startswith("-")
+        ]
+
+    return hotel_suggestion, days, recommendations
+
+
+def parse_in_chunks(text, rng):
+    """Parse text fed in random chunk sizes, as it arrives when streaming"""
+    parser = ItineraryParser()
+    parsed = ParsedItinerary()
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 64)
+        for record in parser.feed(text[position:position + size]):
+            parsed.add(record)
+        position += size
+    for record in parser.close():
+        parsed.add(record)
+    return parsed
+
+
+# Format drift seen in model output, each applied to the canonical text
+DRIFTS = {
+    "no blank lines": lambda text: "\n".join(line for line in text.split("\n") if line.strip()),
+    "bold day headers": lambda text: "\n".join(
+        f"**{line.rstrip(':')}**" if line.startswith("Day ") else line
+        for line in text.split("\n")),
+    "heading day headers": lambda text: "\n".join(
+        f"### {line} Exploring Dubai" if line.startswith("Day ") else line
+        for line in text.split("\n")),
+    "markdown sections": lambda text: text.replace(
+        "Hotel Suggestion:", "## Hotel Suggestion").replace(
+        "Recommendations:", "**Recommendations:**"),
+    "star bullets": lambda text: text.replace("\n- ", "\n* "),
+    "bold labels": lambda text: "\n".join(
+        "- **{}:**{}".format(*line[2:].split(":", 1)) if line.startswith("- ") else line
+        for line in text.split("\n")),
+    "crlf line endings": lambda text: text.replace("\n", "\r\n"),
+    "indented": lambda text: "\n".join("   " + line + "  " for line in text.split("\n")),
+}
+
+
+def build_fuzz_corpus(seed=FUZZ_SEED, cases=FUZZ_CASES):
+    """Deterministic corpus of (text, days, activities per day) with mixed drift"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(cases):
+        num_days = rng.randint(1, 14)
+        activities = rng.randint(1, 6)
+        text = build_sample_itinerary(num_days, activities)
+        for name in rng.sample(sorted(DRIFTS), rng.randint(0, 3)):
+            text = DRIFTS[name](text)
+        corpus.append((text, num_days, activities))
+    return corpus
+
+
+def run_fuzz():
+    rng = random.Random(FUZZ_SEED)
+    failures = 0
+    for text, num_days, activities in build_fuzz_corpus():
+        whole = parse_itinerary(text)
+        streamed = parse_in_chunks(text, rng)
+        ok = (whole == streamed
+              and whole.hotel is not None and whole.hotel.name
+              and len(whole.days) == num_days
+              and all(len(day.activities) == activities for day in whole.days)
+              and all(None not in (a.time, a.title, a.description, a.location, a.price)
+                      for day in whole.days for a in day.activities)
+              and len(whole.recommendations) == 4)
+        failures += not ok
+    print(f"Fuzz corpus: {FUZZ_CASES} drifted outputs, {failures} failures")
+    return failures
+
+
+def check_legacy_equivalence():
+    text = build_sample_itinerary(7, 4)
+    hotel, days, recommendations = legacy_parse(text)
+    parsed = parse_itinerary(text)
+    same = (hotel == parsed.hotel_suggestion() and days == parsed.itinerary()
+            and recommendations == parsed.recommendation_texts())
+    print(f"Matches legacy output on the canonical format: {same}")
+    return same
+
+
+def time_per_call(function):
+    return min(timeit.repeat(function, number=REPEAT, repeat=5)) / REPEAT
+
+
+def run_benchmark():
+    text = build_sample_itinerary(LARGE_DAYS, LARGE_ACTIVITIES_PER_DAY)
+    print(f"\nLarge output: {LARGE_DAYS} days x {LARGE_ACTIVITIES_PER_DAY} activities, "
+          f"{len(text):,} characters")
+
+    # What create_itinerary builds from a whole response
+    def whole_response():
+        parsed = parse_itinerary(text)
+        return parsed.hotel_suggestion(), parsed.itinerary(), parsed.recommendation_texts()
+
+    legacy_time = time_per_call(lambda: legacy_parse(text))
+    new_time = time_per_call(whole_response)
+    print("\nWhole response, as create_itinerary parses it:")
+    print(f"Legacy split-based parse: {legacy_time * 1000:.3f} ms")
+    print(f"ItineraryParser: {new_time * 1000:.3f} ms")
+    print(f"Speedup: {legacy_time / new_time:.2f}x")
+
+    # Progressive output means parsing after every streamed chunk: the legacy
+    # code has to re-parse everything received so far, the parser only the
+    # new chunk. The parser side does what stream_itinerary_events does.
+    chunks = [text[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(text), STREAM_CHUNK_SIZE)]
+
+    def legacy_streaming():
+        received = ""
+        for chunk in chunks:
+            received += chunk
+            if "Day 1:" in received:
+                legacy_parse(received)
+
+    def incremental_streaming():
+        parser = ItineraryParser()
+        parsed = ParsedItinerary()
+        for records in [parser.feed(chunk) for chunk in chunks] + [parser.close()]:
+            for record in records:
+                parsed.add(record)
+                if isinstance(record, (HotelRecord, DayRecord)):
+                    record.to_dict()
+        return parsed.itinerary(), parsed.recommendation_texts()
+
+    legacy_time = min(timeit.repeat(legacy_streaming, number=1, repeat=3))
+    new_time = min(timeit.repeat(incremental_streaming, number=1, repeat=3))
+    print(f"\nStreamed in {len(chunks)} chunks of {STREAM_CHUNK_SIZE} characters, "
+          f"as the streaming endpoint parses it:")
+    print(f"Legacy re-parse per chunk: {legacy_time * 1000:.1f} ms")
+    print(f"ItineraryParser: {new_time * 1000:.1f} ms")
+    print(f"Speedup: {legacy_time / new_time:.0f}x")
+
+
+if __name__ == "__main__":
+    check_legacy_equivalence()
+    run_fuzz()
+    run_benchmark()
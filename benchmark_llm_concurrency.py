@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+
+# main.py reads the key at import time; the benchmark never calls OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-placeholder")
+
+from langchain.chains import LLMChain
+
+import main
+from fake_llm import LatencyFakeChatModel
+
+CONCURRENT_SESSIONS = 50
+REQUESTS_PER_SESSION = 2
+LLM_LATENCY_SECONDS = 0.2
+
+
+class BlockingChain:
+    """Reproduces the old behaviour: a synchronous invoke on the event loop"""
+    def __init__(self, chain):
+        self.chain = chain
+
+    async def ainvoke(self, inputs):
+        return self.chain.invoke(inputs)
+
+
+class CountingChain:
+    """Counts the generations it is asked for"""
+    def __init__(self, chain):
+        self.chain = chain
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        return await self.chain.ainvoke(inputs)
+
+
+class NoCache:
+    """Itinerary cache that never hits, so every itinerary is generated"""
+    async def get_async(self, state):
+        return None
+
+    async def put_async(self, state, payload):
+        pass
+
+
+def completed_state(session_number):
+    return {
+        "travel_dates": "2024-12-20",
+        "duration": "5",
+        "group_info": "family with 2 kids",
+        "preferences": "desert safaris",
+        "budget": "5000",
+        "conversation_history": [f"session {session_number}"]
+    }
+
+
+async def session(session_number):
+    for _ in range(REQUESTS_PER_SESSION):
+        await main.generate_itinerary_text(completed_state(session_number))
+
+
+async def probe_cheap_requests(stop_event, latencies, interval=0.05):
+    """Time the instant greeting stage while generations are in flight.
+
+    The probe sleeps for `interval` and then issues a cheap request, so any
+    time beyond the interval is time the event loop spent unable to serve it.
+    """
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        await main.create_itinerary(main.UserInput(preferences="SYSTEM:LANGUAGE=en"))
+        latencies.append(time.perf_counter() - start - interval)
+
+
+async def run(chain):
+    main.itinerary_chain = chain
+    main.generation_semaphore = asyncio.Semaphore(main.config.LLM_MAX_CONCURRENCY)
+    stop_event = asyncio.Event()
+    latencies = []
+    probe = asyncio.create_task(probe_cheap_requests(stop_event, latencies))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(CONCURRENT_SESSIONS)))
+    elapsed = time.perf_counter() - start
+
+    stop_event.set()
+    await probe
+    return elapsed, max(latencies)
+
+
+async def completed_session_generations(chain):
+    """Generations for a full questionnaire followed by two more messages"""
+    main.itinerary_chain = CountingChain(chain)
+    main.itinerary_cache = NoCache()
+    main.store_itinerary_interaction = lambda *args: None
+    main.generation_semaphore = asyncio.Semaphore(main.config.LLM_MAX_CONCURRENCY)
+    session_id = None
+    for answer in ("2024-12-20", "5", "family with 2 kids", "desert safaris", "5000",
+                   "thanks!", "2025-03-01"):
+        response = await main.create_itinerary(main.UserInput(preferences=answer,
+                                                              session_id=session_id))
+        session_id = response.session_id
+    return main.itinerary_chain.calls, response.itinerary[0]["activities"][0]
+
+
+def main_benchmark():
+    fake_chain = LLMChain(llm=LatencyFakeChatModel(latency=LLM_LATENCY_SECONDS),
+                          prompt=main.uae_expert_prompt)
+    total = CONCURRENT_SESSIONS * REQUESTS_PER_SESSION
+
+    print(f"{CONCURRENT_SESSIONS} sessions x {REQUESTS_PER_SESSION} generations, "
+          f"fake LLM latency {LLM_LATENCY_SECONDS}s, "
+          f"concurrency cap {main.config.LLM_MAX_CONCURRENCY}")
+
+    for label, chain in [("Before (blocking invoke)", BlockingChain(fake_chain)),
+                         ("After (async, bounded)", fake_chain)]:
+        elapsed, worst_probe = asyncio.run(run(chain))
+        print(f"\n{label}:")
+        print(f"Total time: {elapsed:.2f}s")
+        print(f"Requests per second: {total / elapsed:.1f}")
+        print(f"Worst cheap-stage latency: {worst_probe * 1000:.0f} ms")
+
+    # A message after the itinerary starts a new questionnaire, whose next
+    # question is the trip's duration
+    calls, reply = asyncio.run(completed_session_generations(fake_chain))
+    if calls != 1 or "How many days" not in reply:
+        raise SystemExit(f"Messages after the itinerary made {calls} generations, replied {reply!r}")
+    print("\nMessages after the itinerary start a new questionnaire without calling the LLM")
+
+
+if __name__ == "__main__":
+    main_benchmark()
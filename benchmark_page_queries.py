@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from analytics_cache import AnalyticsCache
+from analyze_interactions import InteractionAnalyzer
+from benchmark_analytics_cache import bulk_load, sample_templates
+from database import DubaiTourismDB
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+REPEATS = 3
+
+# What each dashboard page reads: its columns and query() window, and the
+# same selection made in pandas on the full frame
+PAGES = {
+    'Overview (latest 30)': (
+        ['created_at', 'budget_value'], dict(order_by='created_at', limit=30),
+        lambda df: df.sort_values(['created_at', 'id']).tail(30)),
+    'Real-Time (30 days of travel dates)': (
+        ['travel_dates', 'group_size', 'budget_value', 'preferences', 'group_info'],
+        dict(travel_dates=('2024-06-01', '2024-06-30')),
+        lambda df: df[df['travel_dates'].between('2024-06-01', '2024-06-30')]),
+    'Seasonal (two columns, every row)': (
+        ['travel_dates', 'group_size'], {}, lambda df: df),
+}
+
+
+def best_of(function):
+    """Fastest of REPEATS runs, and the last result"""
+    seconds = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), result
+
+
+def megabytes(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def main_benchmark():
+    templates = sample_templates()
+    with tempfile.TemporaryDirectory() as directory:
+        db = DubaiTourismDB(db_name=os.path.join(directory, "analytics.db"))
+        bulk_load(db, ROWS, templates)
+        cache = AnalyticsCache(path=os.path.join(directory, "analytics_cache"))
+        analyzer = InteractionAnalyzer(database=db, cache=cache)
+        analyzer.load_data()
+        print(f"{ROWS:,} interactions, best of {REPEATS} runs")
+
+        full_seconds, full = best_of(analyzer.load_data)
+        print(f"load_data (warm analytics cache): {full_seconds:.3f} s, {megabytes(full):.1f} MB")
+        for page, (columns, window, select) in PAGES.items():
+            filter_seconds, expected = best_of(lambda: select(full)[columns])
+            query_seconds, df = best_of(lambda: analyzer.query(columns, **window))
+            pd.testing.assert_frame_equal(df.reset_index(drop=True), expected.reset_index(drop=True),
+                                          check_categorical=False)
+            print(f"{page}: {len(df):,} rows")
+            print(f"  load_data + pandas filter: {full_seconds + filter_seconds:.3f} s, "
+                  f"{megabytes(full):.1f} MB loaded")
+            print(f"  query():                   {query_seconds:.3f} s, {megabytes(df):.1f} MB loaded")
+        print("Query results match the filtered full frame")
+        db.close()
+
+
+if __name__ == "__main__":
+    main_benchmark()
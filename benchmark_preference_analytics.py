@@ -0,0 +1,188 @@
+import sys
+import time
+from collections import Counter
+from itertools import combinations
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from analyze_interactions import InteractionAnalyzer
+from benchmark_analytics_cache import sample_templates
+from benchmark_field_parsing import sample_frame
+from preference_matrix import PreferenceMatrix
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+# The analyses as they were before the exploded preference table: iterrows
+# loops and a filter per group
+
+
+def legacy_analyze_preferences(df):
+    """Analyze user preferences in detail"""
+    # Extract all preferences
+    all_preferences = []
+    for prefs in df['preferences'].dropna():
+        all_preferences.extend([p.strip() for p in prefs.split(',')])
+
+    # Count preferences
+    preference_counts = Counter(all_preferences)
+
+    # Calculate percentages
+    total_preferences = sum(preference_counts.values())
+    preference_percentages = {k: (v/total_preferences)*100 for k, v in preference_counts.items()}
+
+    # Analyze preferences by group type
+    preferences_by_group = {}
+    for _, row in df.iterrows():
+        if pd.notna(row['group_info']) and pd.notna(row['preferences']):
+            group = row['group_info']
+            prefs = [p.strip() for p in row['preferences'].split(',')]
+            if group not in preferences_by_group:
+                preferences_by_group[group] = []
+            preferences_by_group[group].extend(prefs)
+
+    # Convert to percentage for each group
+    preferences_by_group_pct = {}
+    for group, prefs in preferences_by_group.items():
+        total = len(prefs)
+        counts = Counter(prefs)
+        preferences_by_group_pct[group] = {k: (v/total)*100 for k, v in counts.items()}
+
+    return {
+        'preference_counts': dict(preference_counts),
+        'preference_percentages': preference_percentages,
+        'preferences_by_group': preferences_by_group_pct
+    }
+
+
+def legacy_analyze_preference_correlations(df):
+    """Analyze correlations between preferences and other factors"""
+    correlations = {}
+
+    # Analyze preference vs budget
+    budget_by_preference = {}
+    for _, row in df.iterrows():
+        if pd.notna(row['preferences']) and pd.notna(row['budget_value']):
+            prefs = [p.strip() for p in row['preferences'].split(',')]
+            for pref in prefs:
+                if pref not in budget_by_preference:
+                    budget_by_preference[pref] = []
+                budget_by_preference[pref].append(row['budget_value'])
+
+    # Calculate average budget for each preference
+    correlations['avg_budget_by_preference'] = {
+        pref: sum(budgets)/len(budgets)
+        for pref, budgets in budget_by_preference.items()
+    }
+
+    # Visualize budget vs preference correlation
+    plt.figure(figsize=(12, 6))
+    avg_budgets = correlations['avg_budget_by_preference']
+    plt.bar(avg_budgets.keys(), avg_budgets.values())
+    plt.title('Average Budget by Preference')
+    plt.xlabel('Preference')
+    plt.ylabel('Average Budget (USD)')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    plt.savefig('budget_by_preference.png')
+    plt.close()
+
+    return correlations
+def legacy_analyze_group_patterns(df):
+    """Analyze patterns in group types and their behaviors"""
+    group_patterns = {}
+
+    # Average duration by group type
+    group_duration = df.groupby('group_info')['duration_days'].mean()
+    group_patterns['avg_duration'] = group_duration.to_dict()
+
+    # Average budget by group type
+    group_budget = df.groupby('group_info')['budget_value'].mean()
+    group_patterns['avg_budget'] = group_budget.to_dict()
+
+    # Most common preferences by group type
+    group_preferences = {}
+    for group in df['group_info'].unique():
+        group_df = df[df['group_info'] == group]
+        all_prefs = []
+        for prefs in group_df['preferences'].dropna():
+            all_prefs.extend([p.strip() for p in prefs.split(',')])
+        group_preferences[group] = Counter(all_prefs).most_common(3)
+
+    group_patterns['top_preferences'] = group_preferences
+
+    return group_patterns
+
+
+ANALYSES = [
+    ('analyze_preferences', legacy_analyze_preferences),
+    ('analyze_preference_correlations', legacy_analyze_preference_correlations),
+    ('analyze_group_patterns', legacy_analyze_group_patterns)
+]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def same(result, expected):
+    """Equal values, types and dict order"""
+    if isinstance(expected, dict):
+        return (isinstance(result, dict)
+                and [repr(key) for key in result] == [repr(key) for key in expected]
+                and all(same(result[key], value) for key, value in zip(result, expected.values())))
+    if isinstance(expected, (list, tuple)):
+        return (type(result) is type(expected) and len(result) == len(expected)
+                and all(same(a, b) for a, b in zip(result, expected)))
+    return type(result) is type(expected) and (result == expected or result != result and expected != expected)
+
+
+def compare(analyzer, df, label):
+    print(f"\n{label}")
+    for name, legacy in ANALYSES:
+        expected, legacy_seconds = timed(legacy, df)
+        result, seconds = timed(getattr(analyzer, name), df)
+        if not same(result, expected):
+            raise SystemExit(f"{name} differs from the loop-based version")
+        print(f"{name}: {legacy_seconds:.2f} s -> {seconds:.2f} s "
+              f"({legacy_seconds / seconds:.0f}x), identical results")
+
+
+def count_pairs(df):
+    """Co-occurrence counted the straightforward way, pair by pair"""
+    pairs = Counter()
+    for prefs in df['preferences'].dropna():
+        picked = sorted(set(p.strip() for p in prefs.split(',')) - {''})
+        pairs.update(combinations(picked, 2))
+    return pairs
+
+
+def compare_associations(analyzer, df):
+    matrix, build_seconds = timed(PreferenceMatrix, df['preferences'])
+    report, report_seconds = timed(matrix.associations)
+    expected, loop_seconds = timed(count_pairs, df)
+    together = {(a, b): n for a, b, n in zip(report['preference'], report['also_picks'], report['together'])
+                if a < b}
+    if together != dict(expected):
+        raise SystemExit("Co-occurrence counts differ from counting pairs row by row")
+    print(f"Co-occurrence report: counting pairs row by row {loop_seconds:.2f} s, "
+          f"preference matrix {build_seconds:.2f} s to build + {report_seconds:.3f} s "
+          f"for the report ({len(report):,} pairs), identical counts")
+
+
+def main_benchmark():
+    analyzer = InteractionAnalyzer()
+    df = analyzer.load_data()
+    compare(analyzer, df, f"Bundled database ({len(df):,} rows)")
+    compare_associations(analyzer, df)
+    df = analyzer.transform_data(sample_frame(ROWS, sample_templates()))
+    compare(analyzer, df, f"{ROWS:,} synthetic rows")
+    compare_associations(analyzer, df)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+from analytics_cache import AnalyticsCache
+from analyze_interactions import InteractionAnalyzer
+from benchmark_analytics_cache import bulk_load, sample_templates
+from database import DubaiTourismDB
+from realtime_tail import TAIL_COLUMNS, UpcomingTail
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+# Sample travel dates span 2024 and 2025
+TODAY = date(2024, 6, 1)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main_benchmark():
+    templates = sample_templates()
+    with tempfile.TemporaryDirectory() as directory:
+        db = DubaiTourismDB(db_name=os.path.join(directory, "realtime.db"))
+        bulk_load(db, ROWS, templates)
+        analyzer = InteractionAnalyzer(database=db, cache=AnalyticsCache(
+            path=os.path.join(directory, "analytics_cache")))
+        analyzer.load_data()
+        tail = UpcomingTail(analyzer)
+        print(f"{ROWS:,} interactions, window of {tail.days} travel days from {TODAY}")
+
+        _, seconds = timed(lambda: analyzer.load_data()[TAIL_COLUMNS])
+        print(f"Old page, full load (warm analytics cache): {seconds:.3f} s per refresh")
+        rows, seconds = timed(lambda: tail.refresh(TODAY))
+        print(f"First refresh, reading the window: {seconds:.3f} s, {rows:,} rows")
+
+        stored = ROWS
+        for new_rows in (0, 10, 1000, 10000):
+            bulk_load(db, new_rows, templates, start=stored)
+            stored += new_rows
+            rows, seconds = timed(lambda: tail.refresh(TODAY))
+            print(f"Refresh after {new_rows:>6,} new interactions: {seconds:.3f} s, {rows:,} in the window")
+
+        check(analyzer, tail)
+        print("Rolling aggregates match reading the window again")
+
+        # An older interaction in the window is deleted
+        start, end = tail.window(TODAY)
+        with db.connection() as conn:
+            conn.execute('DELETE FROM interactions WHERE id = (SELECT MIN(id) FROM interactions '
+                         'WHERE travel_date BETWEEN ? AND ?)', (start.isoformat(), end.isoformat()))
+        rows, seconds = timed(lambda: tail.refresh(TODAY))
+        check(analyzer, tail)
+        print(f"Refresh after deleting an interaction in the window: {seconds:.3f} s, "
+              f"window read again ({rows:,} rows), aggregates match")
+        db.close()
+
+
+def check(analyzer, tail):
+    expected = analyzer.query(TAIL_COLUMNS, travel_dates=tail.window(TODAY))
+    upcoming = tail.snapshot()
+    if (upcoming['bookings'], upcoming['visitors']) != (len(expected), expected['group_size'].sum()):
+        raise SystemExit("Rolling aggregates differ from reading the window again")
+
+
+if __name__ == "__main__":
+    main_benchmark()
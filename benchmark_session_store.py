@@ -0,0 +1,151 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from session_store import InMemorySessionStore, SQLiteSessionStore, new_conversation_state
+
+WORKERS = 4
+CONVERSATIONS = 2000
+BATCHES_PER_ROUND = 16
+# The answers a conversation collects, one per turn
+FIELDS = ["travel_dates", "duration", "group_info", "preferences", "budget"]
+# Sessions sent several turns at once, from every worker
+RACED_SESSIONS = 50
+RACED_TURNS = 8
+
+store = None
+
+
+def init_worker(db_name):
+    global store
+    store = SQLiteSessionStore(db_name=db_name)
+
+
+async def apply_turns(batch):
+    """Handle one turn for each (conversation, session_id, turn) in batch"""
+    session_ids = []
+    for conversation, session_id, turn in batch:
+        async with store.session(session_id) as (session_id, state):
+            state[FIELDS[turn]] = f"{conversation}-{turn}"
+            store.append_history(state, f"answer {turn}")
+            state.setdefault("served_by", []).append(os.getpid())
+        session_ids.append(session_id)
+    return session_ids
+
+
+def run_turns(batch):
+    return asyncio.run(apply_turns(batch))
+
+
+async def apply_concurrent_turns(batch):
+    """Handle all (session_id, turn) in batch at once, each turn taking a
+    moment as if waiting on the LLM"""
+    async def turn(session_id, number):
+        async with store.session(session_id) as (_, state):
+            await asyncio.sleep(0.005)
+            store.append_history(state, f"turn {number}")
+
+    await asyncio.gather(*(turn(session_id, number) for session_id, number in batch))
+
+
+def run_concurrent_turns(batch):
+    asyncio.run(apply_concurrent_turns(batch))
+
+
+def race_sessions(pool, db_name):
+    """Send RACED_TURNS turns to each of RACED_SESSIONS sessions at the
+    same time through all workers. Returns the sessions that kept every
+    turn and the turns per second."""
+    sessions = SQLiteSessionStore(db_name=db_name)
+    session_ids = [f"raced-{i}" for i in range(RACED_SESSIONS)]
+    for session_id in session_ids:
+        sessions.save(session_id, new_conversation_state())
+    turns = [(session_id, number) for session_id in session_ids for number in range(RACED_TURNS)]
+    random.Random(7).shuffle(turns)
+    start = time.perf_counter()
+    pool.map(run_concurrent_turns, [turns[i::WORKERS] for i in range(WORKERS)], chunksize=1)
+    elapsed = time.perf_counter() - start
+    intact = sum(
+        sorted(sessions.load(session_id)["conversation_history"])
+        == sorted(f"turn {number}" for number in range(RACED_TURNS))
+        for session_id in session_ids)
+    return intact, len(turns) / elapsed
+
+
+def play_conversations(map_batches):
+    """Run every conversation turn by turn; each round's turns are shuffled
+    into batches so consecutive turns of a conversation land on different
+    workers. Returns the session IDs and turns per second."""
+    rng = random.Random(7)
+    session_ids = [None] * CONVERSATIONS
+    start = time.perf_counter()
+    for turn in range(len(FIELDS)):
+        order = list(range(CONVERSATIONS))
+        rng.shuffle(order)
+        batches = [[(c, session_ids[c], turn) for c in order[i::BATCHES_PER_ROUND]]
+                   for i in range(BATCHES_PER_ROUND)]
+        for batch, returned in zip(batches, map_batches(batches)):
+            for (conversation, _, _), session_id in zip(batch, returned):
+                session_ids[conversation] = session_id
+    elapsed = time.perf_counter() - start
+    return session_ids, CONVERSATIONS * len(FIELDS) / elapsed
+
+
+def check_conversations(check_store, session_ids):
+    """Count conversations that kept every answer, and those served by several workers"""
+    intact = shared = 0
+    for conversation, session_id in enumerate(session_ids):
+        state = check_store.load(session_id)
+        if state is None:
+            continue
+        answers = [state[field] for field in FIELDS]
+        intact += (answers == [f"{conversation}-{turn}" for turn in range(len(FIELDS))]
+                   and len(state["conversation_history"]) == len(FIELDS))
+        shared += len(set(state["served_by"])) > 1
+    return intact, shared
+
+
+def main_benchmark():
+    global store
+    print(f"{CONVERSATIONS} conversations x {len(FIELDS)} turns")
+
+    store = InMemorySessionStore(max_sessions=CONVERSATIONS * 2)
+    _, memory_rate = play_conversations(lambda batches: map(run_turns, batches))
+    print(f"In-memory, 1 worker: {memory_rate:,.0f} turns/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "single.db")
+        init_worker(db_name)
+        session_ids, single_rate = play_conversations(
+            lambda batches: map(run_turns, batches))
+        intact, _ = check_conversations(store, session_ids)
+        print(f"SQLite, 1 worker: {single_rate:,.0f} turns/s "
+              f"({intact}/{CONVERSATIONS} conversations intact)")
+
+        db_name = os.path.join(directory, "shared.db")
+        SQLiteSessionStore(db_name=db_name)
+        with multiprocessing.Pool(WORKERS, initializer=init_worker,
+                                  initargs=(db_name,)) as pool:
+            session_ids, multi_rate = play_conversations(
+                lambda batches: pool.map(run_turns, batches, chunksize=1))
+            raced_intact, raced_rate = race_sessions(pool, db_name)
+        intact, shared = check_conversations(SQLiteSessionStore(db_name=db_name),
+                                             session_ids)
+        print(f"SQLite, {WORKERS} workers: {multi_rate:,.0f} turns/s "
+              f"({intact}/{CONVERSATIONS} conversations intact, "
+              f"{shared} served by more than one worker)")
+        print(f"Speedup over 1 SQLite worker: {multi_rate / single_rate:.2f}x")
+        print(f"SQLite, {WORKERS} workers, {RACED_TURNS} simultaneous turns per session: "
+              f"{raced_rate:,.0f} turns/s ({raced_intact}/{RACED_SESSIONS} sessions kept every turn)")
+
+        if intact != CONVERSATIONS:
+            raise SystemExit("Conversations lost state across workers")
+        if raced_intact != RACED_SESSIONS:
+            raise SystemExit("Simultaneous turns of one session overwrote each other")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+import config
+
+
+def lttb(x, y, points):
+    """Positions of the points kept by Largest-Triangle-Three-Buckets.
+
+    x must be sorted. The first and last points are always kept; every
+    bucket in between keeps the point forming the largest triangle with
+    the point kept before it and the mean of the next bucket, which keeps
+    peaks and dips where a plain stride would skip them.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Means of every bucket, from running sums
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.maximum(edges[1:] - edges[:-1], 1)
+    x_means = (x_sums[edges[1:]] - x_sums[edges[:-1]]) / sizes
+    y_means = (y_sums[edges[1:]] - y_sums[edges[:-1]]) / sizes
+
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        # The last bucket is followed by the last point alone
+        next_x = x_means[i + 1] if i + 1 < len(x_means) else x[-1]
+        next_y = y_means[i + 1] if i + 1 < len(y_means) else y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+
+def min_max(y, points):
+    """Positions of the lowest and highest point of each of points / 2
+    equal buckets, plus the first and last point, in order"""
+    n = len(y)
+    if points >= n or points < 4:
+        return np.arange(n)
+    buckets = (points - 2) // 2
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    # One row of positions per bucket, the shorter ones padded with their
+    # own last position
+    width = int((edges[1:] - edges[:-1]).max())
+    positions = np.minimum(edges[:-1, None] + np.arange(width), edges[1:, None] - 1)
+    values = y[positions]
+    rows = np.arange(buckets)
+    lowest = positions[rows, values.argmin(axis=1)]
+    highest = positions[rows, values.argmax(axis=1)]
+    return np.unique(np.concatenate(([0, n - 1], lowest, highest)))
+
+
+def downsample(df, x, y, points=None, method='lttb'):
+    """Rows of df to plot y against x with at most points points.
+
+    Rows with a missing x or y are dropped and the rest sorted by x. Up to
+    points rows come back unchanged; beyond that, the rows picked by lttb
+    ("lttb") or by the minimum and maximum of each bucket ("minmax"), so a
+    trace's shape survives while its payload stays bounded. Other columns
+    of the kept rows come along, e.g. a forecast's interval.
+    """
+    points = points or config.CHART_MAX_POINTS
+    rows = df[df[x].notna() & df[y].notna()]
+    if not rows[x].is_monotonic_increasing:
+        rows = rows.sort_values(x, kind='stable')
+    if len(rows) <= points:
+        return rows
+    values = rows[y].to_numpy(dtype=float)
+    if method == 'minmax':
+        kept = min_max(values, points)
+    elif method == 'lttb':
+        positions = rows[x]
+        if pd.api.types.is_datetime64_any_dtype(positions):
+            positions = positions.astype('datetime64[ns]').astype(np.int64)
+        kept = lttb(positions.to_numpy(dtype=float), values, points)
+    else:
+        raise ValueError(f"Unknown downsampling method {method!r}")
+    return rows.iloc[kept]
+
+
+def histogram(values, weights=None, bins=None):
+    """Bars of a histogram of values, binned here instead of in the browser.
+
+    Returns a frame of left, right and count per bar, at most bins bars.
+    Whole numbers spanning no more than bins values get one bar each.
+    weights counts each value that many times, e.g. when values are
+    already distinct.
+    """
+    bins = bins or config.CHART_HISTOGRAM_BINS
+    values = np.asarray(values, dtype=float)
+    weights = None if weights is None else np.asarray(weights, dtype=float)
+    present = ~np.isnan(values)
+    values = values[present]
+    weights = None if weights is None else weights[present]
+    if len(values) == 0:
+        return pd.DataFrame({'left': [], 'right': [], 'count': []})
+    low, high = values.min(), values.max()
+    if np.all(values == np.round(values)) and high - low < bins:
+        edges = np.arange(low, high + 2) - 0.5
+    else:
+        edges = np.histogram_bin_edges(values, bins=bins)
+    counts, edges = np.histogram(values, bins=edges, weights=weights)
+    return pd.DataFrame({'left': edges[:-1], 'right': edges[1:], 'count': counts})
@@ -1,16 +1,30 @@
 import sqlite3
 
+import config
+import rollups
+
 def clear_first_114_rows():
     """Remove the first 114 entries from the database"""
     try:
         # Connect to database
-        conn = sqlite3.connect("dubai_tourism.db")
+        conn = sqlite3.connect(config.DB_PATH)
+        # Remove the deleted interactions' itinerary_activities rows too
+        conn.execute("PRAGMA foreign_keys = ON")
         cursor = conn.cursor()
         
         # Get current count
         cursor.execute("SELECT COUNT(*) FROM interactions")
         initial_count = cursor.fetchone()[0]
         
+        # Take the rows out of the rollups in the same transaction
+        cursor.execute(f"""
+            SELECT {", ".join(rollups.SOURCE_COLUMNS)} FROM interactions
+            ORDER BY rowid ASC
+            LIMIT 114
+        """)
+        removed = [dict(zip(rollups.SOURCE_COLUMNS, row)) for row in cursor.fetchall()]
+        rollups.apply_rollups(cursor, removed, sign=-1)
+        
         # Delete first 114 rows using row_id
         cursor.execute("""
             DELETE FROM interactions 
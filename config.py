@@ -0,0 +1,85 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# SQLite database holding interactions and the itinerary cache
+DB_PATH = os.getenv('DB_PATH', 'dubai_tourism.db')
+# Connection tuning applied by DubaiTourismDB
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '20000'))
+
+# Parquet cache of the transformed interactions used by the analytics; new
+# rows are appended as parts, compacted once there are this many
+ANALYTICS_CACHE_PATH = os.getenv('ANALYTICS_CACHE_PATH', 'analytics_cache')
+ANALYTICS_CACHE_MAX_PARTS = int(os.getenv('ANALYTICS_CACHE_MAX_PARTS', '16'))
+
+# Distinct free-text answers whose parsed values are memoized per process
+FIELD_PARSE_CACHE_SIZE = int(os.getenv('FIELD_PARSE_CACHE_SIZE', '4096'))
+# The preference analytics keep this many of the most mentioned canonical
+# preferences and count the rest as "other"
+PREFERENCE_VOCABULARY_SIZE = int(os.getenv('PREFERENCE_VOCABULARY_SIZE', '200'))
+
+# Worker processes fitting attraction forecasts in parallel; 1 fits them
+# one after another in the calling process
+FORECAST_WORKERS = int(os.getenv('FORECAST_WORKERS', '1'))
+# Fitted forecast models and their forecasts, reused while the training
+# data is unchanged
+FORECAST_MODEL_STORE_PATH = os.getenv('FORECAST_MODEL_STORE_PATH', 'forecast_models')
+# Refit a series starting from its previous model's parameters when only
+# new days were added; off by default, as short or noisy series can settle
+# on a noticeably different forecast than a cold fit
+FORECAST_WARM_START = os.getenv('FORECAST_WARM_START', '0') == '1'
+# Forecasting backend used when a call doesn't pick one: "prophet", or
+# "numpy" for the ridge-on-Fourier-terms model fitted in one batch
+FORECAST_BACKEND = os.getenv('FORECAST_BACKEND', 'prophet')
+# refresh_forecasts.py reruns the dashboard forecasts this often when
+# looping, and keeps this many versions of each forecast in the database
+FORECAST_REFRESH_INTERVAL_SECONDS = float(os.getenv('FORECAST_REFRESH_INTERVAL_SECONDS', '3600'))
+FORECAST_RUNS_KEPT = int(os.getenv('FORECAST_RUNS_KEPT', '3'))
+
+# Dashboard charts send at most this many points per trace to the browser,
+# and histograms at most this many bars
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', '2000'))
+CHART_HISTOGRAM_BINS = int(os.getenv('CHART_HISTOGRAM_BINS', '50'))
+# The Real-Time Analytics page folds in new interactions this often
+REALTIME_REFRESH_SECONDS = float(os.getenv('REALTIME_REFRESH_SECONDS', '10'))
+
+# Interactions are committed in batches of up to this many records, or
+# after this many seconds, whichever comes first
+INTERACTION_BATCH_SIZE = int(os.getenv('INTERACTION_BATCH_SIZE', '100'))
+INTERACTION_FLUSH_INTERVAL_SECONDS = float(os.getenv('INTERACTION_FLUSH_INTERVAL_SECONDS', '0.25'))
+INTERACTION_QUEUE_MAX = int(os.getenv('INTERACTION_QUEUE_MAX', '10000'))
+
+# Maximum number of final-stage itinerary generations in flight per worker
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '32'))
+
+# Seconds a single itinerary generation may take (including time spent
+# waiting for a free generation slot) before the request gives up
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+
+# Cached itineraries are shared by trips with the same normalized parameters
+ITINERARY_CACHE_MAX_ENTRIES = int(os.getenv('ITINERARY_CACHE_MAX_ENTRIES', '5000'))
+ITINERARY_CACHE_TTL_SECONDS = float(os.getenv('ITINERARY_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+# Budgets are rounded to the nearest multiple of this many USD
+ITINERARY_CACHE_BUDGET_BUCKET = int(os.getenv('ITINERARY_CACHE_BUDGET_BUCKET', '1000'))
+
+# Conversation sessions
+SESSION_MAX_COUNT = int(os.getenv('SESSION_MAX_COUNT', '10000'))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv('SESSION_IDLE_TTL_SECONDS', '1800'))
+SESSION_MAX_HISTORY = int(os.getenv('SESSION_MAX_HISTORY', '50'))
+# "memory" keeps sessions in the worker process; "sqlite" shares them
+# between all workers on the host through SESSION_DB_PATH
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', 'sessions.db')
+# The sqlite backend leases a session to one worker for the length of a
+# turn; a lease older than this is taken to be abandoned, so keep it above
+# LLM_TIMEOUT_SECONDS plus the time to stream the answer
+SESSION_LEASE_SECONDS = float(os.getenv('SESSION_LEASE_SECONDS', '300'))
+# A turn waits this long for another worker's turn on the same session
+# before giving up
+SESSION_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv('SESSION_ACQUIRE_TIMEOUT_SECONDS', '90'))
+# How long a session query waits for another worker's write to finish
+SESSION_BUSY_TIMEOUT_MS = int(os.getenv('SESSION_BUSY_TIMEOUT_MS', '1000'))
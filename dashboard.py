@@ -2,18 +2,85 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import config
 from analyze_interactions import InteractionAnalyzer
+from chart_sampling import downsample, histogram
 from forecast_demand import DemandForecaster
-import json
-import seaborn as sns
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
-import numpy as np
+from forecast_tables import ATTRACTION_DEMAND, SEASONAL_GROUP_SIZE
+from realtime_tail import UpcomingTail
+from database import db
+from datetime import datetime
+
+
+# Shared by every session and rerun. The data caches are keyed on the
+# analyzer's data_version(), so they are only recomputed once interactions
+# change.
+@st.cache_resource
+def shared_analyzer():
+    return InteractionAnalyzer()
+
+
+@st.cache_resource
+def shared_forecaster():
+    return DemandForecaster()
+
+
+@st.cache_resource(max_entries=16)
+def interactions(version, columns, travel_dates=None, created_at=None, order_by='id', limit=None):
+    """The analyzer's query() at a data version: only the columns and
+    windows a page asked for are read from SQLite. Returned without a copy
+    to every session, so pages must not modify it."""
+    return shared_analyzer().query(list(columns), travel_dates, created_at, order_by, limit)
+
+
+@st.cache_resource
+def upcoming_tail():
+    """Rolling aggregates of the next 30 days of travel. Shared by every
+    session, which all fold in new interactions as they refresh."""
+    return UpcomingTail(shared_analyzer())
+
+
+@st.cache_data(max_entries=8)
+def sampled_interactions(version, columns, x, y, method='lttb'):
+    """Interactions to plot y against x, downsampled to the chart point
+    budget at a data version"""
+    return downsample(interactions(version, columns), x, y, method=method)
+
+
+@st.cache_data(max_entries=32)
+def rollup(name, version):
+    """Result of the analyzer's rollup_<name>() at a data version"""
+    return getattr(shared_analyzer(), f'rollup_{name}')()
+
+
+@st.cache_data(max_entries=2)
+def preference_associations(version):
+    analyzer = shared_analyzer()
+    return analyzer.analyze_preference_associations(interactions(version, ('preferences',)))
+
+
+@st.cache_data(max_entries=2)
+def attraction_visits(version):
+    """Daily visits per attraction at a data version"""
+    return shared_forecaster().extract_attraction_data()
+
+
+@st.cache_data(max_entries=256)
+def stored_forecast(run_id, series):
+    """A stored forecast never changes, so it's cached by its version id"""
+    return db.read_forecast(run_id, series)
+
 
 class DashboardApp:
     def __init__(self):
-        self.analyzer = InteractionAnalyzer()
-        self.forecaster = DemandForecaster()
+        self.analyzer = shared_analyzer()
+        self.forecaster = shared_forecaster()
+        self.version = None
+
+    def interactions(self, columns, **window):
+        """Interactions a page shows: columns, restricted by the query()
+        window arguments (travel_dates, created_at, order_by, limit)"""
+        return interactions(self.version, tuple(columns), **window)
         
     def run(self):
         st.set_page_config(page_title="Dubai Tourism Analytics", layout="wide")
@@ -29,124 +96,118 @@ class DashboardApp:
         )
         
         try:
-            # Load data
-            with st.spinner('Loading data...'):
-                df = self.analyzer.extract_data()
-                df = self.analyzer.transform_data(df)
+            # Each page loads only the interactions it shows
+            self.version = self.analyzer.data_version()
             
             if page == "Overview":
-                self.show_overview(df)
+                self.show_overview()
             elif page == "Real-Time Analytics":
-                self.show_realtime_analytics(df)
+                self.show_realtime_analytics()
             elif page == "Demand Forecast":
-                self.show_demand_forecast(df)
+                self.show_demand_forecast()
             elif page == "User Preferences":
-                self.show_preference_analysis(df)
+                self.show_preference_analysis()
             elif page == "Group Analysis":
-                self.show_group_analysis(df)
+                self.show_group_analysis()
             else:
-                self.show_seasonal_analysis(df)
+                self.show_seasonal_analysis()
                 
         except Exception as e:
             st.error(f"Error loading dashboard: {str(e)}")
             st.write("Please try again or contact support if the error persists.")
 
-    def show_overview(self, df):
+    def show_overview(self):
         st.header("Key Metrics Overview")
         
         # Key metrics in columns
+        metrics = rollup('key_metrics', self.version)
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total Interactions", f"{len(df):,}")
+            st.metric("Total Interactions", f"{metrics['total_interactions']:,}")
         with col2:
-            st.metric("Average Budget", f"${df['budget_value'].mean():,.2f}")
+            st.metric("Average Budget", f"${metrics['avg_budget']:,.2f}")
         with col3:
-            st.metric("Average Duration", f"{df['duration_days'].mean():.1f} days")
+            st.metric("Average Duration", f"{metrics['avg_duration']:.1f} days")
         with col4:
-            st.metric("Average Group Size", f"{df['group_size'].mean():.1f}")
+            st.metric("Average Group Size", f"{metrics['avg_group_size']:.1f}")
 
         # Recent trends
         st.subheader("Recent Activity")
-        recent_df = df.sort_values('created_at').tail(30)
+        recent_df = self.interactions(['created_at', 'budget_value'], order_by='created_at', limit=30)
+        recent_df = downsample(recent_df, 'created_at', 'budget_value')
         fig = px.line(recent_df, x='created_at', y='budget_value',
                      title="Recent Booking Trends")
         st.plotly_chart(fig, use_container_width=True)
 
         # Top preferences summary
-        preferences_list = []
-        for prefs in df['preferences'].dropna():
-            preferences_list.extend([p.strip() for p in prefs.split(',')])
-        pref_counts = pd.Series(preferences_list).value_counts().head(5)
+        pref_counts = rollup('preference_counts', self.version).head(5)
         
         st.subheader("Top User Preferences")
         fig = px.bar(x=pref_counts.index, y=pref_counts.values)
         st.plotly_chart(fig, use_container_width=True)
 
-    def show_demand_forecast(self, df):
+    def show_demand_forecast(self):
         st.header("Demand Forecast")
         
         try:
-            # Add caching to the data loading instead
-            @st.cache_data(ttl=3600)
-            def load_forecast_data():
-                forecaster = DemandForecaster()
-                return forecaster.extract_attraction_data()
+            # Forecasts are computed by refresh_forecasts.py; the page only
+            # reads the latest version
+            run = db.latest_forecast_run(ATTRACTION_DEMAND)
+            if run is None:
+                st.info("No demand forecasts have been generated yet. "
+                        "Run `python refresh_forecasts.py` to compute them.")
+                return
             
             # Load forecast data using cached function
             with st.spinner('Loading forecast data...'):
-                df_forecast = load_forecast_data()
+                df_forecast = attraction_visits(self.version)
             
             # Select attraction
-            attractions = df_forecast['attraction'].unique()
+            attractions = db.forecast_series_names(run['id'])
             selected_attraction = st.selectbox(
                 "Select Attraction",
                 attractions,
                 help="Choose an attraction to see its demand forecast"
             )
             
-            # Add caching to the forecast generation
-            @st.cache_data(ttl=3600)
-            def generate_forecast(attraction):
-                forecaster = DemandForecaster()
-                model = forecaster.train_forecast_model(df_forecast, attraction)
-                return forecaster.generate_forecast(model)
-            
-            # Generate forecast with progress bar
-            with st.spinner('Generating forecast...'):
-                forecast = generate_forecast(selected_attraction)
+            forecast = stored_forecast(run['id'], selected_attraction)
+            st.caption(f"Forecast version {run['id']}, generated {run['generated_at']} UTC "
+                       f"with {run['backend']}")
             
-            # Plot forecast
+            # Plot forecast, each trace downsampled to the point budget
             fig = go.Figure()
+            actual_data = df_forecast[df_forecast['attraction'] == selected_attraction]
+            actual_points = downsample(actual_data, 'ds', 'y')
+            forecast_points = downsample(forecast, 'ds', 'yhat')
             
             # Actual values
-            actual_data = df_forecast[df_forecast['attraction'] == selected_attraction]
             fig.add_trace(go.Scatter(
-                x=actual_data['ds'],
-                y=actual_data['y'],
+                x=actual_points['ds'],
+                y=actual_points['y'],
                 name='Actual Demand',
                 mode='markers'
             ))
             
             # Forecast
             fig.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat'],
+                x=forecast_points['ds'],
+                y=forecast_points['yhat'],
                 name='Forecast',
                 mode='lines'
             ))
             
             # Confidence interval
             fig.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat_upper'],
+                x=forecast_points['ds'],
+                y=forecast_points['yhat_upper'],
                 fill=None,
                 mode='lines',
                 line_color='rgba(0,100,255,0.2)',
                 showlegend=False
             ))
             fig.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat_lower'],
+                x=forecast_points['ds'],
+                y=forecast_points['yhat_lower'],
                 fill='tonexty',
                 mode='lines',
                 line_color='rgba(0,100,255,0.2)',
@@ -183,15 +244,11 @@ class DashboardApp:
         except Exception as e:
             st.error(f"Error generating forecast: {str(e)}")
 
-    def show_preference_analysis(self, df):
+    def show_preference_analysis(self):
         st.header("User Preferences Analysis")
         
-        # Process preferences
-        preferences_list = []
-        for prefs in df['preferences'].dropna():
-            preferences_list.extend([p.strip() for p in prefs.split(',')])
-        
-        pref_counts = pd.Series(preferences_list).value_counts()
+        # Preference counts from the rollup tables
+        pref_counts = rollup('preference_counts', self.version)
         
         # Top Preferences
         st.subheader("Top User Preferences")
@@ -200,22 +257,48 @@ class DashboardApp:
         
         # Preferences by Budget
         st.subheader("Average Budget by Preference")
-        preference_budgets = self.analyzer.analyze_preference_correlations(df)
+        preference_budgets = rollup('preference_correlations', self.version)
         avg_budgets = preference_budgets['avg_budget_by_preference']
         fig = px.bar(x=list(avg_budgets.keys()), y=list(avg_budgets.values()))
         st.plotly_chart(fig, use_container_width=True)
 
-    def show_group_analysis(self, df):
+        # Preferences picked together
+        st.subheader("Preferences Picked Together")
+        associations = preference_associations(self.version)
+        if associations.empty:
+            st.write("Not enough interactions to compare preferences yet.")
+            return
+        selected = st.selectbox("Visitors who pick", sorted(associations['preference'].unique()))
+        also_picked = associations[associations['preference'] == selected].head(10)
+        st.dataframe(
+            pd.DataFrame({
+                'Also Pick': also_picked['also_picks'],
+                'Interactions': also_picked['together'],
+                'Share': also_picked['confidence'] * 100,
+                'Lift': also_picked['lift']
+            }),
+            column_config={
+                'Share': st.column_config.NumberColumn(format="%.0f%%"),
+                'Lift': st.column_config.NumberColumn(format="%.2f")
+            },
+            hide_index=True
+        )
+
+    def show_group_analysis(self):
         st.header("Group Analysis")
         
-        group_patterns = self.analyzer.analyze_group_patterns(df)
+        group_patterns = rollup('group_patterns', self.version)
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Group Size Distribution
             st.subheader("Group Size Distribution")
-            fig = px.histogram(df, x='group_size')
+            group_sizes = group_patterns['group_size_counts']
+            bars = histogram(list(group_sizes.keys()), weights=list(group_sizes.values()))
+            fig = go.Figure(go.Bar(x=(bars['left'] + bars['right']) / 2, y=bars['count'],
+                                   width=bars['right'] - bars['left']))
+            fig.update_layout(xaxis_title='group_size', yaxis_title='count', bargap=0)
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
@@ -225,20 +308,13 @@ class DashboardApp:
                         y=list(group_patterns['avg_duration'].values()))
             st.plotly_chart(fig, use_container_width=True)
 
-    def show_seasonal_analysis(self, df):
+    def show_seasonal_analysis(self):
         try:
             st.header("Seasonal Tourism Intelligence")
             st.markdown("---")
 
-            # Convert travel_dates to datetime if not already
-            df['travel_dates'] = pd.to_datetime(df['travel_dates'], format='%Y-%m-%d')
-            
-            # Extract month from travel_dates
-            df['month'] = df['travel_dates'].dt.month
-            df['month_name'] = df['travel_dates'].dt.strftime('%B')
-            
-            # Get seasonal trends data
-            seasonal_trends = self.analyzer.analyze_seasonal_trends(df)
+            # Get seasonal trends data from the rollup tables
+            seasonal_trends = rollup('seasonal_trends', self.version)
             
             if seasonal_trends is None:
                 st.error("Error analyzing seasonal trends. Please check the data format.")
@@ -473,153 +549,165 @@ class DashboardApp:
             with tabs[3]:
                 st.subheader("Future Tourism Forecast")
                 
-                # Prepare data for forecasting using travel_dates
-                df_forecast = df.copy()
-                df_forecast['ds'] = pd.to_datetime(df_forecast['travel_dates'])
-                df_forecast['y'] = df_forecast['group_size']
+                # The growth is measured from the group size of the latest
+                # stored interaction, the only row of the history it needs
+                latest = self.interactions(['travel_dates', 'group_size'],
+                                           order_by='id', limit=1)
                 
-                # Create and fit Prophet model
-                from prophet import Prophet
-                model = Prophet(yearly_seasonality=True, weekly_seasonality=False)
-                model.fit(df_forecast[['ds', 'y']])
+                # The 6-month forecast is computed by refresh_forecasts.py;
+                # the tab only reads its latest version
+                run = db.latest_forecast_run(SEASONAL_GROUP_SIZE)
+                if run is None:
+                    st.info("No tourism forecast has been generated yet. "
+                            "Run `python refresh_forecasts.py` to compute it.")
+                else:
+                    forecast = stored_forecast(run['id'], 'group_size')
+                    st.caption(f"Forecast version {run['id']}, generated {run['generated_at']} UTC "
+                               f"with {run['backend']}")
                 
-                # Make future dataframe
-                future = model.make_future_dataframe(periods=180)  # 6 months forecast
-                forecast = model.predict(future)
+                    # Create forecast visualization. The history has a point
+                    # per interaction, so it's cut to the lowest and highest
+                    # group size of each stretch of travel dates.
+                    fig = go.Figure()
+                    history_points = sampled_interactions(self.version, ('travel_dates', 'group_size'),
+                                                          'travel_dates', 'group_size', 'minmax')
+                    forecast_points = downsample(forecast, 'ds', 'yhat')
                 
-                # Create forecast visualization
-                fig = go.Figure()
+                    # Historical data
+                    fig.add_trace(go.Scatter(
+                        x=history_points['travel_dates'],
+                        y=history_points['group_size'],
+                        name='Historical',
+                        mode='lines',
+                        line=dict(color='blue')
+                    ))
                 
-                # Historical data
-                fig.add_trace(go.Scatter(
-                    x=df_forecast['ds'],
-                    y=df_forecast['y'],
-                    name='Historical',
-                    mode='lines',
-                    line=dict(color='blue')
-                ))
-                
-                # Forecast
-                fig.add_trace(go.Scatter(
-                    x=forecast['ds'],
-                    y=forecast['yhat'],
-                    name='Forecast',
-                    mode='lines',
-                    line=dict(color='red', dash='dash')
-                ))
+                    # Forecast
+                    fig.add_trace(go.Scatter(
+                        x=forecast_points['ds'],
+                        y=forecast_points['yhat'],
+                        name='Forecast',
+                        mode='lines',
+                        line=dict(color='red', dash='dash')
+                    ))
                 
-                # Confidence interval
-                fig.add_trace(go.Scatter(
-                    x=forecast['ds'].tolist() + forecast['ds'].tolist()[::-1],
-                    y=forecast['yhat_upper'].tolist() + forecast['yhat_lower'].tolist()[::-1],
-                    fill='toself',
-                    fillcolor='rgba(255,0,0,0.2)',
-                    line=dict(color='rgba(255,0,0,0)'),
-                    name='Confidence Interval'
-                ))
+                    # Confidence interval
+                    fig.add_trace(go.Scatter(
+                        x=forecast_points['ds'].tolist() + forecast_points['ds'].tolist()[::-1],
+                        y=forecast_points['yhat_upper'].tolist() + forecast_points['yhat_lower'].tolist()[::-1],
+                        fill='toself',
+                        fillcolor='rgba(255,0,0,0.2)',
+                        line=dict(color='rgba(255,0,0,0)'),
+                        name='Confidence Interval'
+                    ))
                 
-                fig.update_layout(
-                    title="6-Month Tourism Forecast",
-                    height=600,
-                    title_x=0.5,
-                    title_font_size=20,
-                    xaxis_title="Date",
-                    yaxis_title="Number of Visitors",
-                    hovermode='x unified'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                    fig.update_layout(
+                        title="6-Month Tourism Forecast",
+                        height=600,
+                        title_x=0.5,
+                        title_font_size=20,
+                        xaxis_title="Date",
+                        yaxis_title="Number of Visitors",
+                        hovermode='x unified'
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
 
-                # Forecast insights
-                st.info("Forecast Insights")
-                col1, col2 = st.columns(2)
+                    # Forecast insights
+                    st.info("Forecast Insights")
+                    col1, col2 = st.columns(2)
                 
-                with col1:
-                    growth_rate = ((forecast['yhat'].iloc[-1] - df_forecast['y'].iloc[-1]) / 
-                                  df_forecast['y'].iloc[-1] * 100)
-                    st.metric(
-                        "Projected Growth",
-                        f"{growth_rate:+.1f}%",
-                        "Next 6 months"
-                    )
+                    with col1:
+                        growth_rate = ((forecast['yhat'].iloc[-1] - latest['group_size'].iloc[-1]) / 
+                                      latest['group_size'].iloc[-1] * 100)
+                        st.metric(
+                            "Projected Growth",
+                            f"{growth_rate:+.1f}%",
+                            "Next 6 months"
+                        )
                 
-                with col2:
-                    peak_forecast = forecast['yhat'].max()
-                    peak_date = forecast.loc[forecast['yhat'].idxmax(), 'ds']
-                    st.metric(
-                        "Peak Period",
-                        peak_date.strftime('%B %Y'),
-                        f"{peak_forecast:,.0f} visitors"
-                    )
+                    with col2:
+                        peak_forecast = forecast['yhat'].max()
+                        peak_date = forecast.loc[forecast['yhat'].idxmax(), 'ds']
+                        st.metric(
+                            "Peak Period",
+                            peak_date.strftime('%B %Y'),
+                            f"{peak_forecast:,.0f} visitors"
+                        )
 
-                # Strategic recommendations
-                st.success("""
-                **Strategic Recommendations:**
-                1. Prepare for projected visitor increases during peak months
-                2. Optimize pricing strategies for high-demand periods
-                3. Develop targeted marketing campaigns for off-peak seasons
-                4. Align resource allocation with forecasted demand
-                """)
+                    # Strategic recommendations
+                    st.success("""
+                    **Strategic Recommendations:**
+                    1. Prepare for projected visitor increases during peak months
+                    2. Optimize pricing strategies for high-demand periods
+                    3. Develop targeted marketing campaigns for off-peak seasons
+                    4. Align resource allocation with forecasted demand
+                    """)
 
         except Exception as e:
             st.error(f"Error in seasonal analysis: {str(e)}")
             st.write("Please check that your data is in the correct format.")
 
-    def show_realtime_analytics(self, df):
+    def show_realtime_analytics(self):
         st.header("Tourism Flow Analysis")
-        
-        # Convert travel_dates to datetime
-        df['travel_dates'] = pd.to_datetime(df['travel_dates'])
-        
-        # Get next 30 days range
-        current_date = datetime.now()
-        next_30_days = current_date + timedelta(days=30)
-        
-        # Filter for upcoming travel dates
-        upcoming_df = df[df['travel_dates'].between(current_date, next_30_days)]
+        self.show_upcoming_travel()
+
+    # Reruns on its own every REALTIME_REFRESH_SECONDS, without the rest of
+    # the app, so the page can stay open on a wall display
+    @st.fragment(run_every=config.REALTIME_REFRESH_SECONDS)
+    def show_upcoming_travel(self):
+        tail = upcoming_tail()
+        tail.refresh()
+        upcoming = tail.snapshot()
+        st.caption(f"Travel dates {upcoming['start']:%B %d} to {upcoming['end']:%B %d}, "
+                   f"up to interaction {upcoming['last_id']:,}; updated {datetime.now():%H:%M:%S}")
         
         # Create columns for different metrics
         col1, col2, col3 = st.columns(3)
         
         with col1:
             st.subheader("Expected Visitors (Next 30 Days)")
-            total_visitors = upcoming_df['group_size'].sum()
+            total_visitors = upcoming['visitors']
             daily_avg = total_visitors / 30
             
             st.metric(
                 "Total Expected Visitors",
-                f"{int(total_visitors):,}",
+                f"{total_visitors:,}",
                 f"Avg. {int(daily_avg)} per day"
             )
 
         with col2:
             st.subheader("Average Group Size")
-            avg_group = upcoming_df['group_size'].mean()
+            avg_group = upcoming['avg_group_size']
             
             st.metric(
                 "Average Group Size",
-                f"{avg_group:.1f}",
-                f"From {len(upcoming_df)} bookings"
+                f"{avg_group:.1f}" if avg_group is not None else "-",
+                f"From {upcoming['bookings']} bookings"
             )
 
         with col3:
             st.subheader("Average Budget")
-            avg_budget = upcoming_df['budget_value'].mean()
+            avg_budget = upcoming['avg_budget']
             
             st.metric(
                 "Average Spending",
-                f"${int(avg_budget):,}",
+                f"${int(avg_budget):,}" if avg_budget is not None else "-",
                 "per booking"
             )
 
+        if upcoming['bookings'] == 0:
+            st.info("No bookings travel in the next 30 days yet.")
+            return
+
         # Create daily visitors visualization
         st.subheader("Daily Visitor Distribution (Next 30 Days)")
         
-        daily_visitors = upcoming_df.groupby('travel_dates')['group_size'].sum().reset_index()
+        daily_visitors = upcoming['daily_visitors']
         
         fig = go.Figure()
         fig.add_trace(go.Bar(
-            x=daily_visitors['travel_dates'],
-            y=daily_visitors['group_size'],
+            x=daily_visitors.index,
+            y=daily_visitors.values,
             name='Expected Visitors'
         ))
         
@@ -638,12 +726,8 @@ class DashboardApp:
         col1, col2 = st.columns(2)
         
         with col1:
-            # Analyze preferences for upcoming visitors
-            upcoming_prefs = []
-            for prefs in upcoming_df['preferences'].dropna():
-                upcoming_prefs.extend([p.strip() for p in prefs.split(',')])
-            
-            pref_counts = pd.Series(upcoming_prefs).value_counts()
+            # Preferences of upcoming visitors
+            pref_counts = upcoming['preferences']
             
             fig = px.pie(
                 values=pref_counts.values[:5],
@@ -654,7 +738,7 @@ class DashboardApp:
 
         with col2:
             # Group type distribution
-            group_dist = upcoming_df['group_info'].value_counts()
+            group_dist = upcoming['groups']
             
             fig = px.bar(
                 x=group_dist.index,
@@ -673,20 +757,20 @@ class DashboardApp:
         with col1:
             st.info("Peak Days")
             # Find days with highest expected visitors
-            peak_days = daily_visitors.nlargest(3, 'group_size')
-            for _, row in peak_days.iterrows():
-                st.write(f"• {row['travel_dates'].strftime('%B %d')}: {int(row['group_size'])} visitors")
+            peak_days = daily_visitors.nlargest(3)
+            for day, visitors in peak_days.items():
+                st.write(f"• {day.strftime('%B %d')}: {int(visitors)} visitors")
 
         with col2:
             st.info("Visitor Mix")
-            total_groups = len(upcoming_df)
-            if total_groups > 0:
-                family_groups = len(upcoming_df[upcoming_df['group_info'].str.contains('family', case=False, na=False)])
-                business_groups = len(upcoming_df[upcoming_df['group_info'].str.contains('business', case=False, na=False)])
-                
-                st.write(f"• Families: {family_groups/total_groups*100:.1f}%")
-                st.write(f"• Business: {business_groups/total_groups*100:.1f}%")
-                st.write(f"• Others: {(total_groups-family_groups-business_groups)/total_groups*100:.1f}%")
+            total_groups = upcoming['bookings']
+            group_dist = upcoming['groups']
+            family_groups = group_dist[group_dist.index.str.contains('family', case=False)].sum()
+            business_groups = group_dist[group_dist.index.str.contains('business', case=False)].sum()
+            
+            st.write(f"• Families: {family_groups/total_groups*100:.1f}%")
+            st.write(f"• Business: {business_groups/total_groups*100:.1f}%")
+            st.write(f"• Others: {(total_groups-family_groups-business_groups)/total_groups*100:.1f}%")
 
 if __name__ == "__main__":
     dashboard = DashboardApp()
@@ -1,16 +1,87 @@
 import sqlite3
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
 import json
 
+import config
+import forecast_tables
+from interaction_fields import typed_columns
+from itinerary_parser import parse_price_aed, stored_activities
+import rollups
+
+# Columns derived from the free-text answers when an interaction is stored
+TYPED_COLUMNS = {
+    'budget_value': 'REAL',
+    'duration_days': 'INTEGER',
+    'group_size': 'INTEGER',
+    'travel_date': 'DATE'
+}
+
+INSERT_ACTIVITY = '''
+    INSERT INTO itinerary_activities (
+        interaction_id, day, time, title, location, price_aed, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
 class DubaiTourismDB:
-    def __init__(self):
-        self.db_name = "dubai_tourism.db"
+    def __init__(self, db_name=None):
+        self.db_name = db_name or config.DB_PATH
+        self._local = threading.local()
         self.init_db()
 
+    def connection(self):
+        """Return this thread's connection, opening and tuning it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=config.DB_BUSY_TIMEOUT_MS / 1000)
+            # WAL lets the analytics readers run while interactions are written,
+            # and with synchronous=NORMAL a commit no longer waits on an fsync
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA synchronous={config.DB_SYNCHRONOUS}')
+            conn.execute(f'PRAGMA busy_timeout={config.DB_BUSY_TIMEOUT_MS}')
+            conn.execute(f'PRAGMA cache_size=-{config.DB_CACHE_SIZE_KB}')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
     def init_db(self):
-        """Initialize the database and create tables if they don't exist"""
-        conn = sqlite3.connect(self.db_name)
+        """Initialize the database and create tables if they don't exist.
+
+        The schema is checked and changed under the write lock, so several
+        workers opening the database at once don't race. Existing rows are
+        not backfilled here: that is left to backfill_database.py, which
+        this only points to.
+        """
+        conn = self.connection()
         cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            changes = self._create_schema(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if any(changes) and conn.execute('SELECT EXISTS (SELECT 1 FROM interactions)').fetchone()[0]:
+            print("Existing interactions predate the typed columns, itinerary_activities or "
+                  "rollup tables: run python backfill_database.py")
+
+    @staticmethod
+    def _create_schema(cursor):
+        """Create missing tables, columns and indexes. Returns whether the
+        typed columns, the itinerary_activities table and the rollup tables
+        were new."""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        existing_tables = {row[0] for row in cursor.fetchall()}
+        new_activities_table = 'itinerary_activities' not in existing_tables
+        new_rollup_tables = not {*rollups.ROLLUPS, rollups.PREFERENCE_NAMES} <= existing_tables
 
         # Create interactions table
         cursor.execute('''
@@ -28,53 +99,255 @@ class DubaiTourismDB:
             )
         ''')
 
-        conn.commit()
-        conn.close()
+        cursor.execute('PRAGMA table_info(interactions)')
+        existing_columns = {row[1] for row in cursor.fetchall()}
+        new_typed_columns = not set(TYPED_COLUMNS) <= existing_columns
+        for column, column_type in TYPED_COLUMNS.items():
+            if column not in existing_columns:
+                try:
+                    cursor.execute(f'ALTER TABLE interactions ADD COLUMN {column} {column_type}')
+                except sqlite3.OperationalError as e:
+                    # Another process added it first
+                    if 'duplicate column name' not in str(e):
+                        raise
+        for column in ('created_at', 'travel_date', 'session_id'):
+            cursor.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_interactions_{column}
+                ON interactions ({column})
+            ''')
+
+        # One row per scheduled activity, so demand queries don't have to
+        # re-parse every generated_itinerary
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS itinerary_activities (
+                id INTEGER PRIMARY KEY,
+                interaction_id INTEGER NOT NULL REFERENCES interactions (id) ON DELETE CASCADE,
+                day INTEGER,
+                time TEXT,
+                title TEXT,
+                location TEXT,
+                price_aed REAL,
+                created_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_itinerary_activities_interaction
+            ON itinerary_activities (interaction_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_itinerary_activities_title_created
+            ON itinerary_activities (title, created_at)
+        ''')
+
+        # Aggregates for the dashboard, kept up to date by store_interactions
+        rollups.create_rollup_tables(cursor)
+
+        # Bumped by every insert, update or delete of interactions, by this
+        # app or not, so readers can tell whether anything changed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS interactions_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO interactions_version VALUES (1, 0)')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS interactions_version_{event.lower()}
+                AFTER {event} ON interactions
+                BEGIN
+                    UPDATE interactions_version SET version = version + 1;
+                END
+            ''')
+
+        # Versioned forecasts written by refresh_forecasts.py
+        forecast_tables.create_forecast_tables(cursor)
+        return new_typed_columns, new_activities_table, new_rollup_tables
 
     def store_interaction(self, data: dict):
         """Store a new interaction"""
-        conn = sqlite3.connect(self.db_name)
+        self.store_interactions([data])
+
+    def store_interactions(self, records):
+        """Store several interactions, their activities and their rollup
+        updates in a single transaction"""
+        conn = self.connection()
         cursor = conn.cursor()
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        created = [data.get('created_at') or now for data in records]
+        columns = typed_columns(*([data.get(answer) for data in records] for answer in
+                                  ('budget', 'duration', 'group_info', 'travel_dates')),
+                                created)
+        fields = [dict(zip(columns, values)) for values in zip(*columns.values())]
 
-        cursor.execute('''
-            INSERT INTO interactions (
-                session_id,
-                travel_dates,
-                duration,
-                group_info,
-                preferences,
-                budget,
-                conversation_history,
-                generated_itinerary
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('session_id', 'default'),
-            data.get('travel_dates'),
-            str(data.get('duration')),
-            data.get('group_info'),
-            data.get('preferences'),
-            str(data.get('budget')),
-            json.dumps(data.get('conversation_history', [])),
-            json.dumps(data.get('generated_itinerary', {}))
-        ))
-
-        conn.commit()
-        conn.close()
+        try:
+            cursor.executemany('''
+                INSERT INTO interactions (
+                    session_id,
+                    travel_dates,
+                    duration,
+                    group_info,
+                    preferences,
+                    budget,
+                    conversation_history,
+                    generated_itinerary,
+                    created_at,
+                    budget_value,
+                    duration_days,
+                    group_size,
+                    travel_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                data.get('session_id', 'default'),
+                data.get('travel_dates'),
+                str(data.get('duration')),
+                data.get('group_info'),
+                data.get('preferences'),
+                str(data.get('budget')),
+                json.dumps(data.get('conversation_history', [])),
+                json.dumps(data.get('generated_itinerary', {})),
+                created_at,
+                *typed.values()
+            ) for data, created_at, typed in zip(records, created, fields)])
+
+            # The batch holds the write lock, so its ids are consecutive
+            last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+            first_id = last_id - len(records) + 1
+            activity_rows = []
+            for offset, data in enumerate(records):
+                activity_rows.extend(self._activity_rows(
+                    first_id + offset, data.get('generated_itinerary'), created[offset]))
+            cursor.executemany(INSERT_ACTIVITY, activity_rows)
+
+            rollups.apply_rollups(cursor, [{
+                'created_at': created_at,
+                'group_info': data.get('group_info'),
+                'preferences': data.get('preferences'),
+                **typed
+            } for data, created_at, typed in zip(records, created, fields)])
+            conn.commit()
+        except Exception:
+            # Whatever failed, don't leave half a batch pending for the next
+            # commit on this thread's connection
+            conn.rollback()
+            raise
+
+    @staticmethod
+    def _activity_rows(interaction_id, generated_itinerary, created_at):
+        return [(interaction_id, activity.day, activity.time, activity.title,
+                 activity.location, parse_price_aed(activity.price), created_at)
+                for activity in stored_activities(generated_itinerary)]
+
+    def backfill_itinerary_activities(self, batch_size=1000):
+        """Fill itinerary_activities for interactions stored before it existed.
+
+        Works through interactions in id order, one transaction per batch, and
+        skips interactions that already have activity rows, so it can be
+        interrupted and re-run. Returns the number of interactions processed.
+        """
+        conn = self.connection()
+        last_id = 0
+        filled = 0
+        while True:
+            rows = conn.execute('''
+                SELECT id, generated_itinerary, created_at FROM interactions
+                WHERE id > ? AND NOT EXISTS (
+                    SELECT 1 FROM itinerary_activities
+                    WHERE interaction_id = interactions.id
+                )
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                return filled
+
+            activity_rows = []
+            for interaction_id, generated_itinerary, created_at in rows:
+                try:
+                    itinerary = json.loads(generated_itinerary or 'null')
+                except ValueError:
+                    itinerary = None
+                activity_rows.extend(self._activity_rows(interaction_id, itinerary, created_at))
+            with conn:
+                conn.executemany(INSERT_ACTIVITY, activity_rows)
+            last_id = rows[-1][0]
+            filled += len(rows)
+            print(f"Backfilled activities up to interaction {last_id}")
+
+    def backfill_typed_columns(self, batch_size=1000):
+        """Fill the typed analytic columns of interactions stored before they
+        existed, one transaction per batch, then rebuild the rollups that are
+        computed from them. Returns the number of rows filled."""
+        conn = self.connection()
+        last_id = 0
+        filled = 0
+        while True:
+            # group_size is never NULL once a row has been processed
+            rows = conn.execute('''
+                SELECT id, budget, duration, group_info, travel_dates, created_at
+                FROM interactions
+                WHERE id > ? AND group_size IS NULL
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+
+            ids, *answers = zip(*rows)
+            columns = typed_columns(*answers)
+            updates = [(*values, interaction_id)
+                       for *values, interaction_id in zip(*columns.values(), ids)]
+            with conn:
+                conn.executemany('''
+                    UPDATE interactions
+                    SET budget_value = ?, duration_days = ?, group_size = ?, travel_date = ?
+                    WHERE id = ?
+                ''', updates)
+            last_id = rows[-1][0]
+            filled += len(rows)
+            print(f"Backfilled typed columns up to interaction {last_id}")
+
+        if filled:
+            self.rebuild_rollups()
+        return filled
+
+    def rebuild_rollups(self):
+        """Recompute the rollup tables from scratch"""
+        rollups.rebuild_rollups(self.connection())
+
+    def check_rollups(self):
+        """Rollup entries that disagree with the interactions table (empty if consistent)"""
+        return rollups.check_rollups(self.connection())
+
+    def write_forecast_run(self, name, backend, forecasts, failed=0, watermark=None, seconds=None):
+        """Store {series: forecast frame} as the newest version of forecast
+        name; watermark is the highest interaction id it was computed from"""
+        return forecast_tables.write_forecast_run(
+            self.connection(), name, backend, forecasts, failed, watermark, seconds,
+            config.FORECAST_RUNS_KEPT)
+
+    def latest_forecast_run(self, name):
+        """Newest version of forecast name, or None if it was never generated"""
+        return forecast_tables.latest_forecast_run(self.connection(), name)
+
+    def read_forecast(self, run_id, series):
+        """Forecast frame of one series of a stored forecast run"""
+        return forecast_tables.read_forecast(self.connection(), run_id, series)
+
+    def forecast_series_names(self, run_id):
+        """Series of a stored forecast run"""
+        return forecast_tables.forecast_series_names(self.connection(), run_id)
 
     def get_interactions(self, session_id=None):
         """Get all interactions or filter by session_id"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        cursor = self.connection().cursor()
 
         if session_id:
             cursor.execute('SELECT * FROM interactions WHERE session_id = ?', (session_id,))
         else:
             cursor.execute('SELECT * FROM interactions')
 
-        rows = cursor.fetchall()
-        conn.close()
-
-        return rows
+        return cursor.fetchall()
 
 # Create a global instance
-db = DubaiTourismDB() 
\ No newline at end of file
+db = DubaiTourismDB()
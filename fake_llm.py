@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def build_sample_itinerary(num_days=5, activities_per_day=3):
+    """Build an itinerary in the exact format the UAE expert prompt asks for"""
+    lines = [
+        "Hotel Suggestion:",
+        "- NAME: Jumeirah Beach Hotel",
+        "- CATEGORY: Luxury",
+        "- LOCATION: Jumeirah",
+        "- PRICE: AED 1200 per night",
+        "- AMENITIES: Private beach, Spa, Pools",
+        "- DESCRIPTION: Iconic wave-shaped hotel on the Arabian Gulf",
+        "- RATING: 5/5 stars",
+        "",
+    ]
+    for day in range(1, num_days + 1):
+        lines.append(f"Day {day}:")
+        for idx in range(activities_per_day):
+            hour = 9 + idx * 4
+            time_label = f"{hour:02d}:00 AM" if hour < 12 else f"{hour - 12 or 12:02d}:00 PM"
+            lines.extend([
+                f"- TIME: {time_label}",
+                f"- TITLE: Activity {day}.{idx + 1}",
+                "- DESCRIPTION: A guided experience through one of Dubai's highlights",
+                "- LOCATION: Downtown Dubai",
+                f"- PRICE: AED {150 + idx * 50} per person",
+                "",
+            ])
+    lines.extend([
+        "Recommendations:",
+        "- Weather Considerations: Plan outdoor activities for the morning",
+        "- Cultural Etiquette: Dress modestly in traditional areas",
+        "- Transportation Tips: Use the Dubai Metro",
+        "- Must-Try Experiences: Traditional Emirati breakfast",
+    ])
+    return "\n".join(lines)
+
+
+class LatencyFakeChatModel(BaseChatModel):
+    """Local stand-in for ChatOpenAI that answers after a fixed latency.
+
+    Streaming spreads the same latency evenly over chunks of `chunk_size`
+    characters, so the full answer arrives at the same time either way.
+    """
+    response: str = build_sample_itinerary()
+    latency: float = 1.0
+    chunk_size: int = 16
+
+    @property
+    def _llm_type(self) -> str:
+        return "latency-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        pieces = [self.response[i:i + self.chunk_size]
+                  for i in range(0, len(self.response), self.chunk_size)]
+        for piece in pieces:
+            await asyncio.sleep(self.latency / len(pieces))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
@@ -0,0 +1,142 @@
+from abc import ABC, abstractmethod
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Columns of every backend's forecast, as named by Prophet's predict()
+FORECAST_COLUMNS = ['ds', 'trend', 'yhat_lower', 'yhat_upper', 'yhat']
+
+
+class ForecastBackend(ABC):
+    """Interface of the forecasting backends.
+
+    forecast() takes {name: frame of (ds, y) rows} and returns {name:
+    forecast} for the same names. Each forecast has the FORECAST_COLUMNS
+    over the series' own days followed by the next periods days, like
+    Prophet's predict() on make_future_dataframe(). A series that can't be
+    forecast maps to its exception instead, without failing the batch.
+    params are Prophet's constructor arguments; backends use the ones they
+    understand.
+    """
+
+    name = None
+
+    @abstractmethod
+    def forecast(self, series, periods=30, params=None):
+        """{name: forecast or exception} of the series, periods days ahead"""
+
+
+class ProphetBackend(ForecastBackend):
+    """One Prophet model per series, fitted (or loaded from the model
+    store) by the DemandForecaster"""
+
+    name = 'prophet'
+
+    def __init__(self, forecaster):
+        self.forecaster = forecaster
+
+    def forecast(self, series, periods=30, params=None):
+        forecasts = {}
+        for name, rows in series.items():
+            try:
+                _, forecasts[name] = self.forecaster.forecast_series(
+                    name, rows, periods, params, load_model=False, backend=self.name)
+            except Exception as e:
+                forecasts[name] = e
+        return forecasts
+
+
+class NumpyBackend(ForecastBackend):
+    """Ridge regression on a linear trend and Fourier terms, in NumPy.
+
+    Each series is y = a + b*t + weekly and yearly Fourier terms (Prophet's
+    default orders), fitted by least squares with a ridge penalty on the
+    seasonal coefficients, which keeps a yearly cycle seen for only a few
+    months from running away. Every series of a batch shares one daily
+    design matrix, so the fits are a single batched solve. The interval is
+    the fitted value plus or minus the residual spread.
+    """
+
+    name = 'numpy'
+
+    def __init__(self, weekly_order=3, yearly_order=10, ridge=10.0):
+        self.weekly_order = weekly_order
+        self.yearly_order = yearly_order
+        self.ridge = ridge
+
+    @staticmethod
+    def _order(setting, default):
+        """Fourier order of a Prophet-style seasonality setting"""
+        if setting is True or setting == 'auto':
+            return default
+        if setting is False or setting is None:
+            return 0
+        return int(setting)
+
+    @staticmethod
+    def features(days, start, end, weekly_order, yearly_order):
+        """Design matrix over days (days since the epoch): intercept, the
+        trend scaled to 0..1 between start and end, then the Fourier terms"""
+        columns = [np.ones(len(days)), (days - start) / max(end - start, 1)]
+        for period, order in ((7.0, weekly_order), (365.25, yearly_order)):
+            for k in range(1, order + 1):
+                angle = 2 * np.pi * k * days / period
+                columns += [np.sin(angle), np.cos(angle)]
+        return np.column_stack(columns)
+
+    def forecast(self, series, periods=30, params=None):
+        params = params or {}
+        weekly_order = self._order(params.get('weekly_seasonality', True), self.weekly_order)
+        yearly_order = self._order(params.get('yearly_seasonality', True), self.yearly_order)
+        z = NormalDist().inv_cdf(0.5 + params.get('interval_width', 0.8) / 2)
+
+        forecasts = {}
+        batch = []
+        for name, rows in series.items():
+            rows = rows[rows['ds'].notna() & rows['y'].notna()]
+            if len(rows) < 2:
+                forecasts[name] = ValueError('Dataframe has less than 2 non-NaN rows.')
+                continue
+            days = pd.to_datetime(rows['ds']).to_numpy().astype('datetime64[D]').astype(np.int64)
+            batch.append((name, days, rows['y'].to_numpy(dtype=float)))
+        if not batch:
+            return forecasts
+
+        # One row per day from the earliest observation to the end of the
+        # longest horizon; each series is summarized by its count, sum and
+        # sum of squares per day, which also handles repeated days
+        start = min(days.min() for _, days, _ in batch)
+        end = max(days.max() for _, days, _ in batch) + periods
+        grid = np.arange(start, end + 1)
+        X = self.features(grid, start, end, weekly_order, yearly_order)
+        counts = np.zeros((len(batch), len(grid)))
+        sums = np.zeros_like(counts)
+        squares = np.zeros_like(counts)
+        for i, (_, days, y) in enumerate(batch):
+            np.add.at(counts[i], days - start, 1)
+            np.add.at(sums[i], days - start, y)
+            np.add.at(squares[i], days - start, y * y)
+
+        penalty = np.full(X.shape[1], self.ridge)
+        penalty[:2] = 1e-9
+        xtx = (X.T * counts[:, None, :]) @ X + np.diag(penalty)
+        coef = np.linalg.solve(xtx, (sums @ X)[..., None])[..., 0]
+        fitted = coef @ X.T
+        trend = coef[:, :2] @ X[:, :2].T
+        residuals = (squares - 2 * fitted * sums + counts * fitted ** 2).sum(axis=1)
+        sigma = np.sqrt(np.maximum(residuals, 0) / np.maximum(counts.sum(axis=1) - 2, 1))
+
+        for i, (name, days, _) in enumerate(batch):
+            keep = np.union1d(days, np.arange(days.max() + 1, days.max() + periods + 1)) - start
+            forecasts[name] = pd.DataFrame({
+                'ds': pd.to_datetime(grid[keep].astype('datetime64[D]')),
+                'trend': trend[i, keep],
+                'yhat_lower': fitted[i, keep] - z * sigma[i],
+                'yhat_upper': fitted[i, keep] + z * sigma[i],
+                'yhat': fitted[i, keep]
+            })
+        return forecasts
+
+
+BACKENDS = {backend.name: backend for backend in (ProphetBackend, NumpyBackend)}
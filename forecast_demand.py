@@ -1,63 +1,92 @@
-import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
 import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
-import json
+
+import config
+from database import db
+from forecast_backends import BACKENDS, ProphetBackend
+from model_store import ForecastModelStore, series_fingerprint
+
+# Prophet settings of the per-attraction demand models
+ATTRACTION_MODEL_PARAMS = {
+    'yearly_seasonality': True,
+    'weekly_seasonality': True,
+    'daily_seasonality': False,
+    'seasonality_mode': 'multiplicative'
+}
+
+# Forecast of group sizes by travel date on the dashboard's seasonal tab
+GROUP_SIZE_MODEL_PARAMS = {'yearly_seasonality': True, 'weekly_seasonality': False}
+GROUP_SIZE_FORECAST_DAYS = 180
+
+
+def warm_start_init(previous_model, series, params=None):
+    """Stan initial values from the fitted parameters of previous_model, or
+    None when series doesn't extend the data window it was fitted on (it
+    starts on another day, or ends earlier), or when a model of series
+    with params has a different number of changepoints or seasonality
+    features than previous_model"""
+    ds = pd.to_datetime(series.loc[series['y'].notna(), 'ds'])
+    history = previous_model.history['ds']
+    if ds.empty or ds.min() != history.min() or ds.max() < history.max():
+        return None
+    fitted = previous_model.params
+    # Shapes of the parameters the new fit would have
+    inputs = Prophet(**(params or ATTRACTION_MODEL_PARAMS)).preprocess(series)
+    if len(fitted['delta'][0]) != inputs.S or len(fitted['beta'][0]) != inputs.K:
+        return None
+    init = {name: float(fitted[name][0][0]) for name in ('k', 'm', 'sigma_obs')}
+    init.update({name: fitted[name][0] for name in ('delta', 'beta')})
+    return init
+
+# The forecaster used by each worker process of a parallel run
+_worker_forecaster = None
+
+
+def _init_worker():
+    global _worker_forecaster
+    _worker_forecaster = DemandForecaster()
+
+
+def _forecast_in_worker(attraction, attraction_df, forecast_days):
+    """Fit and forecast one attraction in a worker process. The model is
+    returned as JSON, so the parent process can plot it; a failed fit
+    returns (None, error, seconds, 'failed') so its time is kept too."""
+    start = time.perf_counter()
+    try:
+        model, forecast = _worker_forecaster.forecast_attraction(attraction_df, attraction, forecast_days,
+                                                                 backend='prophet')
+    except Exception as e:
+        return None, e, time.perf_counter() - start, 'failed'
+    return (model_to_json(model), forecast, time.perf_counter() - start,
+            _worker_forecaster.last_fit['mode'])
+
 
 class DemandForecaster:
-    def __init__(self):
-        self.db_name = "dubai_tourism.db"
-        
-    def extract_attraction_data(self):
-        """Extract and process attraction data from interactions"""
-        conn = sqlite3.connect(self.db_name)
+    def __init__(self, model_store=None):
+        self.db = db
+        self.model_store = model_store or ForecastModelStore()
+        # How the last forecast_series call got its model: 'stored', 'warm'
+        # or 'cold', and the seconds it took
+        self.last_fit = None
         
-        # Get all interactions
+    def extract_attraction_data(self, until_id=None):
+        """Daily visit counts per attraction from the itinerary_activities
+        table, of the interactions up to until_id if given"""
         df = pd.read_sql_query("""
-            SELECT created_at, generated_itinerary
-            FROM interactions
-            WHERE generated_itinerary IS NOT NULL
-        """, conn)
-        
-        conn.close()
-        
-        # Process the data
-        attraction_counts = {}
-        
-        for _, row in df.iterrows():
-            date = pd.to_datetime(row['created_at']).date()
-            itinerary = json.loads(row['generated_itinerary'])
-            
-            if 'itinerary' in itinerary:
-                for day in itinerary['itinerary']:
-                    for activity in day['activities']:
-                        if isinstance(activity, str):
-                            activity_lines = activity.split('\n')
-                            title = None
-                            for line in activity_lines:
-                                if line.strip().startswith('- TITLE:'):
-                                    title = line.replace('- TITLE:', '').strip()
-                                    break
-                            
-                            if title:
-                                if date not in attraction_counts:
-                                    attraction_counts[date] = {}
-                                if title not in attraction_counts[date]:
-                                    attraction_counts[date][title] = 0
-                                attraction_counts[date][title] += 1
-        
-        # Convert to DataFrame
-        records = []
-        for date, attractions in attraction_counts.items():
-            for attraction, count in attractions.items():
-                records.append({
-                    'ds': date,
-                    'attraction': attraction,
-                    'y': count
-                })
-        
-        return pd.DataFrame(records)
+            SELECT title AS attraction, date(created_at) AS ds, COUNT(*) AS y
+            FROM itinerary_activities
+            WHERE title IS NOT NULL AND (? IS NULL OR interaction_id <= ?)
+            GROUP BY title, date(created_at)
+        """, self.db.connection(), params=(until_id, until_id))
+        df['ds'] = pd.to_datetime(df['ds']).dt.date
+
+        return df[['ds', 'attraction', 'y']]
     
     def train_forecast_model(self, df, attraction):
         """Train Prophet model for a specific attraction"""
@@ -65,15 +94,96 @@ class DemandForecaster:
         attraction_df = df[df['attraction'] == attraction][['ds', 'y']]
         
         # Create and train Prophet model
-        model = Prophet(
-            yearly_seasonality=True,
-            weekly_seasonality=True,
-            daily_seasonality=False,
-            seasonality_mode='multiplicative'
-        )
-        model.fit(attraction_df)
-        
+        return self.fit_model(attraction_df, ATTRACTION_MODEL_PARAMS)
+
+    def fit_model(self, series, params=None, init=None):
+        """Fit a Prophet model to a (ds, y) series, starting Stan from init
+        (see warm_start_init) instead of Prophet's defaults if given"""
+        model = Prophet(**(params or ATTRACTION_MODEL_PARAMS))
+        if init is None:
+            model.fit(series)
+        else:
+            model.fit(series, init=init)
         return model
+
+    def backend(self, name=None):
+        """The forecasting backend called name (FORECAST_BACKEND by default)"""
+        name = name or config.FORECAST_BACKEND
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown forecast backend {name!r}, expected one of {sorted(BACKENDS)}")
+        return ProphetBackend(self) if name == ProphetBackend.name else BACKENDS[name]()
+
+    def forecast_series(self, series_name, series, periods=30, params=None, load_model=True,
+                        warm_start=None, backend=None):
+        """Fit a Prophet model to a (ds, y) series and forecast it.
+
+        Returns (model, forecast). When the same series was already fitted
+        on identical rows with the same params and horizon, both come from
+        the model store instead; model is then None unless load_model.
+        Otherwise, with warm_start (FORECAST_WARM_START by default), the
+        fit starts from the parameters of the series' previous model, as
+        long as the data window only grew and params are unchanged.
+
+        With a backend other than Prophet (see forecast_backends), the
+        forecast comes from that backend and model is None.
+        """
+        params = params or ATTRACTION_MODEL_PARAMS
+        backend = backend or config.FORECAST_BACKEND
+        if backend != ProphetBackend.name:
+            start = time.perf_counter()
+            forecast = self.backend(backend).forecast({series_name: series}, periods, params)[series_name]
+            if isinstance(forecast, Exception):
+                raise forecast
+            self.last_fit = {'mode': backend, 'seconds': time.perf_counter() - start}
+            return None, forecast
+
+        key = self.model_store.key(series_name, params, periods, series_fingerprint(series))
+        start = time.perf_counter()
+        stored = self.model_store.get(key, load_model)
+        if stored is not None:
+            self.last_fit = {'mode': 'stored', 'seconds': time.perf_counter() - start}
+            return stored
+
+        init = None
+        if config.FORECAST_WARM_START if warm_start is None else warm_start:
+            previous = self.model_store.latest(series_name, params)
+            if previous is not None:
+                init = warm_start_init(previous[0], series, params)
+
+        start = time.perf_counter()
+        model = self.fit_model(series, params, init)
+        forecast = self.generate_forecast(model, periods=periods)
+        mode = 'cold' if init is None else 'warm'
+        seconds = time.perf_counter() - start
+        self.model_store.put(key, model, forecast, seconds, mode)
+        self.last_fit = {'mode': mode, 'seconds': seconds}
+        return model, forecast
+
+    def forecast_attraction(self, df, attraction, periods=30, load_model=True, warm_start=None,
+                            backend=None):
+        """(model, forecast) of one attraction's daily visits, through the model store"""
+        series = df[df['attraction'] == attraction][['ds', 'y']]
+        return self.forecast_series(f'attraction:{attraction}', series, periods,
+                                    ATTRACTION_MODEL_PARAMS, load_model, warm_start, backend)
+
+    def forecast_group_sizes(self, df, backend=None):
+        """6-month forecast of the group size of the interactions in df
+        (as loaded by InteractionAnalyzer) by their travel date"""
+        series = pd.DataFrame({'ds': pd.to_datetime(df['travel_dates']), 'y': df['group_size']})
+        _, forecast = self.forecast_series('travel_dates:group_size', series,
+                                           periods=GROUP_SIZE_FORECAST_DAYS,
+                                           params=GROUP_SIZE_MODEL_PARAMS,
+                                           load_model=False, backend=backend)
+        return forecast
+
+    def evict_removed_attractions(self, df):
+        """Drop stored models of attractions no longer in df"""
+        removed = self.model_store.evict(
+            {f'attraction:{attraction}' for attraction in df['attraction'].unique()},
+            prefix='attraction:')
+        if removed:
+            print(f"Evicted {removed} stored forecast model(s) of attractions without data")
+        return removed
     
     def generate_forecast(self, model, periods=30):
         """Generate forecast for future periods"""
@@ -82,8 +192,26 @@ class DemandForecaster:
         
         return forecast
     
-    def plot_forecast(self, model, forecast, attraction_name):
-        """Plot the forecast results"""
+    def plot_forecast(self, model, forecast, attraction_name, history=None):
+        """Plot the forecast results. Without a Prophet model (other
+        backends), the forecast is plotted against the history (ds, y) and
+        there are no components to plot."""
+        if model is None:
+            fig, ax = plt.subplots(figsize=(12, 8))
+            if history is not None:
+                ax.plot(pd.to_datetime(history['ds']), history['y'], 'k.', label='Actual')
+            ax.plot(forecast['ds'], forecast['yhat'], color='#0072B2', label='Forecast')
+            ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'],
+                            color='#0072B2', alpha=0.2)
+            ax.legend()
+            plt.title(f'Demand Forecast for {attraction_name}')
+            plt.xlabel('Date')
+            plt.ylabel('Number of Visits')
+            plt.tight_layout()
+            plt.savefig(f'forecast_{attraction_name.lower().replace(" ", "_")}.png')
+            plt.close()
+            return
+
         plt.figure(figsize=(12, 8))
         
         # Plot actual vs predicted
@@ -102,12 +230,93 @@ class DemandForecaster:
         plt.savefig(f'components_{attraction_name.lower().replace(" ", "_")}.png')
         plt.close()
     
-    def analyze_top_attractions(self, n_attractions=5, forecast_days=30):
-        """Analyze and forecast demand for top attractions"""
+    def forecast_attractions(self, df, attractions, forecast_days=30, workers=None, backend=None):
+        """Fit and forecast each attraction, on a pool of worker processes
+        when workers > 1.
+
+        Yields (attraction, model, forecast, seconds, mode) as each one
+        finishes, where mode is how the model was obtained ('stored', 'warm'
+        or 'cold'), or (attraction, None, error, seconds, 'failed') if it
+        failed; one failure doesn't stop the others. If the worker itself
+        dies, seconds are counted from when the attraction was submitted.
+        Backends other than Prophet forecast every attraction in one batch;
+        their model is None, mode is the backend name and seconds are the
+        batch's share per attraction.
+        """
+        backend = backend or config.FORECAST_BACKEND
+        if backend != ProphetBackend.name:
+            start = time.perf_counter()
+            series = {attraction: df[df['attraction'] == attraction][['ds', 'y']]
+                      for attraction in attractions}
+            forecasts = self.backend(backend).forecast(series, forecast_days, ATTRACTION_MODEL_PARAMS)
+            seconds = (time.perf_counter() - start) / max(len(attractions), 1)
+            for attraction in attractions:
+                forecast = forecasts[attraction]
+                if isinstance(forecast, Exception):
+                    yield attraction, None, forecast, seconds, 'failed'
+                else:
+                    yield attraction, None, forecast, seconds, backend
+            return
+
+        workers = workers or config.FORECAST_WORKERS
+        if workers <= 1:
+            for attraction in attractions:
+                start = time.perf_counter()
+                try:
+                    model, forecast = self.forecast_attraction(df, attraction, forecast_days,
+                                                               backend=backend)
+                    yield attraction, model, forecast, time.perf_counter() - start, self.last_fit['mode']
+                except Exception as e:
+                    yield attraction, None, e, time.perf_counter() - start, 'failed'
+            return
+
+        # Attractions whose data hasn't changed are loaded here; only the
+        # others are sent to the workers
+        to_fit = []
+        for attraction in attractions:
+            start = time.perf_counter()
+            series = df[df['attraction'] == attraction][['ds', 'y']]
+            stored = self.model_store.get(self.model_store.key(
+                f'attraction:{attraction}', ATTRACTION_MODEL_PARAMS, forecast_days,
+                series_fingerprint(series)))
+            if stored is None:
+                to_fit.append(attraction)
+            else:
+                yield attraction, *stored, time.perf_counter() - start, 'stored'
+        if not to_fit:
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            submitted = time.perf_counter()
+            futures = {
+                executor.submit(_forecast_in_worker, attraction,
+                                df[df['attraction'] == attraction], forecast_days): attraction
+                for attraction in to_fit
+            }
+            for future in as_completed(futures):
+                attraction = futures[future]
+                try:
+                    model_json, forecast, seconds, mode = future.result()
+                except Exception as e:
+                    yield attraction, None, e, time.perf_counter() - submitted, 'failed'
+                    continue
+                if mode == 'failed':
+                    yield attraction, None, forecast, seconds, mode
+                else:
+                    yield attraction, model_from_json(model_json), forecast, seconds, mode
+
+    def analyze_top_attractions(self, n_attractions=5, forecast_days=30, workers=None, plot=True,
+                                backend=None, df=None):
+        """Analyze and forecast demand for top attractions (every attraction
+        if n_attractions is None), from df if given (as returned by
+        extract_attraction_data)"""
         print("Starting demand forecasting analysis...")
+        run_start = time.perf_counter()
         
         # Extract data
-        df = self.extract_attraction_data()
+        if df is None:
+            df = self.extract_attraction_data()
+        self.evict_removed_attractions(df)
         
         # Get top attractions by total visits
         top_attractions = (
@@ -117,35 +326,49 @@ class DemandForecaster:
             .head(n_attractions)
             .index
             .tolist()
-        )
+        ) if n_attractions is not None else df['attraction'].unique().tolist()
         
         results = {}
+        fit_seconds = 0.0
+        modes = {}
         
-        for attraction in top_attractions:
+        for attraction, model, forecast, seconds, mode in self.forecast_attractions(
+                df, top_attractions, forecast_days, workers, backend):
             print(f"\nAnalyzing: {attraction}")
+            modes[mode] = modes.get(mode, 0) + 1
+            fit_seconds += seconds
+            if mode == 'failed':
+                print(f"Error forecasting {attraction} after {seconds:.2f} s: {str(forecast)}")
+                continue
             
             try:
-                # Train model
-                model = self.train_forecast_model(df, attraction)
-                
-                # Generate forecast
-                forecast = self.generate_forecast(model, periods=forecast_days)
-                
                 # Plot results
-                self.plot_forecast(model, forecast, attraction)
+                plot_start = time.perf_counter()
+                if plot:
+                    self.plot_forecast(model, forecast, attraction,
+                                       history=df[df['attraction'] == attraction])
                 
                 # Store results
                 results[attraction] = {
                     'current_demand': df[df['attraction'] == attraction]['y'].mean(),
                     'forecast_mean': forecast.tail(forecast_days)['yhat'].mean(),
-                    'forecast_trend': 'Increasing' if forecast.tail(forecast_days)['trend'].is_monotonic_increasing else 'Decreasing'
+                    'forecast_trend': 'Increasing' if forecast.tail(forecast_days)['trend'].is_monotonic_increasing else 'Decreasing',
+                    'fit_seconds': seconds,
+                    'fit_mode': mode,
+                    'forecast': forecast
                 }
                 
-                print(f"Generated forecast for {attraction}")
+                print(f"Generated forecast for {attraction} "
+                      f"({mode} model and forecast {seconds:.2f} s, plots {time.perf_counter() - plot_start:.2f} s)")
                 
             except Exception as e:
                 print(f"Error forecasting {attraction}: {str(e)}")
         
+        total_seconds = time.perf_counter() - run_start
+        print(f"\nForecast {len(results)} of {len(top_attractions)} attractions in {total_seconds:.2f} s "
+              f"({fit_seconds:.2f} s of fitting, {workers or config.FORECAST_WORKERS} worker(s); "
+              + ", ".join(f"{count} {mode}" for mode, count in sorted(modes.items())) + ")")
+        
         # Print summary
         print("\nForecast Summary:")
         print("-----------------")
@@ -159,4 +382,11 @@ class DemandForecaster:
 
 if __name__ == "__main__":
     forecaster = DemandForecaster()
-    forecaster.analyze_top_attractions() 
\ No newline at end of file
+    # "python forecast_demand.py [all] [prophet|numpy]": "all" forecasts
+    # every attraction, and a backend name overrides FORECAST_BACKEND
+    args = sys.argv[1:]
+    backend = next((arg for arg in args if arg in BACKENDS), None)
+    if "all" in args:
+        forecaster.analyze_top_attractions(n_attractions=None, backend=backend)
+    else:
+        forecaster.analyze_top_attractions(backend=backend) 
\ No newline at end of file
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from forecast_backends import FORECAST_COLUMNS
+
+# Forecasts written by refresh_forecasts.py and read by the dashboard
+ATTRACTION_DEMAND = 'attraction_demand'
+SEASONAL_GROUP_SIZE = 'seasonal_group_size'
+
+
+def create_forecast_tables(cursor):
+    # One row per refresh of a forecast; its id is the forecast's version
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            generated_at TIMESTAMP NOT NULL,
+            interactions_watermark INTEGER,
+            series INTEGER NOT NULL,
+            failed INTEGER NOT NULL DEFAULT 0,
+            seconds REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_forecast_runs_name
+        ON forecast_runs (name, id)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_points (
+            run_id INTEGER NOT NULL REFERENCES forecast_runs (id) ON DELETE CASCADE,
+            series TEXT NOT NULL,
+            ds DATE NOT NULL,
+            trend REAL,
+            yhat_lower REAL,
+            yhat_upper REAL,
+            yhat REAL,
+            PRIMARY KEY (run_id, series, ds)
+        ) WITHOUT ROWID
+    ''')
+
+
+def write_forecast_run(conn, name, backend, forecasts, failed=0, watermark=None,
+                       seconds=None, keep=None):
+    """Store {series: forecast frame} as a new version of forecast name, in
+    one transaction, and drop all but the newest keep versions. Returns
+    the new version's id."""
+    generated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    with conn:
+        run_id = conn.execute('''
+            INSERT INTO forecast_runs (
+                name, backend, generated_at, interactions_watermark, series, failed, seconds
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (name, backend, generated_at, watermark, len(forecasts), failed, seconds)).lastrowid
+        for series, forecast in forecasts.items():
+            points = forecast[FORECAST_COLUMNS].assign(
+                ds=pd.to_datetime(forecast['ds']).dt.strftime('%Y-%m-%d'))
+            conn.executemany('''
+                INSERT INTO forecast_points (run_id, series, ds, trend, yhat_lower, yhat_upper, yhat)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(run_id, series, *row) for row in points.itertuples(index=False)])
+        if keep:
+            conn.execute('''
+                DELETE FROM forecast_runs
+                WHERE name = ? AND id NOT IN (
+                    SELECT id FROM forecast_runs WHERE name = ? ORDER BY id DESC LIMIT ?
+                )
+            ''', (name, name, keep))
+    return run_id
+
+
+def latest_forecast_run(conn, name):
+    """The newest version of forecast name as a dict, or None if it was
+    never generated"""
+    cursor = conn.execute('''
+        SELECT * FROM forecast_runs WHERE name = ? ORDER BY id DESC LIMIT 1
+    ''', (name,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([column[0] for column in cursor.description], row))
+
+
+def forecast_series_names(conn, run_id):
+    """Series forecast by a run, in name order"""
+    return [row[0] for row in conn.execute(
+        'SELECT DISTINCT series FROM forecast_points WHERE run_id = ? ORDER BY series', (run_id,))]
+
+
+def read_forecast(conn, run_id, series):
+    """Forecast frame of one series of a run, as the backends return it"""
+    forecast = pd.read_sql_query(f'''
+        SELECT {", ".join(FORECAST_COLUMNS)} FROM forecast_points
+        WHERE run_id = ? AND series = ?
+        ORDER BY ds
+    ''', conn, params=(run_id, series))
+    forecast['ds'] = pd.to_datetime(forecast['ds'])
+    return forecast
@@ -1,11 +1,12 @@
-import sqlite3
-import json
 from datetime import datetime, timedelta
 import random
 
+import config
+from database import DubaiTourismDB
+
 class SampleDataGenerator:
     def __init__(self):
-        self.db_name = "dubai_tourism.db"
+        self.db_name = config.DB_PATH
         self.attractions = [
             {
                 "title": "Burj Khalifa Observation Deck",
@@ -116,8 +117,7 @@ class SampleDataGenerator:
 
     def generate_sample_data(self, num_records=100):
         """Generate sample interaction records"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        records = []
         
         # Generate records over the last 60 days
         end_date = datetime.now()
@@ -137,33 +137,20 @@ class SampleDataGenerator:
             # Generate itinerary
             itinerary = self.generate_itinerary(duration)
             
-            # Store in database
-            cursor.execute('''
-                INSERT INTO interactions (
-                    session_id,
-                    travel_dates,
-                    duration,
-                    group_info,
-                    preferences,
-                    budget,
-                    conversation_history,
-                    generated_itinerary,
-                    created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"sample_session_{_}",
-                (interaction_date + timedelta(days=30)).strftime("%Y-%m-%d"),
-                str(duration),
-                group_info,
-                ", ".join(preferences),
-                f"USD {budget}",
-                json.dumps(["Sample conversation"]),
-                json.dumps(itinerary),
-                interaction_date.strftime("%Y-%m-%d %H:%M:%S")
-            ))
+            records.append({
+                'session_id': f"sample_session_{_}",
+                'travel_dates': (interaction_date + timedelta(days=30)).strftime("%Y-%m-%d"),
+                'duration': str(duration),
+                'group_info': group_info,
+                'preferences': ", ".join(preferences),
+                'budget': f"USD {budget}",
+                'conversation_history': ["Sample conversation"],
+                'generated_itinerary': itinerary,
+                'created_at': interaction_date.strftime("%Y-%m-%d %H:%M:%S")
+            })
         
-        conn.commit()
-        conn.close()
+        # Store in database, filling the typed columns and itinerary_activities
+        DubaiTourismDB(self.db_name).store_interactions(records)
         print(f"Generated {num_records} sample records")
 
 if __name__ == "__main__":
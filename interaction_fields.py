@@ -0,0 +1,167 @@
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+import config
+
+MONTHS = {name: number for number, name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july", "august",
+     "september", "october", "november", "december"], start=1)}
+MONTHS.update({name[:3]: number for name, number in list(MONTHS.items())})
+
+NUMBER_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k\b)?')
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+DAY_MONTH_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([a-z]+)\.?,?(?:\s+(\d{4}))?')
+MONTH_DAY_RE = re.compile(r'([a-z]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?(?:\s+(\d{4}))?')
+
+
+def parse_number(text):
+    """Return the first number in text ("$5,000", "5k", "USD 4200"), or None"""
+    if text is None:
+        return None
+    match = NUMBER_RE.search(str(text).lower())
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', ''))
+    return value * 1000 if match.group(2) else value
+
+
+def parse_duration_days(duration):
+    """Number of days in a duration like "5 days", or None"""
+    match = re.search(r'(\d+)', str(duration)) if duration is not None else None
+    return int(match.group(1)) if match else None
+
+
+def parse_group_size(group_info):
+    """Number of travellers described by group_info, e.g. 4 for "family with 2 kids" """
+    if group_info is None:
+        return 1
+    text = str(group_info).lower()
+    numbers = re.findall(r'\d+', text)
+    if numbers:
+        # "family with X kids" also has two parents
+        if 'family' in text:
+            return int(numbers[0]) + 2
+        return int(numbers[0])
+    if 'solo' in text:
+        return 1
+    if 'couple' in text:
+        return 2
+    return 1
+
+
+def parse_travel_date(travel_dates, reference=None):
+    """ISO date ("2024-12-20") of the start of a trip, or None.
+
+    Understands ISO dates and day/month text such as "2nd November"; when the
+    year is missing it is the first such date on or after reference (the
+    interaction's created_at, default today).
+    """
+    if travel_dates is None:
+        return None
+    text = str(travel_dates).strip().lower()
+    match = ISO_DATE_RE.match(text)
+    if match:
+        try:
+            return date(*map(int, match.groups())).isoformat()
+        except ValueError:
+            return None
+
+    match = DAY_MONTH_RE.search(text)
+    if match and match.group(2) in MONTHS:
+        day, month, year = match.group(1), match.group(2), match.group(3)
+    else:
+        match = MONTH_DAY_RE.search(text)
+        if not match or match.group(1) not in MONTHS:
+            return None
+        month, day, year = match.group(1), match.group(2), match.group(3)
+
+    if isinstance(reference, str):
+        reference = datetime.strptime(reference[:10], '%Y-%m-%d').date()
+    reference = reference or date.today()
+    try:
+        if year:
+            return date(int(year), MONTHS[month], int(day)).isoformat()
+        parsed = date(reference.year, MONTHS[month], int(day))
+        if parsed < reference:
+            parsed = date(reference.year + 1, MONTHS[month], int(day))
+        return parsed.isoformat()
+    except ValueError:
+        return None
+
+
+# The answers repeat heavily (a dozen group types, a few dozen durations and
+# budgets), so typed_columns parses each distinct value once and keeps the
+# results in these bounded memo tables for later batches
+_memo = lru_cache(maxsize=config.FIELD_PARSE_CACHE_SIZE)
+_parse_number = _memo(parse_number)
+_parse_duration_days = _memo(parse_duration_days)
+_parse_group_size = _memo(parse_group_size)
+_parse_travel_date = _memo(parse_travel_date)
+MEMOIZED_PARSERS = {
+    'budget_value': _parse_number,
+    'duration_days': _parse_duration_days,
+    'group_size': _parse_group_size,
+    'travel_date': _parse_travel_date
+}
+
+
+def _text(value):
+    # Memo keys must be hashable; the parsers work on str(value) anyway
+    return None if value is None else str(value)
+
+
+def _day(reference):
+    if reference is None:
+        return date.today().isoformat()
+    if isinstance(reference, str):
+        return reference[:10]
+    return reference.isoformat()
+
+
+def _encode(values, parser):
+    """parser applied to each distinct value once, mapped back to every row"""
+    parsed = {value: parser(value) for value in set(values)}
+    return [parsed[value] for value in values]
+
+
+def parse_travel_dates(travel_dates, created_at):
+    """parse_travel_date over a column of answers and their references,
+    parsing each distinct (answer, reference day) once"""
+    travel_dates = [_text(value) for value in travel_dates]
+    # ISO dates don't depend on the reference day, so they share one entry
+    iso = {text: text is None or ISO_DATE_RE.match(text.strip()) is not None
+           for text in set(travel_dates)}
+    travel_keys = [(text, None if iso[text] else _day(reference))
+                   for text, reference in zip(travel_dates, created_at)]
+    return _encode(travel_keys, lambda key: _parse_travel_date(*key))
+
+
+def typed_columns(budget, duration, group_info, travel_dates, created_at):
+    """The typed analytic columns of many interactions, given their answers
+    column by column. Returns {column: [value per row]}."""
+    return {
+        'budget_value': _encode([_text(value) for value in budget], _parse_number),
+        'duration_days': _encode([_text(value) for value in duration], _parse_duration_days),
+        'group_size': _encode([_text(value) for value in group_info], _parse_group_size),
+        'travel_date': parse_travel_dates(travel_dates, created_at)
+    }
+
+
+def typed_fields(data, created_at=None):
+    """The typed analytic columns of an interaction record"""
+    columns = typed_columns([data.get('budget')], [data.get('duration')],
+                            [data.get('group_info')], [data.get('travel_dates')],
+                            [created_at])
+    return {column: values[0] for column, values in columns.items()}
+
+
+def parse_cache_stats():
+    """Hits, misses and size of each memo table"""
+    return {column: parser.cache_info()._asdict()
+            for column, parser in MEMOIZED_PARSERS.items()}
+
+
+def clear_parse_caches():
+    for parser in MEMOIZED_PARSERS.values():
+        parser.cache_clear()
@@ -0,0 +1,163 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from database import db
+
+
+class InteractionWriter:
+    """Write-behind queue that takes interaction logging off the response path.
+
+    submit() only enqueues the record. A background task group-commits
+    queued records with one executemany per batch, once batch_size records
+    are waiting or flush_interval_seconds after the oldest arrived, and
+    stop() flushes whatever is left. A batch that fails is retried record
+    by record, so a bad record doesn't take the rest of its batch with it.
+    Until start() is called (scripts, or an app without its lifespan
+    running) records are written synchronously.
+    """
+
+    def __init__(self, database=None, batch_size=None, flush_interval_seconds=None,
+                 max_queue=None, retries=3, retry_delay_seconds=0.1):
+        self.db = database or db
+        self.batch_size = batch_size or config.INTERACTION_BATCH_SIZE
+        self.flush_interval_seconds = (flush_interval_seconds
+                                       or config.INTERACTION_FLUSH_INTERVAL_SECONDS)
+        self.max_queue = max_queue or config.INTERACTION_QUEUE_MAX
+        self.retries = retries
+        self.retry_delay_seconds = retry_delay_seconds
+        self._queue = None
+        self._task = None
+        self._executor = None
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def submit(self, data: dict):
+        """Queue an interaction to be stored"""
+        if self._task is None:
+            self.db.store_interaction(data)
+            return
+        try:
+            self._queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Rather block this request than drop the record
+            print("Interaction queue full, storing synchronously")
+            self.db.store_interaction(data)
+
+    async def start(self):
+        """Start the background writer on the running event loop"""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        # One thread, so every batch goes through the same connection
+        self._executor = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix="interaction-writer")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued so far and stop the background writer"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.db.close)
+        self._executor.shutdown()
+        self._executor = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                if not queue.empty():
+                    item = queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Records submitted after stop() was called
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                await self._flush([item])
+
+    async def _flush(self, batch):
+        start = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._store, batch)
+        elapsed = time.perf_counter() - start
+        self.batches += 1
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.total_flush_seconds += elapsed
+
+    def _store(self, batch):
+        """Store a batch in one transaction. If that fails, retry each
+        record on its own so only the bad ones are dropped; a record that
+        hits a locked or busy database is tried again after a pause."""
+        try:
+            self.db.store_interactions(batch)
+            self.rows_written += len(batch)
+            return
+        except Exception as e:
+            if len(batch) > 1:
+                print(f"Error storing {len(batch)} interactions, retrying one at a time: {str(e)}")
+        for record in batch:
+            for attempt in range(self.retries + 1):
+                try:
+                    self.db.store_interactions([record])
+                    self.rows_written += 1
+                    break
+                except sqlite3.OperationalError as e:
+                    if attempt == self.retries:
+                        self.rows_failed += 1
+                        print(f"Giving up on interaction of session {record.get('session_id')}: {str(e)}")
+                    else:
+                        time.sleep(self.retry_delay_seconds * 2 ** attempt)
+                except Exception as e:
+                    self.rows_failed += 1
+                    print(f"Dropping interaction of session {record.get('session_id')}: {str(e)}")
+                    break
+
+    def stats(self):
+        """Queue depth and flush counters for this process"""
+        return {
+            'running': self._task is not None,
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'batches': self.batches,
+            'rows_written': self.rows_written,
+            'rows_failed': self.rows_failed,
+            'avg_batch_size': self.rows_written / self.batches if self.batches else 0.0,
+            'last_flush_ms': self.last_flush_seconds * 1000,
+            'avg_flush_ms': (self.total_flush_seconds / self.batches * 1000
+                             if self.batches else 0.0),
+            'max_flush_ms': self.max_flush_seconds * 1000,
+            'batch_size': self.batch_size,
+            'flush_interval_seconds': self.flush_interval_seconds
+        }
+
+
+# Create a global instance
+interaction_writer = InteractionWriter()
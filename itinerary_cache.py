@@ -0,0 +1,156 @@
+import asyncio
+import json
+import hashlib
+import re
+import time
+import threading
+
+import config
+from database import db
+from interaction_fields import parse_number
+
+STOPWORDS = {
+    "a", "an", "and", "the", "with", "of", "in", "on", "for", "to", "i", "we",
+    "my", "our", "me", "us", "like", "love", "want", "would", "interested",
+    "really", "some", "also", "please", "plus", "or"
+}
+
+
+def normalize_text(text):
+    """Canonicalize free text so word order, case and filler words don't matter"""
+    if text is None:
+        return ""
+    tokens = set()
+    for token in re.findall(r'[a-z0-9]+', str(text).lower()):
+        if token in STOPWORDS:
+            continue
+        # Crude singular form so "safaris" and "safari" match
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.add(token)
+    return " ".join(sorted(tokens))
+
+
+def normalize_duration(duration):
+    value = parse_number(duration)
+    return int(value) if value is not None else normalize_text(duration)
+
+
+def bucket_budget(budget, bucket_size=None):
+    """Round a budget to the nearest bucket, e.g. ~$4800 and $5200 both -> 5000"""
+    bucket_size = bucket_size or config.ITINERARY_CACHE_BUDGET_BUCKET
+    value = parse_number(budget)
+    if value is None:
+        return normalize_text(budget)
+    return int(round(value / bucket_size) * bucket_size)
+
+
+def cache_key(state):
+    """Hash of the normalized trip parameters of a conversation state"""
+    normalized = [
+        normalize_duration(state.get("duration")),
+        bucket_budget(state.get("budget")),
+        normalize_text(state.get("group_info")),
+        normalize_text(state.get("preferences")),
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+
+
+class ItineraryCache:
+    """SQLite-backed cache of parsed itineraries with LRU and TTL eviction.
+
+    Queries go through the database's per-thread connection. The request
+    handlers call get_async() and put_async(), which run them on a worker
+    thread so a locked database doesn't stall the event loop.
+    """
+
+    def __init__(self, database=None, max_entries=None, ttl_seconds=None):
+        self.db = database or db
+        self.max_entries = max_entries or config.ITINERARY_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or config.ITINERARY_CACHE_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.init_db()
+
+    def init_db(self):
+        """Create the cache table if it doesn't exist"""
+        with self.db.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS itinerary_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_itinerary_cache_last_used
+                ON itinerary_cache (last_used_at)
+            ''')
+
+    def get(self, state):
+        """Return the cached payload for a conversation state, or None"""
+        key = cache_key(state)
+        now = time.time()
+        with self.db.connection() as conn:
+            row = conn.execute('SELECT payload, created_at FROM itinerary_cache WHERE cache_key = ?',
+                               (key,)).fetchone()
+            payload = None
+            if row and now - row[1] <= self.ttl_seconds:
+                payload = json.loads(row[0])
+                conn.execute('UPDATE itinerary_cache SET last_used_at = ? WHERE cache_key = ?', (now, key))
+            elif row:
+                conn.execute('DELETE FROM itinerary_cache WHERE cache_key = ?', (key,))
+
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    def put(self, state, payload):
+        """Store a parsed itinerary payload and evict expired and least recently used entries"""
+        now = time.time()
+        with self.db.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO itinerary_cache (cache_key, payload, created_at, last_used_at)
+                VALUES (?, ?, ?, ?)
+            ''', (cache_key(state), json.dumps(payload), now, now))
+            conn.execute('DELETE FROM itinerary_cache WHERE created_at < ?', (now - self.ttl_seconds,))
+            conn.execute('''
+                DELETE FROM itinerary_cache WHERE cache_key IN (
+                    SELECT cache_key FROM itinerary_cache
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    async def get_async(self, state):
+        """get() on a worker thread"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, state)
+
+    async def put_async(self, state, payload):
+        """put() on a worker thread"""
+        await asyncio.get_running_loop().run_in_executor(None, self.put, state, payload)
+
+    def stats(self):
+        """Hit/miss counters for this process and the current cache size"""
+        size = self.db.connection().execute('SELECT COUNT(*) FROM itinerary_cache').fetchone()[0]
+
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'entries': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+
+# Create a global instance
+itinerary_cache = ItineraryCache()
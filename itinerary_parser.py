@@ -0,0 +1,416 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+ACTIVITY_FIELDS = ("TIME", "TITLE", "DESCRIPTION", "LOCATION", "PRICE")
+HOTEL_FIELDS = ("NAME", "CATEGORY", "LOCATION", "PRICE", "AMENITIES",
+                "DESCRIPTION", "RATING")
+KNOWN_FIELDS = frozenset(ACTIVITY_FIELDS + HOTEL_FIELDS)
+
+BULLETS = "-*•"
+DAY_RE = re.compile(r"day\s*(\d+)\s*(?:$|[:.\-–—(])", re.IGNORECASE)
+LABEL_RE = re.compile(r"[A-Za-z][A-Za-z &/]{0,29}")
+NUMBERED_RE = re.compile(r"\d{1,2}[.)]\s+")
+
+# Activities written exactly as the prompt asks take a fast path that
+# matches all five labelled lines in one go
+CANONICAL_ACTIVITY_RE = re.compile("".join(
+    rf"[ \t]*- {key}:([^\n]*)\n" for key in ACTIVITY_FIELDS) + r"([ \t\r]*\n)?")
+
+
+@dataclass
+class HotelRecord:
+    """Hotel suggestion with its labelled fields (NAME, PRICE, ...)"""
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def name(self):
+        return self.fields.get("NAME")
+
+    @property
+    def price(self):
+        return self.fields.get("PRICE")
+
+    def to_dict(self):
+        return dict(self.fields)
+
+
+@dataclass
+class ActivityRecord:
+    """One scheduled activity of a day"""
+    day: int
+    time: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    price: Optional[str] = None
+    extra: Dict[str, str] = field(default_factory=dict)
+
+    def to_lines(self):
+        """Render in the "- KEY: value" line format the chat UI expects"""
+        if not self.extra and None not in (self.time, self.title, self.description,
+                                           self.location, self.price):
+            return ["- TIME: " + self.time, "- TITLE: " + self.title,
+                    "- DESCRIPTION: " + self.description,
+                    "- LOCATION: " + self.location, "- PRICE: " + self.price]
+
+        lines = []
+        if self.time is not None:
+            lines.append("- TIME: " + self.time)
+        if self.title is not None:
+            lines.append("- TITLE: " + self.title)
+        if self.description is not None:
+            lines.append("- DESCRIPTION: " + self.description)
+        if self.location is not None:
+            lines.append("- LOCATION: " + self.location)
+        if self.price is not None:
+            lines.append("- PRICE: " + self.price)
+        for key, value in self.extra.items():
+            lines.append(f"- {key}: {value}")
+        return lines
+
+
+@dataclass
+class DayRecord:
+    """A completed day with its activities"""
+    day: int
+    activities: List[ActivityRecord] = field(default_factory=list)
+
+    def to_dict(self):
+        """Match the {"day": n, "activities": [...]} shape of ItineraryResponse"""
+        lines = []
+        for activity in self.activities:
+            lines.extend(activity.to_lines())
+        return {"day": self.day, "activities": lines}
+
+
+@dataclass
+class RecommendationRecord:
+    """One travel tip, e.g. topic "Weather Considerations" and its detail"""
+    text: str
+
+    @property
+    def topic(self):
+        return self.text.split(":", 1)[0].strip() if ":" in self.text else None
+
+    @property
+    def detail(self):
+        return self.text.split(":", 1)[1].strip() if ":" in self.text else self.text
+
+
+@dataclass
+class ParsedItinerary:
+    """Collects the records produced by ItineraryParser"""
+    hotel: Optional[HotelRecord] = None
+    days: List[DayRecord] = field(default_factory=list)
+    recommendations: List[RecommendationRecord] = field(default_factory=list)
+
+    def add(self, record):
+        if isinstance(record, DayRecord):
+            self.days.append(record)
+        elif isinstance(record, RecommendationRecord):
+            self.recommendations.append(record)
+        elif isinstance(record, HotelRecord):
+            self.hotel = record
+
+    def hotel_suggestion(self):
+        return self.hotel.to_dict() if self.hotel else None
+
+    def itinerary(self):
+        return [day.to_dict() for day in self.days]
+
+    def recommendation_texts(self):
+        return [recommendation.text for recommendation in self.recommendations]
+
+
+def _split_label(line, bullet):
+    """Split "LABEL: value" into (LABEL, value), or return (None, None).
+
+    Unbulleted "text: more text" is treated as prose unless the label is
+    one of the known itinerary fields.
+    """
+    colon = line.find(":")
+    if colon <= 0:
+        return None, None
+    key = line[:colon].strip().upper()
+    if key not in KNOWN_FIELDS:
+        if not bullet or not LABEL_RE.fullmatch(key):
+            return None, None
+    return key, line[colon + 1:].strip()
+
+
+class ItineraryParser:
+    """Single-pass state machine over itinerary text.
+
+    feed() accepts arbitrary chunks (whole responses or streamed tokens) and
+    returns the records completed so far; close() flushes the rest once the
+    text ends. Records are HotelRecord, ActivityRecord, DayRecord (emitted
+    after its activities) and RecommendationRecord.
+
+    The parser tolerates common drift from the prompt's format: missing
+    blank lines, markdown such as "**Day 1**" or "### Recommendations",
+    "*", "•" or numbered bullets and labels without a leading dash.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._section = None
+        self._hotel = None
+        self._day = None
+        self._fields = None
+        self._recommendation = None
+        self._last_key = None
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the records it completed"""
+        self._buffer += chunk
+        newline = self._buffer.rfind("\n")
+        if newline < 0:
+            return []
+
+        complete = self._buffer[:newline + 1]
+        self._buffer = self._buffer[newline + 1:]
+        records = []
+        match_activity = CANONICAL_ACTIVITY_RE.match
+        position = 0
+        while position <= newline:
+            if self._section == "day":
+                match = match_activity(complete, position)
+                if match:
+                    if self._fields is not None:
+                        self._end_activity(records)
+                    time, title, description, location, price, blank = match.groups()
+                    if blank is None:
+                        # More lines may still belong to this activity
+                        self._fields = {
+                            "TIME": time.strip(),
+                            "TITLE": title.strip(),
+                            "DESCRIPTION": description.strip(),
+                            "LOCATION": location.strip(),
+                            "PRICE": price.strip()
+                        }
+                        self._last_key = "PRICE"
+                    else:
+                        activity = ActivityRecord(self._day.day, time.strip(),
+                                                  title.strip(),
+                                                  description.strip(),
+                                                  location.strip(),
+                                                  price.strip(), {})
+                        self._day.activities.append(activity)
+                        records.append(activity)
+                    position = match.end()
+                    continue
+
+            end = complete.find("\n", position)
+            self._process_line(complete[position:end], records)
+            position = end + 1
+        return records
+
+    def close(self):
+        """Flush the remaining buffer and return the final records"""
+        records = []
+        if self._buffer:
+            self._process_line(self._buffer, records)
+            self._buffer = ""
+        self._end_section(records)
+        return records
+
+    def _process_line(self, line, records):
+        line = line.strip()
+        if not line:
+            # A blank line closes the current activity or tip
+            if self._fields is not None:
+                self._end_activity(records)
+            if self._recommendation is not None:
+                self._end_recommendation(records)
+            return
+
+        # Drop markdown emphasis and heading markers
+        if "**" in line:
+            line = line.replace("**", "").strip()
+            if not line:
+                return
+        first = line[0]
+        if first == "#":
+            line = line.lstrip("#").strip()
+            if not line:
+                return
+            first = line[0]
+
+        if first in BULLETS:
+            bullet = True
+            line = line[1:].lstrip()
+        elif first.isdigit() and NUMBERED_RE.match(line):
+            bullet = True
+            line = line[NUMBERED_RE.match(line).end():]
+        else:
+            bullet = False
+            if self._start_section(line, records):
+                return
+
+        section = self._section
+        if section == "day":
+            key, value = _split_label(line, bullet)
+            if key is not None:
+                self._set_activity_field(key, value, records)
+            elif self._fields is not None and self._last_key is not None:
+                self._fields[self._last_key] += " " + line
+        elif section == "recommendations":
+            if bullet or self._recommendation is None:
+                if self._recommendation is not None:
+                    self._end_recommendation(records)
+                self._recommendation = RecommendationRecord(text=line)
+            else:
+                self._recommendation.text += " " + line
+        else:
+            key, value = _split_label(line, bullet)
+            if section is None and key not in HOTEL_FIELDS:
+                return
+            if self._hotel is None:
+                self._section = "hotel"
+                self._hotel = HotelRecord()
+            if key is not None:
+                self._hotel.fields[key] = value
+                self._last_key = key
+            elif self._last_key in self._hotel.fields:
+                self._hotel.fields[self._last_key] += " " + line
+
+    def _start_section(self, line, records):
+        """Handle a section header line; return True if it was one"""
+        lower = line[:16].lower()
+        if lower.startswith("day"):
+            match = DAY_RE.match(line)
+            if not match:
+                return False
+            self._end_section(records)
+            day = int(match.group(1))
+            if day:
+                self._section = "day"
+                self._day = DayRecord(day=day)
+            return True
+        if lower.startswith("hotel suggestion"):
+            self._end_section(records)
+            self._section = "hotel"
+            self._hotel = HotelRecord()
+            return True
+        if lower.startswith("recommendation"):
+            self._end_section(records)
+            self._section = "recommendations"
+            return True
+        return False
+
+    def _set_activity_field(self, key, value, records):
+        fields = self._fields
+        # A repeated label, or a new TIME, starts the next activity even
+        # when the blank line between them is missing
+        if fields is not None and (key in fields or (key == "TIME" and fields)):
+            self._end_activity(records)
+            fields = None
+        if fields is None:
+            fields = self._fields = {}
+        fields[key] = value
+        self._last_key = key
+
+    def _end_activity(self, records):
+        fields = self._fields
+        self._fields = None
+        self._last_key = None
+        if fields:
+            pop = fields.pop
+            activity = ActivityRecord(self._day.day, pop("TIME", None),
+                                      pop("TITLE", None),
+                                      pop("DESCRIPTION", None),
+                                      pop("LOCATION", None), pop("PRICE", None),
+                                      fields)
+            self._day.activities.append(activity)
+            records.append(activity)
+
+    def _end_recommendation(self, records):
+        records.append(self._recommendation)
+        self._recommendation = None
+
+    def _end_section(self, records):
+        section = self._section
+        if section == "day":
+            self._end_activity(records)
+            if self._day.activities:
+                records.append(self._day)
+            self._day = None
+        elif section == "hotel":
+            if self._hotel.fields:
+                records.append(self._hotel)
+            self._hotel = None
+        elif section == "recommendations":
+            if self._recommendation is not None:
+                self._end_recommendation(records)
+        self._section = None
+        self._last_key = None
+
+
+def parse_itinerary(text):
+    """Parse a complete itinerary response into a ParsedItinerary"""
+    parser = ItineraryParser()
+    parsed = ParsedItinerary()
+    for record in parser.feed(text):
+        parsed.add(record)
+    for record in parser.close():
+        parsed.add(record)
+    return parsed
+
+
+PRICE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_price_aed(price):
+    """Amount of a price such as "AED 150 per person" ("Free" is 0), or None"""
+    if not price:
+        return None
+    match = PRICE_RE.search(price)
+    if match:
+        return float(match.group().replace(",", ""))
+    return 0.0 if "free" in price.lower() else None
+
+
+def _block_activity(day, block):
+    """ActivityRecord of one multi-line "- KEY: value" activity string"""
+    fields = {}
+    for line in block.split("\n"):
+        line = line.strip()
+        if line and line[0] in BULLETS:
+            line = line[1:].lstrip()
+        key, value = _split_label(line, True)
+        if key is not None:
+            fields[key] = value
+    pop = fields.pop
+    title = pop("TITLE", None) or pop("ACTIVITY", None)
+    return ActivityRecord(day, pop("TIME", None), title, pop("DESCRIPTION", None),
+                          pop("LOCATION", None), pop("PRICE", None), fields)
+
+
+def stored_activities(generated_itinerary):
+    """ActivityRecords of an itinerary as stored in interactions.generated_itinerary.
+
+    Accepts the API's one line per field as well as the multi-line activity
+    strings written by the sample-data scripts, whose titles may be labelled
+    ACTIVITY instead of TITLE.
+    """
+    if not isinstance(generated_itinerary, dict):
+        return []
+    activities = []
+    sections = []
+    for day in generated_itinerary.get("itinerary") or []:
+        match = re.search(r"\d+", str(day.get("day", "")))
+        lines = day.get("activities") or []
+        if not match or not lines:
+            continue
+        if any("\n" in line for line in lines):
+            # Each string is a whole activity
+            activities.extend(_block_activity(int(match.group()), block)
+                              for block in lines)
+        else:
+            sections.append(f"Day {match.group()}:\n" + "\n".join(lines))
+
+    if sections:
+        for day in parse_itinerary("\n\n".join(sections) + "\n").days:
+            activities.extend(day.activities)
+    return activities
@@ -1,22 +1,38 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Optional
 import uvicorn
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.chains import LLMChain
 import os
+import asyncio
 from dotenv import load_dotenv
 import json
-from database import db  # Add this at the top with your other imports
+from contextlib import asynccontextmanager
+import config
+from interaction_writer import interaction_writer
+from itinerary_cache import itinerary_cache
+from session_store import new_conversation_state, session_store
+from itinerary_parser import (DayRecord, HotelRecord, ItineraryParser,
+                              ParsedItinerary, parse_itinerary)
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await interaction_writer.start()
+    yield
+    # Flush queued interactions before the worker exits
+    await interaction_writer.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -41,12 +57,14 @@ class UserInput(BaseModel):
     preferences: str
     duration: Optional[int] = None
     budget: Optional[float] = None
+    session_id: Optional[str] = None
 
 
 class ItineraryResponse(BaseModel):
     itinerary: List[dict]
     recommendations: List[str]
     hotel_suggestion: Optional[dict] = None
+    session_id: Optional[str] = None
 
 
 # Directly set the API key
@@ -63,8 +81,10 @@ try:
     )
 
     # Enable LangChain tracing if needed
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_API_KEY"] = LANGCHAIN_API_KEY
+    LANGCHAIN_API_KEY = os.getenv('LANGCHAIN_API_KEY')
+    if LANGCHAIN_API_KEY:
+        os.environ["LANGCHAIN_TRACING_V2"] = "true"
+        os.environ["LANGCHAIN_API_KEY"] = LANGCHAIN_API_KEY
 
 except Exception as e:
     print(f"Error initializing ChatOpenAI: {str(e)}")
@@ -129,242 +149,347 @@ uae_expert_prompt = ChatPromptTemplate.from_messages([
 # Create LangChain
 itinerary_chain = LLMChain(llm=llm, prompt=uae_expert_prompt)
 
-# Add a global dictionary to store conversation state
-conversation_states: Dict[str, dict] = {}
+# Same prompt and model, yielding message chunks for the streaming endpoint
+itinerary_stream_chain = uae_expert_prompt | llm
+
+# Caps how many final-stage generations run at once in this worker
+generation_semaphore = asyncio.Semaphore(config.LLM_MAX_CONCURRENCY)
+
+TIMEOUT_MESSAGE = "I apologize, but creating your itinerary is taking longer than expected. Please try again."
+
+
+def build_chain_input(state: dict) -> dict:
+    """Build the itinerary_chain input from a completed conversation state"""
+    return {
+        "preferences": str(state),
+        "duration": state["duration"],
+        "budget": state["budget"],
+        "conversation_state": json.dumps(state),
+        "conversation_history": "\n".join(state["conversation_history"])
+    }
+
+
+async def generate_itinerary_text(state: dict) -> str:
+    """Generate the final itinerary text without blocking the event loop"""
+    async def _generate():
+        async with generation_semaphore:
+            return await itinerary_chain.ainvoke(build_chain_input(state))
+
+    # The timeout also covers time spent waiting for a free slot
+    response = await asyncio.wait_for(_generate(),
+                                      timeout=config.LLM_TIMEOUT_SECONDS)
+    return str(response['text'])
+
+
+async def stream_itinerary_text(state: dict):
+    """Yield final itinerary text chunks as the LLM produces them"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config.LLM_TIMEOUT_SECONDS
+
+    await asyncio.wait_for(generation_semaphore.acquire(),
+                           timeout=config.LLM_TIMEOUT_SECONDS)
+    try:
+        chunks = itinerary_stream_chain.astream(build_chain_input(state))
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(
+                        chunks.__anext__(),
+                        timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                yield str(chunk.content)
+        finally:
+            await chunks.aclose()
+    finally:
+        generation_semaphore.release()
+
+
+def question_response(message: str) -> ItineraryResponse:
+    """Wrap a conversational message in the itinerary response format"""
+    return ItineraryResponse(itinerary=[{
+        "day": 0,
+        "activities": [message]
+    }],
+                             recommendations=[])
+
+
+def advance_conversation(state: dict,
+                         user_input: UserInput) -> Optional[ItineraryResponse]:
+    """Record the user's answer and return the next question.
+
+    Returns None once the budget is known and the itinerary should be generated.
+    A message after the itinerary was generated starts a new questionnaire
+    instead of generating it again.
+    """
+    # Handle system messages (like language selection)
+    if user_input.preferences.startswith("SYSTEM:"):
+        return question_response(
+            "Ahlan wa sahlan! Welcome to Dubai Tourism. It is my honor to help you discover the wonders of our beloved city. When would you like to experience Dubai's magic?"
+        )
+
+    if state["budget"]:
+        state.clear()
+        state.update(new_conversation_state())
+        return question_response(
+            "I hope you enjoy your itinerary! Let's plan another trip. When would you like to experience Dubai's magic?"
+        )
+
+    # Store the user's input in conversation history
+    session_store.append_history(state, user_input.preferences)
+
+    # Process user input based on current state
+    if not state["travel_dates"]:
+        state["travel_dates"] = user_input.preferences
+        return question_response(
+            "Thank you for choosing Dubai. How many days would you like to spend exploring our city?"
+        )
+    elif not state["duration"]:
+        state["duration"] = user_input.duration or user_input.preferences
+        return question_response(
+            "To ensure we create the perfect experience, may I know who will be joining you on this journey?"
+        )
+    elif not state["group_info"]:
+        state["group_info"] = user_input.preferences
+        return question_response(
+            "Dubai offers countless experiences, from traditional souks to modern marvels. What interests you most about our city?"
+        )
+    elif not state["preferences"]:
+        state["preferences"] = user_input.preferences
+        return question_response(
+            "To help tailor your experience perfectly, what budget range do you have in mind for your Dubai adventure?"
+        )
+    elif not state["budget"]:
+        state["budget"] = user_input.budget or user_input.preferences
+
+    return None
+
+
+def store_itinerary_interaction(session_id: str, state: dict, days: list,
+                                recommendations: list):
+    """Queue the completed conversation and its itinerary for storage"""
+    interaction_writer.submit({
+        'session_id': session_id,
+        'travel_dates': state["travel_dates"],
+        'duration': state["duration"],
+        'group_info': state["group_info"],
+        'preferences': state["preferences"],
+        'budget': state["budget"],
+        # Copied, since the session keeps appending to it after this turn
+        'conversation_history': list(state["conversation_history"]),
+        'generated_itinerary': {
+            "itinerary": days,
+            "recommendations": recommendations
+        }
+    })
 
 
 @app.post("/api/create-itinerary", response_model=ItineraryResponse)
 async def create_itinerary(user_input: UserInput):
     try:
-        session_id = "default_session"
-
-        if session_id not in conversation_states:
-            conversation_states[session_id] = {
-                "travel_dates": None,
-                "group_info": None,
-                "preferences": None,
-                "duration": None,
-                "budget": None,
-                "conversation_history": []
-            }
-
-        state = conversation_states[session_id]
-
-        # Handle system messages (like language selection)
-        if user_input.preferences.startswith("SYSTEM:"):
-            return ItineraryResponse(itinerary=[{
-                "day":
-                0,
-                "activities": [
-                    "Ahlan wa sahlan! Welcome to Dubai Tourism. It is my honor to help you discover the wonders of our beloved city. When would you like to experience Dubai's magic?"
-                ]
-            }],
-                                     recommendations=[])
+        # The session lock keeps concurrent requests from one user in order
+        async with session_store.session(user_input.session_id) as (session_id, state):
+            response = await complete_turn(session_id, state, user_input)
+        response.session_id = session_id
+        return response
 
-        # Store the user's input in conversation history
-        if not user_input.preferences.startswith("SYSTEM:"):
-            state["conversation_history"].append(user_input.preferences)
+    except Exception as e:
+        print(f"Error generating itinerary: {str(e)}")
+        return ItineraryResponse(itinerary=[{
+            "day":
+            0,
+            "activities":
+            ["I apologize, but I encountered an error. Please try again."]
+        }],
+                                 recommendations=[],
+                                 hotel_suggestion=None)
 
+
+async def complete_turn(session_id: str, state: dict,
+                        user_input: UserInput) -> ItineraryResponse:
+    """Answer one chat turn, generating the itinerary once the budget is known"""
+    try:
+        reply = advance_conversation(state, user_input)
+        if reply is not None:
+            return reply
+
+        # Similar trips are served from the cache without calling the LLM
+        cached = await itinerary_cache.get_async(state)
+        if cached is not None:
+            response = ItineraryResponse(**cached)
+            store_itinerary_interaction(session_id, state,
+                                        response.itinerary,
+                                        response.recommendations)
+            return response
+
+        # Now generate the itinerary
         try:
-            # Process user input based on current state
-            if not state["travel_dates"]:
-                state["travel_dates"] = user_input.preferences
-                return ItineraryResponse(itinerary=[{
-                    "day":
-                    0,
-                    "activities": [
-                        "Thank you for choosing Dubai. How many days would you like to spend exploring our city?"
-                    ]
-                }],
-                                         recommendations=[])
-            elif not state["duration"]:
-                state[
-                    "duration"] = user_input.duration or user_input.preferences
-                return ItineraryResponse(itinerary=[{
-                    "day":
-                    0,
-                    "activities": [
-                        "To ensure we create the perfect experience, may I know who will be joining you on this journey?"
-                    ]
-                }],
-                                         recommendations=[])
-            elif not state["group_info"]:
-                state["group_info"] = user_input.preferences
-                return ItineraryResponse(itinerary=[{
-                    "day":
-                    0,
-                    "activities": [
-                        "Dubai offers countless experiences, from traditional souks to modern marvels. What interests you most about our city?"
-                    ]
-                }],
-                                         recommendations=[])
-            elif not state["preferences"]:
-                state["preferences"] = user_input.preferences
-                return ItineraryResponse(itinerary=[{
-                    "day":
-                    0,
-                    "activities": [
-                        "To help tailor your experience perfectly, what budget range do you have in mind for your Dubai adventure?"
-                    ]
-                }],
-                                         recommendations=[])
-            elif not state["budget"]:
-                state["budget"] = user_input.budget or user_input.preferences
-
-                # Now generate the itinerary
-                response = itinerary_chain.invoke({
-                    "preferences":
-                    str(state),
-                    "duration":
-                    state["duration"],
-                    "budget":
-                    state["budget"],
-                    "conversation_state":
-                    json.dumps(state),
-                    "conversation_history":
-                    "\n".join(state["conversation_history"])
-                })
-
-                # Process the response into itinerary format
-                content = str(response['text'])
-                days = []
-                current_day = None
-                current_activities = []
-                hotel_suggestion = None
-
-                # Extract hotel suggestion if present
-                if "Hotel Suggestion:" in content:
-                    hotel_part, rest = content.split("Day 1:", 1)
-                    hotel_lines = [
-                        line.strip() for line in hotel_part.split('\n')
-                        if line.strip()
-                    ]
-                    hotel_data = {}
-                    for line in hotel_lines:
-                        if line.startswith('- '):
-                            key, value = line[2:].split(':', 1)
-                            hotel_data[key.strip()] = value.strip()
-                    hotel_suggestion = hotel_data
-                    content = "Day 1:" + rest
-
-                print("Hotel Suggestion:", hotel_suggestion)  # Debug log
-
-                # Split content into days and recommendations
-                if "Recommendations:" in content:
-                    main_content, rec_content = content.split(
-                        "Recommendations:")
-                else:
-                    main_content, rec_content = content, ""
-
-                # Process each line
-                lines = main_content.split('\n')
-                current_activity = []
-
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        if current_activity:
-                            current_activities.append(
-                                '\n'.join(current_activity))
-                            current_activity = []
-                        continue
-
-                    if line.startswith("Day"):
-                        # Save previous day if exists
-                        if current_day and current_activities:
-                            days.append({
-                                "day": current_day,
-                                "activities": current_activities
-                            })
-                        # Start new day
-                        try:
-                            current_day = int(line.split()[1].replace(":", ""))
-                            current_activities = []
-                            current_activity = []
-                        except:
-                            continue
-                    elif line.startswith("-"):
-                        # If we have a previous activity, save it
-                        if current_activity:
-                            current_activities.append(
-                                '\n'.join(current_activity))
-                            current_activity = []
-                        # Start new activity
-                        current_activity = [line]
-                    elif current_activity:
-                        # Add line to current activity
-                        current_activity.append(line)
-
-                # Add final activity and day if exists
-                if current_activity:
-                    current_activities.append('\n'.join(current_activity))
-                if current_day and current_activities:
-                    days.append({
-                        "day": current_day,
-                        "activities": current_activities
-                    })
-
-                # Process recommendations
-                recommendations = []
-                if rec_content:
-                    recommendations = [
-                        line.strip("- ").strip()
-                        for line in rec_content.split('\n')
-                        if line.strip() and line.strip().startswith("-")
-                    ]
-
-                # Debug logging
-                print("Processed days:", days)
-                print("Processed recommendations:", recommendations)
-
-                # Store the interaction data
-                db.store_interaction({
-                    'session_id':
-                    session_id,
-                    'travel_dates':
-                    state["travel_dates"],
-                    'duration':
-                    state["duration"],
-                    'group_info':
-                    state["group_info"],
-                    'preferences':
-                    state["preferences"],
-                    'budget':
-                    state["budget"],
-                    'conversation_history':
-                    state["conversation_history"],
-                    'generated_itinerary': {
-                        "itinerary": days,
-                        "recommendations": recommendations
-                    }
-                })
-
-                return ItineraryResponse(itinerary=days,
-                                         recommendations=recommendations,
-                                         hotel_suggestion=hotel_suggestion)
-        except Exception as inner_e:
-            print(f"Inner error: {str(inner_e)}")
+            content = await generate_itinerary_text(state)
+        except asyncio.TimeoutError:
+            # Let the user retry the final stage instead of getting stuck
+            state["budget"] = None
+            print("Itinerary generation timed out")
             return ItineraryResponse(itinerary=[{
-                "day":
-                0,
-                "activities": [
-                    "I apologize, but I encountered an error processing your response. Please try again."
-                ]
+                "day": 0,
+                "activities": [TIMEOUT_MESSAGE]
             }],
                                      recommendations=[],
                                      hotel_suggestion=None)
 
-    except Exception as e:
-        print(f"Error generating itinerary: {str(e)}")
+        # Process the response into itinerary format
+        parsed = parse_itinerary(content)
+        days = parsed.itinerary()
+        recommendations = parsed.recommendation_texts()
+        hotel_suggestion = parsed.hotel_suggestion()
+
+        # Debug logging
+        print("Hotel Suggestion:", hotel_suggestion)
+        print("Processed days:", days)
+        print("Processed recommendations:", recommendations)
+
+        # Store the interaction data
+        store_itinerary_interaction(session_id, state, days, recommendations)
+
+        response = ItineraryResponse(itinerary=days,
+                                     recommendations=recommendations,
+                                     hotel_suggestion=hotel_suggestion)
+        if days:
+            await itinerary_cache.put_async(state, response.model_dump())
+        return response
+    except Exception as inner_e:
+        # As after a timeout, the next message retries the final stage
+        state["budget"] = None
+        print(f"Inner error: {str(inner_e)}")
         return ItineraryResponse(itinerary=[{
             "day":
             0,
-            "activities":
-            ["I apologize, but I encountered an error. Please try again."]
+            "activities": [
+                "I apologize, but I encountered an error processing your response. Please try again."
+            ]
         }],
                                  recommendations=[],
                                  hotel_suggestion=None)
 
 
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_itinerary_events(session_id: str, state: dict):
+    """Stream hotel, day and recommendation events as each one completes"""
+    parser = ItineraryParser()
+    parsed = ParsedItinerary()
+
+    def to_events(records):
+        for record in records:
+            parsed.add(record)
+            if isinstance(record, HotelRecord):
+                yield sse_event("hotel", record.to_dict())
+            elif isinstance(record, DayRecord):
+                yield sse_event("day", record.to_dict())
+
+    try:
+        async for chunk in stream_itinerary_text(state):
+            for message in to_events(parser.feed(chunk)):
+                yield message
+        for message in to_events(parser.close()):
+            yield message
+        if parsed.recommendations:
+            yield sse_event("recommendations", parsed.recommendation_texts())
+
+        store_itinerary_interaction(session_id, state, parsed.itinerary(),
+                                    parsed.recommendation_texts())
+    except asyncio.TimeoutError:
+        # Let the user retry the final stage instead of getting stuck
+        state["budget"] = None
+        print("Itinerary generation timed out")
+        yield sse_event("error", {"message": TIMEOUT_MESSAGE})
+        return
+    except Exception as e:
+        state["budget"] = None
+        print(f"Error streaming itinerary: {str(e)}")
+        yield sse_event("error", {
+            "message":
+            "I apologize, but I encountered an error. Please try again."
+        })
+        return
+
+    response = ItineraryResponse(itinerary=parsed.itinerary(),
+                                 recommendations=parsed.recommendation_texts(),
+                                 hotel_suggestion=parsed.hotel_suggestion())
+    if response.itinerary:
+        await itinerary_cache.put_async(state, response.model_dump())
+    response.session_id = session_id
+    yield sse_event("done", response.model_dump())
+
+
+def cached_itinerary_events(response: ItineraryResponse):
+    """Replay a cached itinerary as the same events a live generation sends"""
+    if response.hotel_suggestion:
+        yield sse_event("hotel", response.hotel_suggestion)
+    for day in response.itinerary:
+        yield sse_event("day", day)
+    if response.recommendations:
+        yield sse_event("recommendations", response.recommendations)
+    yield sse_event("done", response.model_dump())
+
+
+@app.post("/api/create-itinerary/stream")
+async def create_itinerary_stream(user_input: UserInput):
+    """Same conversation as /api/create-itinerary, sent as server-sent events.
+
+    Question stages produce a single "message" event. The final stage emits
+    "hotel", one "day" per completed day and "recommendations" as soon as
+    each is parsed, then "done" with the full ItineraryResponse.
+    """
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(conversation_events(user_input),
+                             media_type="text/event-stream",
+                             headers=headers)
+
+
+async def conversation_events(user_input: UserInput):
+    """Advance the caller's session and yield the events for this turn"""
+    try:
+        # The session stays locked until the whole turn has been streamed
+        async with session_store.session(user_input.session_id) as (session_id, state):
+            reply = advance_conversation(state, user_input)
+            if reply is not None:
+                reply.session_id = session_id
+                yield sse_event("message", reply.model_dump())
+                return
+
+            cached = await itinerary_cache.get_async(state)
+            if cached is not None:
+                response = ItineraryResponse(**cached)
+                response.session_id = session_id
+                store_itinerary_interaction(session_id, state, response.itinerary,
+                                            response.recommendations)
+                for message in cached_itinerary_events(response):
+                    yield message
+                return
+
+            async for message in stream_itinerary_events(session_id, state):
+                yield message
+    except Exception as e:
+        # e.g. another worker kept the session busy
+        print(f"Error in streamed turn: {str(e)}")
+        yield sse_event("error", {
+            "message":
+            "I apologize, but I encountered an error. Please try again."
+        })
+
+
+@app.get("/api/itinerary-cache/stats")
+async def itinerary_cache_stats():
+    return await asyncio.get_running_loop().run_in_executor(None, itinerary_cache.stats)
+
+
+@app.get("/api/interaction-writer/stats")
+async def interaction_writer_stats():
+    return interaction_writer.stats()
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8080, reload=True)
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import prophet
+from prophet.serialize import model_from_json, model_to_json
+
+import config
+
+# Bump when the format of the stored files changes
+STORE_VERSION = 1
+
+
+def series_fingerprint(series):
+    """Hash of the (ds, y) training rows, in order"""
+    hashes = pd.util.hash_pandas_object(series[['ds', 'y']], index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+class ForecastModelStore:
+    """Fitted Prophet models and their forecasts, on disk.
+
+    Each entry is keyed on the series name, the model parameters, the
+    forecast horizon and a fingerprint of the training rows, so changed
+    data never hits a stale model. An entry is three files named after the
+    hash of its key: the model JSON, the forecast as Parquet, and a small
+    meta JSON written last, so a half-written entry is never read. Files
+    are replaced atomically, which lets worker processes share a store.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.FORECAST_MODEL_STORE_PATH
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(series_name, params, periods, fingerprint):
+        return {
+            'version': STORE_VERSION,
+            'prophet': prophet.__version__,
+            'series': series_name,
+            'params': params,
+            'periods': periods,
+            'fingerprint': fingerprint
+        }
+
+    @staticmethod
+    def _entry_name(key):
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:32]
+
+    def _file(self, name, suffix):
+        return os.path.join(self.path, name + suffix)
+
+    def _write(self, name, suffix, text=None, frame=None):
+        tmp = self._file(name, suffix) + '.tmp'
+        if frame is not None:
+            frame.to_parquet(tmp, index=False)
+        else:
+            with open(tmp, 'w') as f:
+                f.write(text)
+        os.replace(tmp, self._file(name, suffix))
+
+    def _entries(self):
+        """(name, meta) of every complete entry"""
+        if not os.path.isdir(self.path):
+            return
+        for file_name in os.listdir(self.path):
+            if not file_name.endswith('.meta.json'):
+                continue
+            try:
+                with open(os.path.join(self.path, file_name)) as f:
+                    yield file_name[:-len('.meta.json')], json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def _remove(self, name):
+        # The meta goes first, so the entry stops being visible before the
+        # rest of it disappears
+        for suffix in ('.meta.json', '.model.json', '.forecast.parquet'):
+            try:
+                os.remove(self._file(name, suffix))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key, load_model=True):
+        """(model, forecast) stored under key, or None. model is None when
+        load_model is False, which skips deserializing it."""
+        name = self._entry_name(key)
+        if not os.path.exists(self._file(name, '.meta.json')):
+            self.misses += 1
+            return None
+        try:
+            forecast = pd.read_parquet(self._file(name, '.forecast.parquet'))
+            model = None
+            if load_model:
+                with open(self._file(name, '.model.json')) as f:
+                    model = model_from_json(f.read())
+        except (OSError, ValueError):
+            # Removed under us by another process's eviction
+            self.misses += 1
+            return None
+        self.hits += 1
+        return model, forecast
+
+    def latest(self, series_name, params):
+        """(model, meta) most recently stored for series_name with these
+        params, whatever data it was fitted on, or None"""
+        entries = [(meta.get('fitted_at', 0), name, meta) for name, meta in self._entries()
+                   if meta.get('series') == series_name and meta.get('params') == params
+                   and meta.get('version') == STORE_VERSION and meta.get('prophet') == prophet.__version__]
+        if not entries:
+            return None
+        _, name, meta = max(entries, key=lambda entry: entry[0])
+        try:
+            with open(self._file(name, '.model.json')) as f:
+                return model_from_json(f.read()), meta
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, model, forecast, fit_seconds=None, fit_mode=None):
+        """Store a fitted model and its forecast, replacing the entries of
+        the same series and parameters fitted on older data"""
+        name = self._entry_name(key)
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            self._write(name, '.model.json', text=model_to_json(model))
+            self._write(name, '.forecast.parquet', frame=forecast)
+            meta = dict(key, fitted_at=time.time(), fit_seconds=fit_seconds, fit_mode=fit_mode)
+            self._write(name, '.meta.json', text=json.dumps(meta))
+
+            for other, other_meta in list(self._entries()):
+                if (other != name and other_meta.get('series') == key['series']
+                        and other_meta.get('params') == key['params']
+                        and other_meta.get('periods') == key['periods']):
+                    self._remove(other)
+
+    def evict(self, live_series, prefix=''):
+        """Remove the entries of series starting with prefix that are not in
+        live_series, i.e. that have no training data left. Returns how many
+        entries were removed."""
+        live_series = set(live_series)
+        removed = 0
+        with self._lock:
+            for name, meta in list(self._entries()):
+                series = meta.get('series', '')
+                if series.startswith(prefix) and series not in live_series:
+                    self._remove(name)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        """Remove every stored model"""
+        with self._lock:
+            if os.path.isdir(self.path):
+                for file_name in os.listdir(self.path):
+                    os.remove(os.path.join(self.path, file_name))
+
+    def stats(self):
+        """Entries on disk, and hits and misses of this process"""
+        entries = list(self._entries())
+        return {
+            'path': self.path,
+            'entries': len(entries),
+            'series': sorted({meta.get('series') for _, meta in entries}),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -1,11 +1,13 @@
 import sqlite3
 import random
 from datetime import datetime, timedelta
-import json
+
+import config
+from database import DubaiTourismDB
 
 class DatabasePopulator:
     def __init__(self):
-        self.db_name = "dubai_tourism.db"
+        self.db_name = config.DB_PATH
         self.preferences = [
             "Cultural Experiences", "Adventure Activities", "Luxury Shopping",
             "Desert Safaris", "Beach Activities", "Theme Parks", "Historical Sites",
@@ -60,7 +62,7 @@ class DatabasePopulator:
                 "activities": activities
             })
         
-        return json.dumps(itinerary)
+        return itinerary
 
     def generate_conversation(self):
         """Generate a random conversation history"""
@@ -69,13 +71,12 @@ class DatabasePopulator:
             {"role": "assistant", "content": "I'll help you plan your perfect Dubai trip. What are your interests?"},
             {"role": "user", "content": f"I'm interested in {', '.join(random.sample(self.preferences, 3))}"}
         ]
-        return json.dumps(messages)
+        return messages
 
     def populate_database(self, num_entries=1000):
         """Populate the database with random entries for future travel dates"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
+            records = []
             
             # Set start date for travel dates (November 11, 2024)
             start_travel_date = datetime(2024, 11, 11)
@@ -136,32 +137,24 @@ class DatabasePopulator:
                     else:
                         duration = f"{random.randint(3, 10)} days"
                     
-                    cursor.execute("""
-                        INSERT INTO interactions (
-                            created_at, travel_dates, group_info, preferences, budget, duration,
-                            conversation_history, generated_itinerary
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        created_date.strftime('%Y-%m-%d %H:%M:%S'),
-                        travel_dates.strftime('%Y-%m-%d'),
-                        group_info,
-                        preferences,
-                        budget,
-                        duration,
-                        self.generate_conversation(),
-                        self.generate_itinerary()
-                    ))
+                    records.append({
+                        'session_id': None,
+                        'created_at': created_date.strftime('%Y-%m-%d %H:%M:%S'),
+                        'travel_dates': travel_dates.strftime('%Y-%m-%d'),
+                        'group_info': group_info,
+                        'preferences': preferences,
+                        'budget': budget,
+                        'duration': duration,
+                        'conversation_history': self.generate_conversation(),
+                        'generated_itinerary': self.generate_itinerary()
+                    })
             
-            conn.commit()
+            # Also fills the typed columns and itinerary_activities
+            DubaiTourismDB(self.db_name).store_interactions(records)
             print(f"Successfully added entries with future travel dates starting from Nov 11, 2024")
             
         except sqlite3.Error as e:
             print(f"An error occurred: {e}")
-        
-        finally:
-            if conn:
-                conn.close()
-                print("Database connection closed")
 
 if __name__ == "__main__":
     populator = DatabasePopulator()
@@ -0,0 +1,164 @@
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import config
+
+
+# Preferences beyond the most mentioned PREFERENCE_VOCABULARY_SIZE are
+# counted under this name
+OTHER_PREFERENCE = 'other'
+
+
+def preference_key(name):
+    """Canonical form of a preference: lowercase words, crudely singular,
+    so spelling variants like "Desert  Safaris" and "desert safari" match"""
+    words = []
+    for word in re.findall(r'[a-z0-9]+', name.casefold()):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return ' '.join(words)
+
+
+def explode_preferences(preferences):
+    """One entry per preference mentioned by each interaction, in row order.
+
+    Returns (rows, codes, names): the position in preferences each entry
+    comes from and its canonical preference (see preference_key) as an
+    index into names, which are ordered by first mention and spelled as
+    first mentioned. Each distinct preferences string is split only once.
+    """
+    preferences = preferences.astype('category')
+    row_codes = preferences.cat.codes.to_numpy()
+    parts = [[' '.join(p.split()) for p in str(value).split(',')]
+             for value in preferences.cat.categories]
+    lengths = np.array([len(part) for part in parts], dtype=np.int64)
+    part_codes, part_names = pd.factorize(
+        pd.Series([p for part in parts for p in part], dtype=object))
+    key_codes, keys = pd.factorize(pd.Series([preference_key(name) for name in part_names], dtype=object))
+    starts = np.cumsum(lengths) - lengths
+
+    # Repeat each row once per preference in its string, and point every
+    # entry at its part of the split category
+    rows = np.flatnonzero(row_codes >= 0)
+    row_lengths = lengths[row_codes[rows]]
+    entries = np.repeat(rows, row_lengths)
+    offsets = np.arange(len(entries)) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+    spellings = part_codes[np.repeat(starts[row_codes[rows]], row_lengths) + offsets]
+    codes = key_codes[spellings]
+
+    # Renumber by first mention, and name each preference by its first spelling
+    first, first_entry = np.unique(codes, return_index=True)
+    order = np.argsort(first_entry, kind='stable')
+    renumber = np.empty(len(keys), dtype=np.int64)
+    renumber[first[order]] = np.arange(len(first))
+    names = np.asarray(part_names, dtype=object)[spellings[first_entry[order]]]
+    return entries, renumber[codes], names
+
+
+class PreferenceMatrix:
+    """Sparse interactions x preferences matrix of the preferences column.
+
+    mentions[i, j] is how often interaction i lists preference names[j]
+    (almost always 0 or 1) and picked is its 0/1 version. Counts per
+    preference, per group or per month are products of these with an
+    indicator matrix, so nothing is re-split per analysis. rows and codes
+    keep the mentions in their original order for the analyses that list
+    preferences in order of first mention.
+
+    Preferences are canonicalized (explode_preferences), and only the
+    max_names most mentioned keep a column of their own; the rest share
+    the OTHER_PREFERENCE column. Free-text answers therefore can't grow the
+    matrix, or its products, with the number of interactions.
+    """
+
+    def __init__(self, preferences, max_names=None):
+        self.rows, self.codes, self.names = explode_preferences(preferences)
+        self._cap(max_names or config.PREFERENCE_VOCABULARY_SIZE)
+        self.interactions = len(preferences)
+        shape = (self.interactions, len(self.names))
+        self.mentions = sparse.csr_matrix(
+            (np.ones(len(self.rows), dtype=np.int64), (self.rows, self.codes)), shape=shape)
+        self.mentions.sum_duplicates()
+        self.picked = self.mentions.copy()
+        self.picked.data[:] = 1
+        self._co_occurrence = None
+
+    def _cap(self, max_names):
+        """Fold all but the max_names most mentioned preferences into
+        OTHER_PREFERENCE, keeping first-mention order"""
+        if len(self.names) <= max_names:
+            return
+        mentions = np.bincount(self.codes, minlength=len(self.names))
+        kept = np.zeros(len(self.names), dtype=bool)
+        kept[np.argsort(-mentions, kind='stable')[:max_names]] = True
+        codes, names = pd.factorize(pd.Series(np.where(kept, self.names, OTHER_PREFERENCE), dtype=object))
+        self.codes = codes[self.codes]
+        self.names = np.asarray(names, dtype=object)
+
+    def counts(self):
+        """Mentions of each preference"""
+        return np.asarray(self.mentions.sum(axis=0)).ravel()
+
+    def weighted_sums(self, weights):
+        """Sum of weights over the mentions of each preference"""
+        return self.mentions.T @ np.asarray(weights, dtype=float)
+
+    def counts_by(self, keys):
+        """Mentions of each preference per value of keys.
+
+        Returns (key_codes, key_names, counts): each row's key as an index
+        into key_names (-1 where missing), and counts[g, j], the mentions of
+        names[j] by interactions whose key is key_names[g], as a sparse
+        matrix.
+        """
+        key_codes, key_names = pd.factorize(keys)
+        present = np.flatnonzero(key_codes >= 0)
+        indicator = sparse.csr_matrix(
+            (np.ones(len(present), dtype=np.int64), (key_codes[present], present)),
+            shape=(len(key_names), self.interactions))
+        counts = (indicator @ self.mentions).tocsr()
+        return key_codes, np.asarray(key_names, dtype=object), counts
+
+    def first_mentions_by(self, key_codes):
+        """(key code, preference code) pairs in order of first mention,
+        for mentions whose row has a key (code >= 0)"""
+        entry_keys = key_codes[self.rows]
+        present = entry_keys >= 0
+        pairs = pd.DataFrame({'key': entry_keys[present], 'preference': self.codes[present]})
+        return pairs.drop_duplicates()
+
+    def co_occurrence(self):
+        """Sparse matrix of the interactions picking both preferences i and
+        j; the diagonal holds the interactions picking each preference"""
+        if self._co_occurrence is None:
+            self._co_occurrence = (self.picked.T @ self.picked).tocoo()
+        return self._co_occurrence
+
+    def associations(self, min_together=1):
+        """Pairs of preferences picked by the same interactions.
+
+        One row per ordered pair (preference, also_picks) with the number of
+        interactions picking both, the share of preference's interactions
+        that also pick also_picks (confidence), and lift: how much more often
+        they are picked together than if they were independent.
+        """
+        co_occurrence = self.co_occurrence()
+        picked = co_occurrence.diagonal().astype(float)
+        with_preferences = int((self.picked.getnnz(axis=1) > 0).sum())
+        i, j, together = co_occurrence.row, co_occurrence.col, co_occurrence.data
+        # Neither the empty answer nor the catch-all column is a preference
+        named = (self.names != '') & (self.names != OTHER_PREFERENCE)
+        keep = (together >= max(min_together, 1)) & (i != j) & named[i] & named[j]
+        i, j, together = i[keep], j[keep], together[keep]
+        report = pd.DataFrame({
+            'preference': self.names[i],
+            'also_picks': self.names[j],
+            'together': together,
+            'confidence': together / picked[i],
+            'lift': together * with_preferences / (picked[i] * picked[j])
+        })
+        return report.sort_values(['lift', 'together'], ascending=False, ignore_index=True)
@@ -0,0 +1,122 @@
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+from preference_matrix import explode_preferences
+
+# Columns of the interactions the Real-Time page aggregates
+TAIL_COLUMNS = ['id', 'travel_dates', 'group_size', 'budget_value', 'preferences', 'group_info']
+
+
+class UpcomingTail:
+    """Rolling aggregates of the interactions whose travel date falls in
+    the next days days from tomorrow, kept up to date from the table.
+
+    The aggregates are kept per travel date: visitors, bookings and budget
+    totals, and bookings per preference and per group type. refresh() only
+    reads the rows stored after the last id it has seen, so its cost
+    follows the number of new rows. The window is read again when the date
+    changes, or when interactions were deleted: the newest ones, or any in
+    the window, which then has fewer rows than were counted in.
+    """
+
+    def __init__(self, analyzer, days=30):
+        self.analyzer = analyzer
+        self.days = days
+        self.lock = threading.Lock()
+        self.today = None
+        self.last_id = 0
+        self.reset()
+
+    def reset(self):
+        self.daily = pd.DataFrame(columns=['visitors', 'group_sizes', 'bookings',
+                                           'budget_sum', 'budgets'], dtype=float)
+        self.preferences = pd.Series(dtype=float)
+        self.groups = pd.Series(dtype=float)
+
+    def window(self, today):
+        """First and last travel date of the window seen on today"""
+        return today + timedelta(days=1), today + timedelta(days=self.days)
+
+    def refresh(self, today=None):
+        """Fold in the interactions stored since the last refresh. Returns
+        the number of new rows in the window."""
+        today = today or date.today()
+        with self.lock:
+            latest = self.analyzer.db.connection().execute(
+                'SELECT MAX(id) FROM interactions').fetchone()[0] or 0
+            if (today != self.today or latest < self.last_id
+                    or self.stored_in_window() < self.daily['bookings'].sum()):
+                return self.rebuild(today, latest)
+            rows = self.analyzer.query(TAIL_COLUMNS, after_id=self.last_id, until_id=latest)
+            self.last_id = latest
+            start, end = self.window(today)
+            return self.add(rows[rows['travel_dates'].between(pd.Timestamp(start), pd.Timestamp(end))])
+
+    def rebuild(self, today, latest):
+        """Aggregate the whole window, up to interaction latest"""
+        self.reset()
+        self.today = today
+        self.last_id = latest
+        # Rows stored after latest come with the next refresh
+        return self.add(self.analyzer.query(TAIL_COLUMNS, travel_dates=self.window(today),
+                                            until_id=latest))
+
+    def stored_in_window(self):
+        """Interactions still stored in the window, up to the last id seen.
+        Counted on the travel_date index, so it costs the window's size."""
+        start, end = self.window(self.today)
+        return self.analyzer.db.connection().execute('''
+            SELECT COUNT(*) FROM interactions
+            WHERE travel_date BETWEEN ? AND ? AND id <= ?
+        ''', (start.isoformat(), end.isoformat(), self.last_id)).fetchone()[0]
+
+    @staticmethod
+    def added(total, part):
+        """Sum of two aggregates, by travel date and any other keys"""
+        return part if total.empty else total.add(part, fill_value=0)
+
+    def add(self, rows):
+        """Count rows (already in the window) into the aggregates"""
+        if rows.empty:
+            return 0
+        day = rows['travel_dates']
+        daily = rows.groupby(day).agg(
+            visitors=('group_size', 'sum'),
+            group_sizes=('group_size', 'count'),
+            bookings=('id', 'size'),
+            budget_sum=('budget_value', 'sum'),
+            budgets=('budget_value', 'count')
+        )
+        self.daily = self.added(self.daily, daily)
+
+        entries, codes, names = explode_preferences(rows['preferences'])
+        mentions = pd.Series(1.0, index=pd.MultiIndex.from_arrays(
+            [day.to_numpy()[entries], names[codes]], names=['travel_dates', 'preference']))
+        self.preferences = self.added(self.preferences, mentions.groupby(level=[0, 1]).sum())
+
+        groups = rows.groupby([day, rows['group_info'].astype(object)]).size().astype(float)
+        self.groups = self.added(self.groups, groups)
+        return len(rows)
+
+    def snapshot(self):
+        """Totals of the window, for the Real-Time page"""
+        with self.lock:
+            start, end = self.window(self.today)
+            totals = self.daily.sum()
+            preferences = self.preferences.groupby(level=1).sum() if len(self.preferences) else self.preferences
+            groups = self.groups.groupby(level=1).sum() if len(self.groups) else self.groups
+            return {
+                'start': start,
+                'end': end,
+                'last_id': self.last_id,
+                'daily_visitors': self.daily['visitors'].sort_index(),
+                'visitors': int(totals.get('visitors', 0)),
+                'bookings': int(totals.get('bookings', 0)),
+                'avg_group_size': (totals['visitors'] / totals['group_sizes']
+                                   if totals.get('group_sizes', 0) else None),
+                'avg_budget': totals['budget_sum'] / totals['budgets'] if totals.get('budgets', 0) else None,
+                'preferences': preferences.sort_values(ascending=False, kind='stable').astype(int),
+                'groups': groups[groups > 0].sort_values(ascending=False, kind='stable').astype(int)
+            }
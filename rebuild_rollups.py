@@ -0,0 +1,20 @@
+from database import db
+
+
+def rebuild():
+    """Recompute the rollup tables from the interactions table and verify them"""
+    mismatches = db.check_rollups()
+    print(f"Rollup entries out of date before rebuilding: {len(mismatches)}")
+    for name, key, stored, expected in mismatches[:10]:
+        print(f"- {name} {key}: stored {stored}, expected {expected}")
+
+    db.rebuild_rollups()
+
+    mismatches = db.check_rollups()
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} rollup entries still disagree after rebuilding")
+    print("Rollups rebuilt and consistent with the interactions table")
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,60 @@
+import sys
+import time
+
+import config
+from analyze_interactions import InteractionAnalyzer
+from database import db
+from forecast_backends import BACKENDS
+from forecast_demand import DemandForecaster
+from forecast_tables import ATTRACTION_DEMAND, SEASONAL_GROUP_SIZE
+
+
+def refresh_attraction_demand(forecaster, backend, watermark):
+    """Forecast every attraction, as the Demand Forecast page shows them"""
+    start = time.perf_counter()
+    df = forecaster.extract_attraction_data(until_id=watermark)
+    results = forecaster.analyze_top_attractions(n_attractions=None, plot=False, backend=backend, df=df)
+    forecasts = {attraction: metrics['forecast'] for attraction, metrics in results.items()}
+    return db.write_forecast_run(ATTRACTION_DEMAND, backend, forecasts,
+                                 failed=df['attraction'].nunique() - len(forecasts),
+                                 watermark=watermark, seconds=time.perf_counter() - start)
+
+
+def refresh_seasonal_group_size(forecaster, backend, watermark):
+    """Forecast group sizes by travel date, as the seasonal tab shows them"""
+    start = time.perf_counter()
+    df = InteractionAnalyzer().query(['travel_dates', 'group_size'], until_id=watermark)
+    forecast = forecaster.forecast_group_sizes(df, backend)
+    return db.write_forecast_run(SEASONAL_GROUP_SIZE, backend, {'group_size': forecast},
+                                 watermark=watermark, seconds=time.perf_counter() - start)
+
+
+def refresh(backend=None):
+    """Rerun the dashboard's forecasts and store them as new versions of the
+    forecast tables. One forecast failing doesn't stop the other."""
+    backend = backend or config.FORECAST_BACKEND
+    forecaster = DemandForecaster()
+    # Both forecasts read the interactions up to the watermark; rows stored
+    # while they run are left for the next refresh
+    watermark = db.connection().execute('SELECT MAX(id) FROM interactions').fetchone()[0]
+
+    for name, run in ((ATTRACTION_DEMAND, refresh_attraction_demand),
+                      (SEASONAL_GROUP_SIZE, refresh_seasonal_group_size)):
+        try:
+            run_id = run(forecaster, backend, watermark)
+            stored = db.latest_forecast_run(name)
+            print(f"Stored {name} version {run_id}: {stored['series']} series, "
+                  f"{stored['failed']} failed, {stored['seconds']:.2f} s with {backend}")
+        except Exception as e:
+            print(f"Error refreshing {name}: {str(e)}")
+
+
+if __name__ == "__main__":
+    # "python refresh_forecasts.py [loop] [prophet|numpy]": "loop" refreshes
+    # every FORECAST_REFRESH_INTERVAL_SECONDS instead of once
+    args = sys.argv[1:]
+    backend = next((arg for arg in args if arg in BACKENDS), None)
+    refresh(backend)
+    while "loop" in args:
+        time.sleep(config.FORECAST_REFRESH_INTERVAL_SECONDS)
+        refresh(backend)
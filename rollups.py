@@ -0,0 +1,190 @@
+import math
+
+from preference_matrix import preference_key
+
+# Pre-aggregated views of the interactions table. Each rollup is keyed by
+# one or more columns and holds the same running sums, so averages are
+# sum / count. Missing keys (no parsed travel date, no group) are stored
+# as '' so that upserts can match them.
+MEASURES = ('interactions', 'budget_sum', 'budget_count', 'duration_sum',
+            'duration_count', 'group_size_sum')
+
+ROLLUPS = {
+    # Interactions by the day they were created
+    'rollup_daily': ('day',),
+    # Trips by the month they start in, as YYYY-MM
+    'rollup_travel_month': ('travel_month',),
+    'rollup_group': ('group_info',),
+    # One entry per preference mentioned, so "interactions" counts mentions.
+    # Preferences are canonical (preference_key), as in PreferenceMatrix
+    'rollup_preference': ('preference', 'group_info', 'travel_month'),
+}
+
+# Each canonical preference of rollup_preference, spelled as first stored;
+# position orders them by first mention
+PREFERENCE_NAMES = 'rollup_preference_name'
+
+# Columns of interactions the rollups are computed from
+SOURCE_COLUMNS = ('created_at', 'travel_date', 'group_info', 'preferences',
+                  'budget_value', 'duration_days', 'group_size')
+
+
+def split_preferences(preferences):
+    """The comma-separated preferences of an interaction as (canonical
+    preference, spelling) pairs, split as explode_preferences splits them"""
+    if preferences is None:
+        return []
+    spellings = [' '.join(preference.split()) for preference in preferences.split(',')]
+    return [(preference_key(spelling), spelling) for spelling in spellings]
+
+
+def _keys(row):
+    """Yield (rollup, key) for every rollup entry a single interaction contributes to"""
+    travel_month = (row['travel_date'] or '')[:7]
+    group_info = row['group_info'] or ''
+    yield 'rollup_daily', (str(row['created_at'])[:10],)
+    yield 'rollup_travel_month', (travel_month,)
+    yield 'rollup_group', (group_info,)
+    for preference, _ in split_preferences(row['preferences']):
+        yield 'rollup_preference', (preference, group_info, travel_month)
+
+
+def aggregate(rows, sign=1, names=None):
+    """Sum interactions into {rollup: {key: [measures]}}; sign=-1 for removals.
+    names, if given, collects the first spelling of each preference"""
+    totals = {name: {} for name in ROLLUPS}
+    for row in rows:
+        if names is not None:
+            for preference, spelling in split_preferences(row['preferences']):
+                names.setdefault(preference, spelling)
+        budget = row['budget_value']
+        duration = row['duration_days']
+        has_budget = budget is not None and not math.isnan(budget)
+        has_duration = duration is not None
+        values = (
+            sign,
+            sign * budget if has_budget else 0.0,
+            sign * has_budget,
+            sign * duration if has_duration else 0,
+            sign * has_duration,
+            sign * (row['group_size'] or 0)
+        )
+        for name, key in _keys(row):
+            sums = totals[name].get(key)
+            if sums is None:
+                totals[name][key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    sums[i] += value
+    return totals
+
+
+def create_rollup_tables(cursor):
+    for name, keys in ROLLUPS.items():
+        columns = ", ".join(f"{key} TEXT NOT NULL" for key in keys)
+        measures = ", ".join(f"{measure} REAL NOT NULL DEFAULT 0" for measure in MEASURES)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {name} (
+                {columns},
+                {measures},
+                PRIMARY KEY ({", ".join(keys)})
+            ) WITHOUT ROWID
+        ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {PREFERENCE_NAMES} (
+            position INTEGER PRIMARY KEY,
+            preference TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL
+        )
+    ''')
+
+
+def apply_rollups(cursor, rows, sign=1):
+    """Add (or with sign=-1 remove) interactions to the rollups, inside the
+    caller's transaction so they always agree with the interactions table"""
+    names = {}
+    for name, entries in aggregate(rows, sign, names).items():
+        if not entries:
+            continue
+        keys = ROLLUPS[name]
+        columns = keys + MEASURES
+        updates = ", ".join(f"{measure} = {measure} + excluded.{measure}"
+                            for measure in MEASURES)
+        cursor.executemany(f'''
+            INSERT INTO {name} ({", ".join(columns)})
+            VALUES ({", ".join("?" * len(columns))})
+            ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {updates}
+        ''', [(*key, *sums) for key, sums in entries.items()])
+        # Removing the last interaction of a key leaves an all-zero row
+        if sign < 0:
+            cursor.execute(f'DELETE FROM {name} WHERE interactions <= 0')
+
+    # New preferences keep their first spelling; removed ones lose it
+    if sign > 0:
+        cursor.executemany(f'''
+            INSERT INTO {PREFERENCE_NAMES} (preference, name) VALUES (?, ?)
+            ON CONFLICT (preference) DO NOTHING
+        ''', names.items())
+    else:
+        cursor.execute(f'''
+            DELETE FROM {PREFERENCE_NAMES}
+            WHERE preference NOT IN (SELECT preference FROM rollup_preference)
+        ''')
+
+
+def _source_rows(conn, batch_size=10000):
+    cursor = conn.execute(f'SELECT {", ".join(SOURCE_COLUMNS)} FROM interactions ORDER BY id')
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        for values in batch:
+            yield dict(zip(SOURCE_COLUMNS, values))
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup from the interactions table in one transaction"""
+    names = {}
+    totals = aggregate(_source_rows(conn), names=names)
+    with conn:
+        for name, entries in totals.items():
+            keys = ROLLUPS[name]
+            columns = keys + MEASURES
+            conn.execute(f'DELETE FROM {name}')
+            conn.executemany(f'''
+                INSERT INTO {name} ({", ".join(columns)})
+                VALUES ({", ".join("?" * len(columns))})
+            ''', [(*key, *sums) for key, sums in entries.items()])
+        conn.execute(f'DELETE FROM {PREFERENCE_NAMES}')
+        conn.executemany(f'INSERT INTO {PREFERENCE_NAMES} (preference, name) VALUES (?, ?)',
+                         names.items())
+
+
+def check_rollups(conn):
+    """Compare the rollups with a fresh aggregation of interactions.
+
+    Returns a list of (rollup, key, stored measures, expected measures) for
+    every entry that differs; an empty list means they are consistent.
+    Preference names are only checked for being there, as the first
+    spelling of a preference changes when its first mentions are removed.
+    """
+    expected_names = {}
+    expected = aggregate(_source_rows(conn), names=expected_names)
+    mismatches = []
+    for name, keys in ROLLUPS.items():
+        stored = {}
+        for row in conn.execute(f'SELECT {", ".join(keys + MEASURES)} FROM {name}'):
+            stored[tuple(row[:len(keys)])] = list(row[len(keys):])
+        for key in stored.keys() | expected[name].keys():
+            have = stored.get(key)
+            want = expected[name].get(key)
+            if (have is None or want is None
+                    or not all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+                               for a, b in zip(have, want))):
+                mismatches.append((name, key, have, want))
+
+    stored_names = dict(conn.execute(f'SELECT preference, name FROM {PREFERENCE_NAMES}'))
+    for preference in stored_names.keys() ^ expected_names.keys():
+        mismatches.append((PREFERENCE_NAMES, (preference,), stored_names.get(preference),
+                           expected_names.get(preference)))
+    return mismatches
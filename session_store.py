@@ -0,0 +1,349 @@
+import asyncio
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import config
+
+
+def new_conversation_state():
+    return {
+        "travel_dates": None,
+        "group_info": None,
+        "preferences": None,
+        "duration": None,
+        "budget": None,
+        "conversation_history": []
+    }
+
+
+class SessionStore(ABC):
+    """Conversation states, one per session.
+
+    Backends implement load(), save() and __len__(). Sessions idle for
+    longer than idle_ttl_seconds expire, and once more than max_sessions
+    exist the least recently used are dropped. Backends shared by several
+    processes also implement acquire() and release(), which lock a session
+    across processes for the length of a turn. session() goes through the
+    *_async() methods, which backends doing blocking I/O run on a worker
+    thread.
+    """
+
+    def __init__(self, max_sessions=None, idle_ttl_seconds=None, max_history=None):
+        self.max_sessions = max_sessions or config.SESSION_MAX_COUNT
+        self.idle_ttl_seconds = idle_ttl_seconds or config.SESSION_IDLE_TTL_SECONDS
+        self.max_history = max_history or config.SESSION_MAX_HISTORY
+        self._locks = weakref.WeakValueDictionary()
+
+    @abstractmethod
+    def __len__(self):
+        """Number of stored sessions, expired ones included until purged"""
+
+    @abstractmethod
+    def load(self, session_id):
+        """Return the state of a live session, or None if unknown or expired"""
+
+    @abstractmethod
+    def save(self, session_id, state, lease=None):
+        """Store a session's state and mark it as just used. With the
+        lease acquire() returned, also release the session."""
+
+    async def acquire(self, session_id):
+        """Wait until this worker holds the session and return the lease,
+        or None if the session doesn't exist. Only needed when other
+        processes share the sessions."""
+        return None
+
+    def release(self, session_id, lease):
+        """Give up a lease without saving"""
+
+    async def load_async(self, session_id):
+        """load() from the event loop"""
+        return self.load(session_id)
+
+    async def save_async(self, session_id, state, lease=None):
+        """save() from the event loop"""
+        self.save(session_id, state, lease)
+
+    async def release_async(self, session_id, lease):
+        """release() from the event loop"""
+        self.release(session_id, lease)
+
+    @asynccontextmanager
+    async def session(self, session_id=None):
+        """Hold a session's lock and yield (session_id, state).
+
+        Unknown or expired IDs get a fresh session with a new ID, which the
+        caller should hand back to the client. The state is saved when the
+        block exits, even if it raised.
+        """
+        lock = self._lock_for(session_id) if session_id else asyncio.Lock()
+        async with lock:
+            lease = await self.acquire(session_id) if session_id else None
+            state = await self.load_async(session_id) if session_id else None
+            if state is None:
+                if lease is not None:
+                    await self.release_async(session_id, lease)
+                    lease = None
+                session_id = secrets.token_urlsafe(16)
+                state = new_conversation_state()
+            try:
+                yield session_id, state
+            finally:
+                await self.save_async(session_id, state, lease)
+
+    def append_history(self, state, message):
+        """Add a message to the conversation history, keeping only the newest"""
+        history = state["conversation_history"]
+        history.append(message)
+        if len(history) > self.max_history:
+            del history[:-self.max_history]
+
+    def _lock_for(self, session_id):
+        # Serializes a session's turns within this process; the lock goes
+        # away once no request holds it
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+
+class _Session:
+    __slots__ = ("state", "last_seen")
+
+    def __init__(self, state, last_seen):
+        self.state = state
+        self.last_seen = last_seen
+
+
+class InMemorySessionStore(SessionStore):
+    """Sessions in a dict in this process; only suitable for a single worker"""
+
+    def __init__(self, max_sessions=None, idle_ttl_seconds=None, max_history=None):
+        super().__init__(max_sessions, idle_ttl_seconds, max_history)
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def load(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.last_seen > self.idle_ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return entry.state
+
+    def save(self, session_id, state, lease=None):
+        now = time.monotonic()
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            entry.state = state
+            entry.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return
+        self._evict(now)
+        self._sessions[session_id] = _Session(state, now)
+
+    def _evict(self, now):
+        # Sessions are kept in least recently used order
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if (len(self._sessions) < self.max_sessions
+                    and now - oldest.last_seen <= self.idle_ttl_seconds):
+                break
+            del self._sessions[oldest_id]
+
+
+class SessionConflictError(RuntimeError):
+    """A turn's lease on its session ran out and another worker took the
+    session over, so the turn's state was not saved"""
+
+
+class SessionBusyError(RuntimeError):
+    """Another worker held the session for longer than a turn waits"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite database in WAL mode, shared by every worker
+    process on the host.
+
+    load() and save() are each one primary-key lookup. A turn leases its
+    session by writing a random token and an expiry into the session's
+    row; workers wanting the same session poll until the lease is released
+    or expires. save() only writes back while the row still holds the
+    turn's token (compare-and-swap), so a turn that outlived its lease
+    raises SessionConflictError instead of overwriting the newer turn, and
+    a turn still waiting after acquire_timeout_seconds raises
+    SessionBusyError. Expired and surplus sessions are purged when new
+    sessions are created, at most once every purge_interval_seconds.
+
+    The request handlers reach the database through the *_async()
+    methods, on a worker thread, so a write lock held by another worker
+    never stalls the event loop.
+    """
+
+    def __init__(self, db_name=None, max_sessions=None, idle_ttl_seconds=None,
+                 max_history=None, purge_interval_seconds=60, lease_seconds=None,
+                 poll_seconds=0.02, acquire_timeout_seconds=None):
+        super().__init__(max_sessions, idle_ttl_seconds, max_history)
+        self.db_name = db_name or config.SESSION_DB_PATH
+        self.purge_interval_seconds = purge_interval_seconds
+        self.lease_seconds = lease_seconds or config.SESSION_LEASE_SECONDS
+        self.poll_seconds = poll_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds or config.SESSION_ACQUIRE_TIMEOUT_SECONDS
+        self._last_purge = 0.0
+        self._local = threading.local()
+        self.init_db()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=config.SESSION_BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def init_db(self):
+        """Create the sessions table if it doesn't exist"""
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                last_seen REAL NOT NULL,
+                lease TEXT,
+                lease_until REAL
+            ) WITHOUT ROWID
+        ''')
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(sessions)')}
+        for column, column_type in (('lease', 'TEXT'), ('lease_until', 'REAL')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE sessions ADD COLUMN {column} {column_type}')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_seen
+            ON sessions (last_seen)
+        ''')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def load(self, session_id):
+        row = self._connection().execute(
+            'SELECT state, last_seen FROM sessions WHERE session_id = ?',
+            (session_id,)).fetchone()
+        if row is None or time.time() - row[1] > self.idle_ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    async def acquire(self, session_id):
+        lease = secrets.token_hex(8)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout_seconds
+        while True:
+            taken = await loop.run_in_executor(None, self._take_lease, session_id, lease)
+            if taken is not False:
+                return taken
+            if loop.time() >= deadline:
+                raise SessionBusyError(
+                    f"Session {session_id} is still busy after {self.acquire_timeout_seconds:g} s")
+            await asyncio.sleep(self.poll_seconds)
+
+    def _take_lease(self, session_id, lease):
+        """The lease if it was written, None if the session doesn't exist,
+        False if another turn holds it"""
+        now = time.time()
+        conn = self._connection()
+        cursor = conn.execute('''
+            UPDATE sessions SET lease = ?, lease_until = ?
+            WHERE session_id = ? AND (lease IS NULL OR lease_until < ?)
+        ''', (lease, now + self.lease_seconds, session_id, now))
+        if cursor.rowcount:
+            return lease
+        held = conn.execute('SELECT 1 FROM sessions WHERE session_id = ?',
+                            (session_id,)).fetchone()
+        return None if held is None else False
+
+    def release(self, session_id, lease):
+        self._connection().execute('''
+            UPDATE sessions SET lease = NULL, lease_until = NULL
+            WHERE session_id = ? AND lease = ?
+        ''', (session_id, lease))
+
+    def save(self, session_id, state, lease=None):
+        now = time.time()
+        payload = json.dumps(state)
+        conn = self._connection()
+        if lease is not None:
+            cursor = conn.execute('''
+                UPDATE sessions SET state = ?, last_seen = ?, lease = NULL, lease_until = NULL
+                WHERE session_id = ? AND lease = ?
+            ''', (payload, now, session_id, lease))
+            if not cursor.rowcount:
+                raise SessionConflictError(
+                    f"Session {session_id} was taken over after its lease expired; turn not saved")
+            return
+
+        cursor = conn.execute('''
+            UPDATE sessions SET state = ?, last_seen = ? WHERE session_id = ?
+        ''', (payload, now, session_id))
+        if cursor.rowcount:
+            return
+
+        conn.execute('''
+            INSERT OR REPLACE INTO sessions (session_id, state, last_seen)
+            VALUES (?, ?, ?)
+        ''', (session_id, payload, now))
+        if now - self._last_purge >= self.purge_interval_seconds:
+            self._last_purge = now
+            self.purge(now)
+
+    async def load_async(self, session_id):
+        """load() on a worker thread"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.load, session_id)
+
+    async def save_async(self, session_id, state, lease=None):
+        """save() on a worker thread"""
+        await asyncio.get_running_loop().run_in_executor(None, self.save, session_id, state, lease)
+
+    async def release_async(self, session_id, lease):
+        """release() on a worker thread"""
+        await asyncio.get_running_loop().run_in_executor(None, self.release, session_id, lease)
+
+    def purge(self, now=None):
+        """Delete expired sessions and the least recently used beyond max_sessions"""
+        now = now or time.time()
+        conn = self._connection()
+        conn.execute('DELETE FROM sessions WHERE last_seen < ?',
+                     (now - self.idle_ttl_seconds,))
+        conn.execute('''
+            DELETE FROM sessions WHERE session_id IN (
+                SELECT session_id FROM sessions
+                ORDER BY last_seen DESC
+                LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_sessions,))
+
+
+def create_session_store(backend=None):
+    """Build the session store selected by SESSION_BACKEND ("memory" or "sqlite")"""
+    backend = backend or config.SESSION_BACKEND
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+# Create a global instance
+session_store = create_session_store()
@@ -8,6 +8,9 @@ document.addEventListener('DOMContentLoaded', () => {
     const chatContainer = document.getElementById('chatContainer');
     const itinerarySection = document.getElementById('itinerarySection');
 
+    // Conversation session issued by the server on the first request
+    let sessionId = null;
+
     // Function to get welcome message
     async function getWelcomeMessage(languageCode) {
         try {
@@ -19,7 +22,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({
                     preferences: `SYSTEM:LANGUAGE=${languageCode}`,
                     duration: null,
-                    budget: null
+                    budget: null,
+                    session_id: sessionId
                 })
             });
 
@@ -28,6 +32,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             const data = await response.json();
+            if (data.session_id) sessionId = data.session_id;
             return data.itinerary[0].activities[0];
         } catch (error) {
             console.error('Error getting welcome message:', error);
@@ -35,6 +40,54 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Send a chat turn to the streaming endpoint and report each server-sent event
+    async function streamChatTurn(message, onEvent) {
+        const response = await fetch('/api/create-itinerary/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                preferences: message,
+                duration: null,
+                budget: null,
+                session_id: sessionId
+            })
+        });
+
+        if (!response.ok) throw new Error('Failed to get response');
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        eventName = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                });
+                if (!data) continue;
+                const payload = JSON.parse(data);
+                if (payload.session_id) sessionId = payload.session_id;
+                onEvent(eventName, payload);
+            }
+        }
+    }
+
     // Add this function to show typing indicator
     function showTypingIndicator() {
         const typingDiv = document.createElement('div');
@@ -91,32 +144,44 @@ document.addEventListener('DOMContentLoaded', () => {
             // Add artificial delay
             await new Promise(resolve => setTimeout(resolve, 1000));
 
-            const response = await fetch('/api/create-itinerary', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    preferences: message,
-                    duration: null,
-                    budget: null
-                })
-            });
+            // Render the itinerary progressively as days stream in
+            const partial = { itinerary: [], recommendations: [], hotel_suggestion: null };
+            let itineraryStarted = false;
 
-            if (!response.ok) throw new Error('Failed to get response');
+            await streamChatTurn(message, (event, data) => {
+                if (event === 'message') {
+                    typingDiv.remove();
+                    addMessage(data.itinerary[0].activities[0], false);
+                    return;
+                }
+                if (event === 'error') {
+                    typingDiv.remove();
+                    addMessage(data.message, false);
+                    return;
+                }
 
-            const data = await response.json();
-            
-            // Remove typing indicator
-            typingDiv.remove();
-            
-            if (data.itinerary[0].day === 0) {
-                addMessage(data.itinerary[0].activities[0], false);
-            } else {
-                addMessage("I've created your personalized Dubai itinerary! You can now view it!", false);
-                displayItinerary(data);
-                itinerarySection?.classList.remove('hidden');
-            }
+                if (event === 'hotel') {
+                    partial.hotel_suggestion = data;
+                } else if (event === 'day') {
+                    partial.itinerary.push(data);
+                } else if (event === 'recommendations') {
+                    partial.recommendations = data;
+                } else if (event === 'done') {
+                    Object.assign(partial, data);
+                }
+
+                if (!itineraryStarted) {
+                    itineraryStarted = true;
+                    typingDiv.remove();
+                    addMessage("I'm creating your personalized Dubai itinerary. Each day will appear as soon as it's ready!", false);
+                    itinerarySection?.classList.remove('hidden');
+                }
+                displayItinerary(partial);
+
+                if (event === 'done') {
+                    addMessage("I've created your personalized Dubai itinerary! You can now view it!", false);
+                }
+            });
         } catch (error) {
             // Remove typing indicator
             typingDiv.remove();